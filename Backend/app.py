@@ -4,31 +4,57 @@ PrediChain backend main FastAPI app.
 
 Endpoints provided:
 - GET /health
-- POST /upload-data                (upload historical CSV)
-- POST /forecast                   (run forecast for material from historical CSV)
+- GET /cache-stats                 (dataset/forecast/model/weather cache, weather client, coalesced fits, job queue counters)
+- POST /upload-data                (upload historical CSV, queues forecast warm-up)
+- POST /forecast                   (future forecast for material from historical CSV)
 - POST /recommendation             (generate procurement recs using current project inputs)
+- POST /scenarios                  (what-if sweep of procurement parameters for one forecast)
 - POST /historical_forecast        (return historical monthly agg + forecast)
 - POST /dashboard-data             (combined payload for frontend dashboard)
+- POST /dashboard-data/stream      (same payload streamed per material as NDJSON / SSE)
+- POST /jobs/{kind}                (queue forecast / recommendation / dashboard-data, returns a job id)
+- GET  /jobs, /jobs/{id}, /jobs/{id}/result, DELETE /jobs/{id}  (job status, result, cancel)
+- POST /smart-alert-v3/batch       (risk alerts for many project sites in one model call)
+- GET  /models, POST /models/reload  (pre-trained model registry: versions, load time, memory; re-scan)
 - GET  /projects                   (protected: list projects.json)
 - POST /projects                   (add project metadata)
 - DELETE /projects/{proj_id}
 """
 
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends, Header
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends, Header, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi import Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.concurrency import run_in_threadpool
 import pandas as pd
 import os
 import json
+import time
+import inspect
 from typing import Optional
 from dotenv import load_dotenv
 load_dotenv()
 
 # local ML modules (keep your existing functions)
-from ml.forecast import generate_forecast
-from ml.recommendation import generate_procurement_recommendations
+from ml.forecast import DEFAULT_ENGINE, DEFAULT_GRANULARITY, GRANULARITIES
+from ml.engines import ENGINE_CHOICES
+from ml.forecast_executor import forecast_materials, iter_forecast_materials
+from ml.dataset import get_series_index, dataset_cache, dataset_key
+from ml.forecast_cache import forecast_cache, forecast_flight, cached_forecast
+from ml.ingest import stream_upload, ingest_csv, UploadValidationError, REQUIRED_UPLOAD_COLS
+from ml.model_cache import model_cache
+from ml.jobs import job_queue, JobQueueFull, DONE, FAILED, CANCELLED
+from ml.warmup import warm_forecasts, WARMUP_ENABLED
+from ml.serialize import RESPONSE_FORMATS, columnarize, encode_json
+from ml.scenarios import sweep_scenarios, scenarios_to_json, parse_grid
+from ml.safety_stock import DEFAULT_SERVICE_LEVEL
+from ml.dashboard import upload_summary, upload_signals, material_section, material_sections, dashboard_summary
+from ml.recommendation import generate_procurement_recommendations_batch
 # from ml.alert_engine import predict_risk, predict_recovery_action
-from ml.alert_engine import predict_risk, generate_recovery_plan, log_incident, ai_dynamic_risk_analysis
+from ml.model_registry import model_registry
+from ml.alert_engine import predict_risk, predict_risk_batch, generate_recovery_plan, log_incident, ai_dynamic_risk_analysis, weather_cache, weather_client
 from fastapi import Body
 # Firebase admin token verification helper (must exist in backend/firebase_admin_auth.py)
 from firebase_admin_auth import verify_firebase_token
@@ -40,7 +66,10 @@ app = FastAPI(title="PrediChain Backend", version="1.0")
 # --- Directories & files ---
 UPLOAD_DIR = "data/uploads"
 FORECAST_DIR = "data/forecasts"
+# uploads up to this size get their series index built right away
+PREINDEX_MAX_BYTES = int(os.getenv("PREINDEX_MAX_BYTES", str(64 * 1024 * 1024)))
 PROJECTS_FILE = "data/projects.json"
+MAX_ALERT_BATCH = int(os.getenv("MAX_ALERT_BATCH", "1000"))  # projects per /smart-alert-v3/batch call
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(FORECAST_DIR, exist_ok=True)
 
@@ -57,6 +86,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# gzip JSON responses; streamed dashboards are left alone so frames aren't held back
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES,
+                   exclude_content_types=("text/event-stream", "application/x-ndjson"))
 
 # --- Auth dependency using Firebase ID token in Authorization: Bearer <idToken> header ---
 def get_current_user(authorization: Optional[str] = Header(None)):
@@ -75,6 +108,39 @@ def get_current_user(authorization: Optional[str] = Header(None)):
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     return decoded
 
+def check_forecast_options(engine: str, granularity: str):
+    """Reject unknown forecast engines/granularities with a 400 before any work is done."""
+    if engine.strip().lower() not in ENGINE_CHOICES:
+        raise HTTPException(status_code=400, detail=f"Unknown engine '{engine}'. Expected one of: {ENGINE_CHOICES}")
+    if granularity.strip().lower() not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"Unknown granularity '{granularity}'. Expected one of: {list(GRANULARITIES)}")
+
+def load_series_index(filepath: str):
+    """Per-material series index of an upload; 400 if the file lacks usable date/material/quantity columns."""
+    try:
+        return get_series_index(filepath)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return encode_json(content)
+
+def check_response_format(format: str) -> str:
+    fmt = format.strip().lower()
+    if fmt not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}'. Expected one of: {list(RESPONSE_FORMATS)}")
+    return fmt
+
+def format_response(payload, fmt: str, response: Response = None):
+    """Row records as before, or (format=columnar) column arrays through the fast encoder."""
+    if fmt == "columnar":
+        # a returned Response doesn't pick up headers set on the injected one, carry them over
+        return FastJSONResponse(columnarize(payload), headers=dict(response.headers) if response else None)
+    return payload
+
 @app.middleware("http")
 async def log_requests(request, call_next):
     print(f"➡️ {request.method} {request.url}")
@@ -86,6 +152,31 @@ async def log_requests(request, call_next):
 def health_check():
     return {"status": "ok"}
 
+# --- Cache stats ---
+@app.get("/cache-stats")
+def cache_stats():
+    """Hit/miss counters and resident size of the in-process caches."""
+    return {
+        "datasets": dataset_cache.stats(),
+        "forecasts": forecast_cache.stats(),
+        "forecast_flights": forecast_flight.stats(),
+        "models": model_cache.stats(),
+        "jobs": job_queue.stats(),
+        "weather": weather_cache.stats(),
+        "weather_client": weather_client.stats(),
+    }
+
+# --- Model registry ---
+@app.get("/models")
+def list_models():
+    """Pre-trained models found in ml/models/: version, whether loaded, load time and memory footprint."""
+    return model_registry.stats()
+
+@app.post("/models/reload")
+def reload_models():
+    """Re-scan ml/models/ now and hot-swap any loaded model whose file changed."""
+    return model_registry.reload()
+
 # --- Projects (simple JSON store) ---
 @app.get("/projects")
 def get_projects(user: dict = Depends(get_current_user)):
@@ -137,19 +228,26 @@ def delete_project(proj_id: int):
 
 # --- Upload Historical CSV ---
 @app.post("/upload-data")
-async def upload_data(file: UploadFile = File(...)):
+async def upload_data(
+    file: UploadFile = File(...),
+    validate_rows: bool = Form(False),
+    known_materials: str = Form(""),
+    warmup: bool = Form(True)
+):
     """
     Upload historical CSV with the template you defined.
-    Validates required columns present in CSV before saving.
+    The body is streamed to disk in chunks (constant memory) and rejected as soon
+    as the header is missing a required column.
+    validate_rows: also run a chunked data-quality pass (date parse rate,
+    negative/missing Quantity_Used, material names); known_materials is an
+    optional JSON list used to flag unknown materials.
+    warmup: queue background forecasts for every material in the file; the
+    response's "warmup" block is the job to poll (GET /jobs/{job_id}).
     Returns filename to the frontend.
     """
-    UPLOAD_DIR = "data/uploads"
     os.makedirs(UPLOAD_DIR, exist_ok=True)
     filepath = os.path.join(UPLOAD_DIR, file.filename)
-    contents = await file.read()
-    df = pd.read_csv(pd.io.common.BytesIO(contents), encoding='latin-1', sep=',', engine='python')
-    df.columns = [c.strip() for c in df.columns]
-    
+
     # required_cols = [
     #     "Project_ID", "Project_Name", "Project_Type", "Project_Size", "Location",
     #     "Start_Date", "End_Date", "Budget_Planned_Quantity", "Material_Name",
@@ -159,43 +257,83 @@ async def upload_data(file: UploadFile = File(...)):
     #     "Regional_Risk_Level", "Notes_Special_Conditions", "Project_Phase",
     #     "Date_of_Materail_Usage"
     # ]
+    try:
+        upload = await stream_upload(file, filepath, REQUIRED_UPLOAD_COLS)
+    except UploadValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    required_cols = [
-        'Date_of_Materail_Usage', 
-        'Material_Name', 
-        'Quantity_Used'
-      ]
-      
-    missing_cols = [c for c in required_cols if c not in df.columns]
-    if missing_cols:
-        raise HTTPException(status_code=400, detail=f"CSV missing columns: {missing_cols}")
+    try:
+        known = json.loads(known_materials) if known_materials else None
+    except Exception:
+        known = [m.strip() for m in known_materials.split(",")]
 
-    filepath = os.path.join(UPLOAD_DIR, file.filename)
-    with open(filepath, "wb") as f:
-        f.write(contents)
-    return {"filename": file.filename, "message": "Upload successful"}
+    # 🗂️ Columnar copy with normalized schema so analytics endpoints skip CSV parsing,
+    # written (and optionally validated) in one chunked pass off the event loop
+    ingest = await run_in_threadpool(ingest_csv, filepath, validate_rows, known)
+
+    # 📇 per-material daily/monthly series, so the first forecast request doesn't pay for it
+    # (large uploads are indexed on first use, out of core, to keep the upload request short)
+    if upload["bytes"] <= PREINDEX_MAX_BYTES:
+        try:
+            await run_in_threadpool(dataset_cache.get_index, filepath)
+        except Exception as e:
+            print("⚠️ Series index build failed, will retry on first request:", e)
+
+    response = {
+        "filename": file.filename,
+        "message": "Upload successful",
+        "bytes": upload["bytes"],
+        "sha256": upload["sha256"],
+    }
+    if ingest["validation"] is not None:
+        response["validation"] = ingest["validation"]
+
+    # 🔥 forecast every material in the background so the first dashboard load is a cache hit
+    if warmup and WARMUP_ENABLED:
+        try:
+            # own lane: a burst of uploads can't hold the workers /jobs requests queue for
+            job = job_queue.submit("warmup", warm_forecasts, filepath, params={"filename": file.filename},
+                                   lane="warmup")
+            response["warmup"] = {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"}
+        except JobQueueFull as e:
+            print("⚠️ Forecast warm-up skipped:", e)
+    return response
 
 # --- Forecast (historical CSV -> Prophet monthly forecast) ---
 @app.post("/forecast")
 def forecast(
     filename: str = Form(...),
     material: str = Form(...),
-    horizon_months: int = Form(6)
+    horizon_months: int = Form(6),
+    engine: str = Form(DEFAULT_ENGINE),
+    granularity: str = Form(DEFAULT_GRANULARITY),
+    include_history: bool = Form(False),
+    format: str = Form("records"),
+    response: Response = None
 ):
     """
     Run forecast for 'material' using historical CSV file 'filename'.
-    Returns monthly forecast rows (forecast_date, yhat, yhat_lower, yhat_upper, material).
+    Returns the future forecast rows (forecast_date, yhat, yhat_lower, yhat_upper, material).
+    engine: auto | prophet | holt_winters | seasonal_naive | croston
+    granularity: monthly (default) | daily
+    include_history: also return fitted values for the historical periods
+    format: records (default) | columnar (one array per column, dates as epoch ms)
+    The X-Forecast-Cache header says whether the forecast was served from cache (hit/miss).
     """
     filepath = os.path.join(UPLOAD_DIR, filename)
     if not os.path.exists(filepath):
         raise HTTPException(status_code=404, detail="File not found")
+    check_forecast_options(engine, granularity)
+    fmt = check_response_format(format)
 
-    df = pd.read_csv(filepath)
-    df.columns = [c.strip() for c in df.columns]
+    series_index = load_series_index(filepath)
 
     try:
-        forecast_df = generate_forecast(df, material, horizon_months)
-        return forecast_df.to_dict(orient="records")
+        forecast_df, cached = cached_forecast(dataset_key(filepath), None, material, horizon_months,
+                                              engine=engine, granularity=granularity,
+                                              include_history=include_history, series_index=series_index)
+        response.headers["X-Forecast-Cache"] = "hit" if cached else "miss"
+        return format_response(forecast_df.to_dict(orient="records"), fmt, response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -205,6 +343,8 @@ def recommend_procurement(
     filename: str = Form(...),
     materials: str = Form("[]"),  # JSON string list
     horizon_months: int = Form(6),
+    engine: str = Form(DEFAULT_ENGINE),
+    granularity: str = Form(DEFAULT_GRANULARITY),
     lead_time_days: int = Form(10),
     current_inventory: float = Form(0.0),
     supplierReliability: float = Form(100.0),
@@ -218,14 +358,16 @@ def recommend_procurement(
     projectType: str = Form(""),
     location: str = Form(""),
     startDate: str = Form(""),
-    endDate: str = Form("")
+    endDate: str = Form(""),
+    format: str = Form("records")
 ):
     filepath = os.path.join(UPLOAD_DIR, filename)
     if not os.path.exists(filepath):
         raise HTTPException(status_code=404, detail="CSV file not found")
+    check_forecast_options(engine, granularity)
+    fmt = check_response_format(format)
 
-    df_hist = pd.read_csv(filepath)
-    df_hist.columns = [c.strip() for c in df_hist.columns]
+    series_index = load_series_index(filepath)
 
     print("=== Debug: /recommendation called ===")
     print("Filename:", filename)
@@ -243,69 +385,56 @@ def recommend_procurement(
     all_forecasts = []
     all_recs = []
     all_bulk_orders = []
+    errors = []
 
     try:
-        for matObj in material_list:
+        # 🚀 Fit every material in parallel, results come back in request order
+        tasks = [(m["material"], int(m.get("horizon_months", horizon_months))) for m in material_list]
+        print(f"\n📦 Running forecasts for materials: {[t[0] for t in tasks]}")
+        results = forecast_materials(None, tasks, series_index=series_index, dataset_key=dataset_key(filepath),
+                                     engine=engine, granularity=granularity)
+        forecast_cached = {res["material"]: res["cached"] for res in results}
+
+        forecast_frames = []
+        params = []
+        for matObj, result in zip(material_list, results):
             mat = matObj["material"]
-            hm = int(matObj.get("horizon_months", horizon_months))
-            ltd = int(matObj.get("lead_time_days", lead_time_days))
-            inv = float(matObj.get("current_inventory", current_inventory))
-            sr = float(matObj.get("supplierReliability", supplierReliability))
-            dtd = float(matObj.get("deliveryTimeDays", deliveryTimeDays))
-            cts = int(matObj.get("contractorTeamSize", contractorTeamSize))
-            pb = float(matObj.get("projectBudget", projectBudget))
-
-            print(f"\n📦 Running forecast for material: {mat}")
-
-            forecast_df = generate_forecast(df_hist, mat, hm)
-
-            current_project_data = pd.DataFrame({
-                "material": [mat] * len(forecast_df),
-                "forecast_date": forecast_df['forecast_date'],
-                "lead_time_days": [ltd] * len(forecast_df),
-                "current_inventory": [inv] * len(forecast_df),
-                "supplier_reliability": [sr] * len(forecast_df),
-                "delivery_time_days": [dtd] * len(forecast_df),
-                "contractor_team_size": [cts] * len(forecast_df),
-                "project_budget": [pb] * len(forecast_df),
-                "weather": [weather] * len(forecast_df),
-                "region_risk": [region_risk] * len(forecast_df),
-                "notes": [notes] * len(forecast_df),
-                "project_name": [projectName] * len(forecast_df),
-                "project_type": [projectType] * len(forecast_df),
-                "location": [location] * len(forecast_df),
-                "start_date": [startDate] * len(forecast_df),
-                "end_date": [endDate] * len(forecast_df),
-                "forecasted_demand": forecast_df['yhat']
-            })
-
-            # --- Handle possible tuple return from generate_procurement_recommendations ---
-            rec_out = generate_procurement_recommendations(
-                forecast_df=forecast_df,
-                current_project_data=current_project_data,
-                lead_time_days=ltd,
-                current_inventory=inv
+            if result["error"]:
+                errors.append({"material": mat, "error": result["error"]})
+                continue
+            forecast_frames.append(result["forecast"])
+            all_forecasts += result["forecast"].to_dict(orient="records")
+
+            # per-material overrides of the request-level inputs
+            row = {
+                "material": mat,
+                "lead_time_days": int(matObj.get("lead_time_days", lead_time_days)),
+                "current_inventory": float(matObj.get("current_inventory", current_inventory)),
+                "supplier_reliability": float(matObj.get("supplierReliability", supplierReliability)),
+            }
+            if matObj.get("supplier"):
+                row["supplier"] = str(matObj["supplier"])
+            params.append(row)
+
+        if errors and len(errors) == len(material_list):
+            raise RuntimeError(f"Forecast failed for all materials: {errors}")
+
+        # 🧮 One vectorized pass over every material; bulk orders span materials
+        if forecast_frames:
+            rec_df, bulk_orders_df = generate_procurement_recommendations_batch(
+                pd.concat(forecast_frames, ignore_index=True), pd.DataFrame(params)
             )
-
-            if isinstance(rec_out, (tuple, list)):
-                rec_df = rec_out[0] if rec_out[0] is not None else pd.DataFrame()
-                bulk_orders_df = rec_out[1] if len(rec_out) > 1 and rec_out[1] is not None else pd.DataFrame()
-            else:
-                rec_df = rec_out if isinstance(rec_out, pd.DataFrame) else pd.DataFrame(rec_out)
-                bulk_orders_df = pd.DataFrame()
-
-            all_forecasts += forecast_df.to_dict(orient="records")
-            all_recs += rec_df.to_dict(orient="records")
-
-            if not bulk_orders_df.empty:
-                all_bulk_orders += bulk_orders_df.to_dict(orient="records")
+            all_recs = rec_df.to_dict(orient="records")
+            all_bulk_orders = bulk_orders_df.to_dict(orient="records")
 
         # ✅ return must be after loop & still inside try
-        return {
+        return format_response({
             "forecast": all_forecasts,
             "recommendations": all_recs,
-            "bulk_orders": all_bulk_orders
-        }
+            "bulk_orders": all_bulk_orders,
+            "forecast_cached": forecast_cached,
+            "errors": errors
+        }, fmt)
 
     except Exception as e:
         import traceback
@@ -313,12 +442,74 @@ def recommend_procurement(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+# --- What-if sweep over procurement parameters for one forecast ---
+@app.post("/scenarios")
+def procurement_scenarios(
+    filename: str = Form(...),
+    material: str = Form(...),
+    horizon_months: int = Form(6),
+    engine: str = Form(DEFAULT_ENGINE),
+    granularity: str = Form(DEFAULT_GRANULARITY),
+    lead_time_days: str = Form(""),
+    current_inventory: str = Form(""),
+    supplierReliability: str = Form(""),
+    safety_stock_percent: str = Form(""),
+    unit_cost: float = Form(1.0)
+):
+    """
+    Forecast `material` once and evaluate the recommendation math for every
+    combination of the given parameter grids. Each grid is a JSON list, a
+    comma-separated list or an inclusive "start:stop:step" range; empty means
+    the /recommendation default. Returns order quantity, order date, total
+    cost and cost sensitivity surfaces (axis order in "dims").
+    """
+    filepath = os.path.join(UPLOAD_DIR, filename)
+    if not os.path.exists(filepath):
+        raise HTTPException(status_code=404, detail="CSV file not found")
+    check_forecast_options(engine, granularity)
+    series_index = load_series_index(filepath)
+
+    # parse (and size-check) the grids before paying for a forecast
+    try:
+        grids = {
+            "lead_time_days": parse_grid(lead_time_days),
+            "current_inventory": parse_grid(current_inventory),
+            "supplier_reliability": parse_grid(supplierReliability),
+            "safety_stock_percent": parse_grid(safety_stock_percent),
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        forecast_df, cached = cached_forecast(dataset_key(filepath), None, material, horizon_months,
+                                              engine=engine, granularity=granularity, series_index=series_index)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Forecast failed for {material}: {e}")
+
+    try:
+        t0 = time.perf_counter()
+        result = sweep_scenarios(forecast_df, unit_cost=unit_cost, **grids)
+        sweep_ms = (time.perf_counter() - t0) * 1000
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    print(f"🧪 {result['scenario_count']} scenarios for {material} in {sweep_ms:.1f} ms")
+    return FastJSONResponse({
+        "material": material,
+        "forecast": forecast_df.to_dict(orient="records"),
+        "forecast_cached": cached,
+        "sweep_ms": round(sweep_ms, 2),
+        **scenarios_to_json(result),
+    })
+
 # --- Combined dashboard payload endpoint ---
 @app.post("/dashboard-data")
 def dashboard_data(
     filename: str = Form(...),
     materials: str = Form("[]"),
     horizon_months: int = Form(6),
+    engine: str = Form(DEFAULT_ENGINE),
+    granularity: str = Form(DEFAULT_GRANULARITY),
     lead_time_days: int = Form(10),
     current_inventory: float = Form(0.0),
     supplierReliability: float = Form(100.0),
@@ -332,33 +523,71 @@ def dashboard_data(
     projectType: str = Form(""),
     location: str = Form(""),
     startDate: str = Form(""),
-    endDate: str = Form("")
+    endDate: str = Form(""),
+    service_level: float = Form(DEFAULT_SERVICE_LEVEL),
+    format: str = Form("records")
 ):
+    """format: records (default) | columnar (row lists as column arrays, dates as epoch ms, gzip-friendly)."""
     filepath = os.path.join(UPLOAD_DIR, filename)
     if not os.path.exists(filepath):
         raise HTTPException(status_code=404, detail="CSV file not found")
+    check_forecast_options(engine, granularity)
+    if not 0 < service_level < 1:
+        raise HTTPException(status_code=400, detail="service_level must be between 0 and 1")
+    fmt = check_response_format(format)
+
+    ctx = dashboard_context(filepath, materials, lead_time_days, current_inventory, supplierReliability)
+
+    # --- Forecast generation: all materials fanned out over the process pool ---
+    # (served from the forecast cache when only procurement inputs changed)
+    results = forecast_materials(None, [(mat, horizon_months) for mat in ctx["materials"]],
+                                 series_index=ctx["series_index"], dataset_key=ctx["dataset_key"],
+                                 engine=engine, granularity=granularity)
+    forecast_cached = {res["material"]: res["cached"] for res in results}
+
+    forecasts = []
+    errors = []
+    for mat, result in zip(ctx["materials"], results):
+        print(f"\n📦 Dashboard: processing material: {mat}")
+        if result["error"]:
+            errors.append({"material": mat, "error": result["error"]})
+            continue
+        print(f"Forecast rows for {mat}: {len(result['forecast'])}")
+        forecasts.append((mat, result["forecast"]))
 
-    # read and normalize header spacing
-    df_hist = pd.read_csv(filepath)
-    df_hist.columns = [c.strip() for c in df_hist.columns]
-
-    # normalize common misspellings / variants to canonical names used downstream
-    rename_map = {
-        "Date_of_Materail_Usage": "Date_of_Material_Usage",
-        "Supllier_Reliability_Score": "Supplier_Reliability_Score",
-        "Supplier_Name": "Supplier_Name",
-        "Material_Name": "Material_Name",
-        "Quantity_Used": "Quantity_Used"
-    }
-    df_hist.rename(columns=rename_map, inplace=True)
+    if errors and len(errors) == len(ctx["materials"]):
+        raise HTTPException(status_code=500, detail=f"Forecast failed for all materials: {errors}")
 
-    # defensive: ensure any missing expected cols exist (with safe defaults)
-    if "Material_Name" not in df_hist.columns:
-        df_hist["Material_Name"] = ""
-    if "Quantity_Used" not in df_hist.columns:
-        df_hist["Quantity_Used"] = 0
-    # keep original copy for safety
-    df_hist_raw = df_hist.copy()
+    # --- Recommendations (one batch for all materials), safety stock, history, feature scores ---
+    try:
+        sections = material_sections(forecasts, ctx["series_index"], ctx["params"], ctx["lead_table"],
+                                     ctx["signals"], service_level)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Recommendation failed: {e}")
+
+    summary, bulk_orders = dashboard_summary(sections, supplierReliability, weather, projectBudget, lead_time_days)
+    advice = [] #placeholder
+    return format_response({
+        "forecast": [r for sec in sections for r in sec["forecast"]],
+        "recommendations": [r for sec in sections for r in sec["recommendations"]],
+        "bulk_orders": bulk_orders,
+        "historical": [r for sec in sections for r in sec["historical"]],
+        "safety_stock": [sec["safety_stock"] for sec in sections if sec["safety_stock"] is not None],
+        "summary": summary,
+        "advice": advice,
+        "forecast_cached": forecast_cached,
+        "errors": errors
+    }, fmt)
+
+def dashboard_context(filepath: str, materials: str, lead_time_days: int, current_inventory: float,
+                      supplier_reliability: float) -> dict:
+    """Per-request inputs shared by every material of a dashboard (upload aggregates, parsed materials)."""
+    # per-material daily/monthly series, built once per upload (out of core for big files);
+    # requested before anything else so the full frame never has to be loaded for it
+    series_index = load_series_index(filepath)
+    key = dataset_key(filepath)
+    # lead times / supplier scores: a few columns of the upload, aggregated once per upload
+    summary = upload_summary(filepath)
 
     # parse materials param (JSON string expected)
     try:
@@ -367,281 +596,194 @@ def dashboard_data(
         print("❌ JSON parse fail for materials; falling back to single-element list")
         material_list = [materials]
 
-    all_forecasts = []
-    all_recs = []
-    all_bulk_orders = []
-    all_hist = []
-
-    # feature importance accumulator (will compute per-material then aggregate)
-    feature_scores_acc = {
-        "seasonality": [],
-        "past_consumption": [],
-        "supplier_reliability": [],
-        "weather": [],
-        "regional_risk": []
+    return {
+        "dataset_key": key,
+        "series_index": series_index,
+        "materials": [str(m["material"] if isinstance(m, dict) else m).strip() for m in material_list],
+        "params": {
+            "lead_time_days": lead_time_days,
+            "current_inventory": current_inventory,
+            "supplier_reliability": supplier_reliability,
+        },
+        "lead_table": summary["lead_table"],
+        "signals": upload_signals(summary, supplier_reliability),
     }
 
-    for matObj in material_list:
-        mat = matObj["material"] if isinstance(matObj, dict) else matObj
-        mat = str(mat).strip()
-        print(f"\n📦 Dashboard: processing material: {mat}")
-
-        # --- Forecast generation (keep your existing generate_forecast) ---
-        try:
-            forecast_df = generate_forecast(df_hist_raw.copy(), mat, horizon_months)
-            print(f"Forecast rows for {mat}: {len(forecast_df)}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Forecast failed for {mat}: {e}")
-
-        # ensure forecast_df has columns we expect
-        if "forecast_date" not in forecast_df.columns and "ds" in forecast_df.columns:
-            forecast_df = forecast_df.rename(columns={"ds": "forecast_date"})
-        if "yhat" not in forecast_df.columns and "forecasted" in forecast_df.columns:
-            forecast_df["yhat"] = forecast_df["forecasted"]
-
-        # --- Build current_project_data with identical-length arrays to avoid pandas length errors ---
-        forecast_len = len(forecast_df)
-        try:
-            current_project_data = pd.DataFrame({
-                "material": [mat] * forecast_len,
-                "forecast_date": forecast_df["forecast_date"].values,
-                "lead_time_days": [lead_time_days] * forecast_len,
-                "current_inventory": [current_inventory] * forecast_len,
-                "supplier_reliability": [supplierReliability] * forecast_len,
-                "delivery_time_days": [deliveryTimeDays] * forecast_len,
-                "contractor_team_size": [contractorTeamSize] * forecast_len,
-                "project_budget": [projectBudget] * forecast_len,
-                "weather": [weather] * forecast_len,
-                "region_risk": [region_risk] * forecast_len,
-                "notes": [notes] * forecast_len,
-                "project_name": [projectName] * forecast_len,
-                "project_type": [projectType] * forecast_len,
-                "location": [location] * forecast_len,
-                "start_date": [startDate] * forecast_len,
-                "end_date": [endDate] * forecast_len,
-                "forecasted_demand": forecast_df["yhat"].values if "yhat" in forecast_df.columns else forecast_df.iloc[:, 1].values
-            })
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Project context DF build failed for {mat}: {e}")
+# --- Streamed dashboard: one frame per material as soon as its forecast is ready ---
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
 
-        # --- Generate recommendations (supports both tuple and single-return implementations) ---
-        try:
-            rec_out = generate_procurement_recommendations(
-                forecast_df=forecast_df,
-                current_project_data=current_project_data,
-                lead_time_days=lead_time_days,
-                current_inventory=current_inventory
-            )
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Recommendation failed for {mat}: {e}")
+def stream_frame(event: str, payload: dict, fmt: str) -> str:
+    data = json.dumps(jsonable_encoder({"type": event, **payload}), default=str)
+    if fmt == "sse":
+        return f"event: {event}\ndata: {data}\n\n"
+    return data + "\n"
 
-        # handle cases: function can return (rec_df, bulk_df) or just rec_df
-        rec_df = pd.DataFrame()
-        bulk_orders_df = pd.DataFrame()
-        if isinstance(rec_out, tuple) or isinstance(rec_out, list):
-            # expect (rec_df, bulk_orders_df)
+@app.post("/dashboard-data/stream")
+def dashboard_data_stream(
+    filename: str = Form(...),
+    materials: str = Form("[]"),
+    horizon_months: int = Form(6),
+    engine: str = Form(DEFAULT_ENGINE),
+    granularity: str = Form(DEFAULT_GRANULARITY),
+    lead_time_days: int = Form(10),
+    current_inventory: float = Form(0.0),
+    supplierReliability: float = Form(100.0),
+    projectBudget: float = Form(0.0),
+    weather: str = Form(""),
+    service_level: float = Form(DEFAULT_SERVICE_LEVEL),
+    format: str = Form("ndjson")
+):
+    """
+    Streaming /dashboard-data. Frames, as NDJSON lines or server-sent events (format=sse):
+      - "start":    materials about to be processed
+      - "material": forecast, recommendations, historical, safety_stock of one material,
+                    sent as soon as that material is done (cache hits first, then in fit order)
+      - "error":    a material whose forecast failed
+      - "summary":  summary (insights, feature importance), bulk_orders, advice,
+                    forecast_cached and errors once every material is in
+    """
+    filepath = os.path.join(UPLOAD_DIR, filename)
+    if not os.path.exists(filepath):
+        raise HTTPException(status_code=404, detail="CSV file not found")
+    check_forecast_options(engine, granularity)
+    if not 0 < service_level < 1:
+        raise HTTPException(status_code=400, detail="service_level must be between 0 and 1")
+    fmt = format.strip().lower()
+    if fmt not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}'. Expected one of: {list(STREAM_FORMATS)}")
+
+    ctx = dashboard_context(filepath, materials, lead_time_days, current_inventory, supplierReliability)
+    tasks = [(mat, horizon_months) for mat in ctx["materials"]]
+
+    def frames():
+        started = time.perf_counter()
+        yield stream_frame("start", {"materials": ctx["materials"]}, fmt)
+        sections = [None] * len(tasks)
+        forecast_cached = {}
+        errors = []
+        for i, result in iter_forecast_materials(None, tasks, series_index=ctx["series_index"],
+                                                 dataset_key=ctx["dataset_key"], engine=engine,
+                                                 granularity=granularity):
+            mat = tasks[i][0]
+            forecast_cached[mat] = result["cached"]
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            if result["error"]:
+                errors.append({"material": mat, "error": result["error"]})
+                yield stream_frame("error", {"material": mat, "error": result["error"], "elapsed_ms": elapsed_ms}, fmt)
+                continue
             try:
-                rec_df = rec_out[0] if rec_out[0] is not None else pd.DataFrame()
-                bulk_orders_df = rec_out[1] if len(rec_out) > 1 and rec_out[1] is not None else pd.DataFrame()
-            except Exception:
-                # fallback if returned weird object
-                if hasattr(rec_out, "to_dict"):
-                    rec_df = pd.DataFrame(rec_out)
-                else:
-                    rec_df = pd.DataFrame()
-        else:
-            # single return (DataFrame-like)
+                sections[i] = material_section(mat, result["forecast"], ctx["series_index"], ctx["params"],
+                                               ctx["lead_table"], ctx["signals"], service_level)
+            except Exception as e:
+                errors.append({"material": mat, "error": f"Recommendation failed: {e}"})
+                yield stream_frame("error", {"material": mat, "error": errors[-1]["error"], "elapsed_ms": elapsed_ms}, fmt)
+                continue
+            section = {k: v for k, v in sections[i].items() if k not in ("rec_df", "feature_scores")}
+            yield stream_frame("material", {**section, "cached": result["cached"], "elapsed_ms": elapsed_ms}, fmt)
+
+        # summary in request order, same as /dashboard-data
+        done = [sec for sec in sections if sec is not None]
+        summary, bulk_orders = dashboard_summary(done, supplierReliability, weather, projectBudget, lead_time_days)
+        yield stream_frame("summary", {
+            "summary": summary,
+            "bulk_orders": bulk_orders,
+            "advice": [],
+            "forecast_cached": {mat: forecast_cached[mat] for mat, _ in tasks if mat in forecast_cached},
+            "errors": errors,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }, fmt)
+
+    return StreamingResponse(frames(), media_type=STREAM_FORMATS[fmt],
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# --- Background jobs (submit now, poll for the result) ---
+JOB_HANDLERS = {
+    "forecast": forecast,
+    "recommendation": recommend_procurement,
+    "dashboard-data": dashboard_data,
+}
+FORM_CASTS = {
+    int: int,
+    float: float,
+    bool: lambda v: str(v).strip().lower() in ("1", "true", "yes", "on"),
+}
+
+def form_kwargs(handler, form) -> dict:
+    """Keyword arguments for an endpoint function from submitted form fields, with its Form defaults."""
+    kwargs = {}
+    for name, param in inspect.signature(handler).parameters.items():
+        if param.annotation is Response:
+            kwargs[name] = Response()
+            continue
+        if name in form:
             try:
-                rec_df = rec_out if isinstance(rec_out, pd.DataFrame) else pd.DataFrame(rec_out)
-            except Exception:
-                rec_df = pd.DataFrame()
-
-        # Make sure forecasted_demand exists in rec_df (rename if necessary)
-        if "yhat" in rec_df.columns and "forecasted_demand" not in rec_df.columns:
-            rec_df = rec_df.rename(columns={"yhat": "forecasted_demand"})
-        if "recommended_order_quantity" not in rec_df.columns and "recommended_order_quantity" in rec_df.columns:
-            pass  # already good
-        # If recommended_order_quantity missing but 'recommended_order' exists (older keys), try rename
-        if "recommended_order_quantity" not in rec_df.columns and "recommended_order" in rec_df.columns:
-            rec_df = rec_df.rename(columns={"recommended_order": "recommended_order_quantity"})
-
-        # --- Post-process rec_df: urgency & insight_reason (safe defaults) ---
-        if not rec_df.empty:
-            # ensure numeric forecasted_demand column
-            rec_df["forecasted_demand"] = pd.to_numeric(rec_df["forecasted_demand"].fillna(0), errors="coerce").fillna(0)
-            rec_df["recommended_order_quantity"] = pd.to_numeric(rec_df.get("recommended_order_quantity", 0), errors="coerce").fillna(0)
-
-            rec_df["urgency"] = rec_df.apply(
-                lambda row: "critical"
-                if current_inventory < row["forecasted_demand"] * 0.5
-                else ("urgent" if current_inventory < row["forecasted_demand"] * 1.2 else "ok"),
-                axis=1,
-            )
-
-            rec_df["insight_reason"] = rec_df["urgency"].map({
-                "critical": "Low stock vs forecast",
-                "urgent": "Stock nearing forecast threshold",
-                "ok": "Inventory level sufficient"
-            })
+                kwargs[name] = FORM_CASTS.get(param.annotation, str)(form[name])
+            except ValueError:
+                raise HTTPException(status_code=422, detail=f"Invalid value for '{name}': {form[name]!r}")
+        elif getattr(param.default, "is_required", lambda: False)():
+            raise HTTPException(status_code=422, detail=f"Missing form field '{name}'")
         else:
-            # keep structure consistent
-            rec_df = pd.DataFrame(columns=["material", "forecast_date", "forecasted_demand",
-                                           "recommended_order_quantity", "recommended_order_date",
-                                           "urgency", "insight_reason"])
-
-        # attach material column to rec_df if missing
-        if "material" not in rec_df.columns:
-            rec_df["material"] = mat
-
-        # --- Append outputs to accumulators ---
-        all_forecasts += forecast_df.to_dict(orient="records")
-        all_recs += rec_df.to_dict(orient="records")
-
-        if bulk_orders_df is not None and not bulk_orders_df.empty:
-            # annotate related materials for the bulk order
-            bulk_orders_df = bulk_orders_df.copy()
-            bulk_orders_df["related_materials"] = ", ".join(current_project_data["material"].unique())
-            all_bulk_orders += bulk_orders_df.to_dict(orient="records")
-
-        # --- Historical aggregation for this material (monthly) ---
-        try:
-            # normalize date column names (accept both spelled variants)
-            df_local = df_hist_raw.copy()
-            if "Date_of_Material_Usage" in df_local.columns:
-                df_local = df_local.rename(columns={"Date_of_Material_Usage": "date"})
-            elif "Date_of_Materail_Usage" in df_local.columns:
-                df_local = df_local.rename(columns={"Date_of_Materail_Usage": "date"})
-
-            df_local["date"] = pd.to_datetime(df_local["date"], errors="coerce")
-            df_local["Quantity_Used"] = pd.to_numeric(df_local.get("Quantity_Used", 0), errors="coerce").fillna(0)
-            df_local["Material_Name"] = df_local["Material_Name"].astype(str).str.strip().str.lower()
-
-            mat_lower = mat.strip().lower()
-            df_mat = df_local[df_local["Material_Name"] == mat_lower]
-
-            if not df_mat.empty:
-                hist_monthly = df_mat.set_index("date").resample('M')["Quantity_Used"].sum().reset_index()
-                hist_monthly.rename(columns={"Quantity_Used": "quantity"}, inplace=True)
-                # attach material to each row for frontend convenience
-                for row in hist_monthly.to_dict(orient="records"):
-                    row["material"] = mat
-                    all_hist.append(row)
-            else:
-                print(f"⚠️ No historical data found for {mat}")
-        except Exception as e:
-            print(f"❌ Historical aggregation failed for {mat}: {e}")
+            kwargs[name] = getattr(param.default, "default", param.default)
+    return kwargs
 
-        # --- Feature importance heuristics for this material (safe/simple) ---
-        try:
-            # seasonality: compare month-to-month variance vs overall variance
-            season_score = 0.0
-            if "forecast_date" in forecast_df.columns and not forecast_df["forecast_date"].isna().all():
-                f = forecast_df.copy()
-                f["forecast_date"] = pd.to_datetime(f["forecast_date"], errors="coerce")
-                f["month"] = f["forecast_date"].dt.month
-                month_means = f.groupby("month")["yhat"].mean()
-                if not month_means.empty:
-                    season_score = float(min(1.0, (month_means.std() / (month_means.mean() + 1e-6)) ))
-            # past consumption: correlation of lag-1 (autocorr) as proxy
-            past_score = 0.0
-            if not df_mat.empty:
-                q = df_mat.sort_values("date")["quantity"] if "quantity" in locals() else df_mat.sort_values("date")["Quantity_Used"]
-                if len(q) >= 3:
-                    past_score = abs(q.pct_change().fillna(0).autocorr(lag=1)) if hasattr(q.pct_change(), "autocorr") else float(min(1.0, q.std() / (q.mean() + 1e-6)))
-                else:
-                    past_score = 0.1
-            # supplier reliability: use provided supplierReliability value if present in matObj or current_project_data
-            supplier_score = 0.0
-            if ("Supplier_Reliability_Score" in df_local.columns) or ("supplier_reliability" in current_project_data.columns):
-                try:
-                    sr_vals = pd.to_numeric(df_local.get("Supplier_Reliability_Score", pd.Series([supplierReliability])), errors="coerce").fillna(supplierReliability)
-                    supplier_score = float(min(1.0, (100.0 - sr_vals.mean()) / 100.0))  # more unreliability increases importance
-                except Exception:
-                    supplier_score = 0.1
-            # weather/regional risk: check if columns exist and have variance
-            weather_score = 0.0
-            if "Weather_Condition" in df_local.columns:
-                weather_score = 0.2
-            regional_score = 0.0
-            if "Regional_Risk_Level" in df_local.columns:
-                regional_score = 0.1
-
-            # clamp and accumulate
-            feature_scores_acc["seasonality"].append(max(0.0, min(1.0, season_score)))
-            feature_scores_acc["past_consumption"].append(max(0.0, min(1.0, past_score)))
-            feature_scores_acc["supplier_reliability"].append(max(0.0, min(1.0, supplier_score)))
-            feature_scores_acc["weather"].append(max(0.0, min(1.0, weather_score)))
-            feature_scores_acc["regional_risk"].append(max(0.0, min(1.0, regional_score)))
-        except Exception as e:
-            print(f"❌ Feature importance calc failed for {mat}: {e}")
-            # append small defaults
-            feature_scores_acc["seasonality"].append(0.1)
-            feature_scores_acc["past_consumption"].append(0.1)
-            feature_scores_acc["supplier_reliability"].append(0.05)
-            feature_scores_acc["weather"].append(0.05)
-            feature_scores_acc["regional_risk"].append(0.02)
-
-    # --- Inventory optimization insights (aggregate) ---
-    # Use get with defaults to avoid KeyError if structure changed upstream
-    total_forecast = sum([r.get("forecasted_demand", 0) for r in all_recs]) if all_recs else 0
-    total_recommended = sum([r.get("recommended_order_quantity", 0) for r in all_recs]) if all_recs else 0
-
-    insights = []
-    if total_recommended > total_forecast and total_forecast > 0:
-        insights.append("Bulk orders exceed forecast — consider splitting orders or adjusting suppliers.")
-    if any(r.get("urgency") == "critical" for r in all_recs):
-        insights.append("⚠️ Some materials are critically low — prioritize replenishment.")
-    if supplierReliability < 80:
-        insights.append("Supplier reliability below 80% — add safety stock.")
-    if str(weather).lower() in ["rainy", "humid"]:
-        insights.append("Weather/region risk high — allow for delivery delays.")
-    if not insights:
-        insights.append("Looks good. Monitor monthly usage and supplier performance.")
-
-    # --- Aggregate feature importance across materials (average & normalize to percent) ---
-    def avg_safe(lst):
-        return float(sum(lst) / len(lst)) if lst else 0.0
-
-    raw_scores = {
-        "seasonality": avg_safe(feature_scores_acc["seasonality"]),
-        "past_consumption": avg_safe(feature_scores_acc["past_consumption"]),
-        "supplier_reliability": avg_safe(feature_scores_acc["supplier_reliability"]),
-        "weather": avg_safe(feature_scores_acc["weather"]),
-        "regional_risk": avg_safe(feature_scores_acc["regional_risk"])
-    }
-    # normalize to 100%
-    total_raw = sum(raw_scores.values()) or 1.0
-    feature_importance = { 
-        "Seasonality": round((raw_scores["seasonality"] / total_raw) * 100, 1),
-        "Past Consumption": round((raw_scores["past_consumption"] / total_raw) * 100, 1),
-        "Supplier Reliability": round((raw_scores["supplier_reliability"] / total_raw) * 100, 1),
-        "Weather Impact": round((raw_scores["weather"] / total_raw) * 100, 1),
-        "Regional Risk": round((raw_scores["regional_risk"] / total_raw) * 100, 1)
-    }
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found (unknown or expired)")
+    return job
 
-    # --- Final summary (preserve your previous fields) ---
-    summary = {
-        "total_forecast_tons": round(total_forecast, 2),
-        "total_recommended_tons": round(total_recommended, 2),
-        "avg_supplier_reliability": supplierReliability,
-        "budget": projectBudget,
-        "lead_time_days": lead_time_days,
-        "insights": insights,
-        "feature_importance": feature_importance  # keep it inside summary
-        }
+@app.post("/jobs/{kind}", status_code=202)
+async def submit_job(kind: str, request: Request):
+    """
+    Queue a forecast, recommendation or dashboard-data computation.
+    Takes the same form fields as the synchronous endpoint and returns a job id at once.
+    """
+    handler = JOB_HANDLERS.get(kind)
+    if handler is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job kind '{kind}'. Expected one of: {list(JOB_HANDLERS)}")
+    form = await request.form()
+    kwargs = form_kwargs(handler, form)
+    if not os.path.exists(os.path.join(UPLOAD_DIR, kwargs["filename"])):
+        raise HTTPException(status_code=404, detail="CSV file not found")
+    check_forecast_options(kwargs["engine"], kwargs["granularity"])
 
-    print("🔥 Feature Importance Computed:", feature_importance)
-    # ✅ Return regular FastAPI dict (not jsonify!)
-    advice = [] #placeholder
+    params = {k: v for k, v in kwargs.items() if not isinstance(v, Response)}
+    try:
+        job = job_queue.submit(kind, handler, params=params, **kwargs)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     return {
-        "forecast": all_forecasts,
-        "recommendations": all_recs,
-        "bulk_orders": all_bulk_orders,
-        "historical": all_hist,
-        "summary": summary,
-        "advice": advice
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "result_url": f"/jobs/{job.id}/result",
     }
 
+@app.get("/jobs")
+def list_jobs(kind: Optional[str] = None):
+    return {"jobs": job_queue.list(kind), "stats": job_queue.stats()}
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    return get_job(job_id).to_dict()
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    """The job's result once done; 409 while it is queued/running, 410 if cancelled, the job's error if it failed."""
+    job = get_job(job_id)
+    if job.status == DONE:
+        return job.result
+    if job.status == FAILED:
+        raise HTTPException(status_code=job.error_status or 500, detail=job.error)
+    if job.status == CANCELLED:
+        raise HTTPException(status_code=410, detail="Job was cancelled")
+    raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    get_job(job_id)
+    return job_queue.cancel(job_id).to_dict()
+
 @app.post("/smart-alert")
 def smart_alert(
     projectName: str = Form(...),
@@ -751,6 +893,23 @@ def smart_alert_v3(payload: dict = Body(...)):
     except Exception as e:
         return {"error": str(e)}
 
+@app.post("/smart-alert-v3/batch")
+def smart_alert_v3_batch(payload: dict = Body(...)):
+    """
+    Portfolio alert endpoint: risk for many sites at once.
+    Expects {"projects": [<smart-alert-v3 payload>, ...]}; results keep the input order.
+    """
+    projects = payload.get("projects")
+    if not isinstance(projects, list) or not all(isinstance(p, dict) for p in projects):
+        raise HTTPException(status_code=400, detail="'projects' must be a list of project objects")
+    if len(projects) > MAX_ALERT_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_ALERT_BATCH} projects per batch")
+    try:
+        results = predict_risk_batch(projects)
+        return {"count": len(results), "results": results}
+    except Exception as e:
+        return {"error": str(e)}
+
 @app.post("/smart-ai-alert")
 def smart_ai_alert(payload: dict = Body(...)):
     """
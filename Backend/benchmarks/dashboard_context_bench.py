@@ -0,0 +1,104 @@
+# backend/benchmarks/dashboard_context_bench.py
+# Usage (from Backend/):  python benchmarks/dashboard_context_bench.py [--rows N] [--csv PATH]
+#                             [--no-artifact] [--out-of-core]
+# Time and peak memory of the per-upload inputs /dashboard-data needs (series index, lead time
+# table, supplier signals) on a large upload:
+#   full     load the whole canonical frame, then derive everything from it (the old path)
+#   summary  series index + upload_summary(): only the columns the aggregates need
+# Each mode runs in a fresh process so peak RSS isn't shared. Without --csv a synthetic
+# upload of --rows rows (default 1,000,000) is generated in a temp dir. --out-of-core sets
+# OUT_OF_CORE_MIN_BYTES=0, i.e. behaves as uploads above that threshold do.
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND)
+
+MATERIALS = ["Cement", "Sand", "Steel Rods", "Bricks", "Gravel", "Concrete", "Tiles", "Paint"]
+
+
+def make_upload(path: str, rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 3 * 365, rows), unit="D")
+    pd.DataFrame({
+        "Project_ID": rng.integers(1, 500, rows),
+        "Material_Name": rng.choice(MATERIALS, rows),
+        "Quantity_Used": rng.integers(1, 500, rows),
+        "Planned_Quantity": rng.integers(100, 5000, rows),
+        "Supplier_Name": rng.choice(["UltraTech", "ACC", "Tata Steel", "JSW"], rows),
+        "Supplier_Reliability_Score": np.round(rng.uniform(5, 10, rows), 1),
+        "Average_Delivery_Time_Days": rng.integers(1, 15, rows),
+        "Delivery_Delays": rng.integers(0, 5, rows),
+        "Weather_Condition": rng.choice(["Sunny", "Rainy", "Cloudy"], rows),
+        "Regional_Risk_Level": rng.choice(["Low", "Medium", "High"], rows),
+        "Notes_Special_Conditions": rng.choice(["", "Pouring delays due to rain", "Night shift"], rows),
+        "Date_of_Material_Usage": dates.strftime("%Y-%m-%d"),
+    }).to_csv(path, index=False)
+
+
+def peak_rss_mb() -> float:
+    """High-water RSS of this process (VmHWM; unlike ru_maxrss it isn't inherited from the parent)."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def run_mode(mode: str, csv_path: str) -> dict:
+    from ml.dataset import get_dataset, get_series_index
+    from ml.dashboard import upload_summary, upload_signals
+    from ml.safety_stock import lead_time_table
+
+    base = peak_rss_mb()
+    started = time.perf_counter()
+    if mode == "full":
+        df = get_dataset(csv_path)
+        get_series_index(csv_path)
+        lead_time_table(df)
+        scores = pd.to_numeric(df["Supplier_Reliability_Score"], errors="coerce").fillna(90.0)
+        float(min(1.0, (100.0 - scores.mean()) / 100.0))
+    else:
+        get_series_index(csv_path)
+        upload_signals(upload_summary(csv_path), 90.0)
+    return {
+        "mode": mode,
+        "seconds": round(time.perf_counter() - started, 2),
+        "peak_rss_delta_mb": round(peak_rss_mb() - base),
+    }
+
+
+if __name__ == "__main__":
+    os.chdir(BACKEND)
+    if "--run" in sys.argv:  # child process: one mode, result as JSON on the last line
+        print(json.dumps(run_mode(sys.argv[sys.argv.index("--run") + 1], sys.argv[-1])))
+        sys.exit(0)
+
+    rows = int(sys.argv[sys.argv.index("--rows") + 1]) if "--rows" in sys.argv else 1_000_000
+    workdir = tempfile.mkdtemp(prefix="dashboard_bench_")
+    try:
+        csv_path = os.path.join(workdir, "upload.csv")
+        if "--csv" in sys.argv:
+            shutil.copy(sys.argv[sys.argv.index("--csv") + 1], csv_path)
+        else:
+            make_upload(csv_path, rows)
+        if "--no-artifact" not in sys.argv:
+            from ml.dataset import build_artifact
+            build_artifact(csv_path)  # what /upload-data leaves next to the CSV
+        size_mb = os.path.getsize(csv_path) / 1e6
+        print(f"upload: {sum(1 for _ in open(csv_path, encoding='latin-1')) - 1} rows, {size_mb:.0f} MB")
+        env = dict(os.environ, **({"OUT_OF_CORE_MIN_BYTES": "0"} if "--out-of-core" in sys.argv else {}))
+        for mode in ("full", "summary"):
+            out = subprocess.run([sys.executable, __file__, "--run", mode, csv_path],
+                                 capture_output=True, text=True, check=True, env=env).stdout
+            print(json.loads(out.strip().splitlines()[-1]))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
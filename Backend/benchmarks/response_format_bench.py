@@ -0,0 +1,95 @@
+# backend/benchmarks/response_format_bench.py
+# Usage (from Backend/):  python benchmarks/response_format_bench.py [--csv PATH] [--rows N] [--repeat N]
+# Payload size and serialization time of /dashboard-data, format=records vs format=columnar,
+# for a multi-material dashboard at monthly and daily granularity:
+#   body       JSON bytes as sent without compression
+#   gzip       bytes on the wire with GZipMiddleware
+#   serialize  median ms to encode the payload: jsonable_encoder + json.dumps (what FastAPI
+#              does for records) vs columnarize + encode_json
+# Runs in a temp working dir, so forecasts / model files the app writes don't touch the repo.
+# Without --csv a synthetic upload of --rows rows (default 200,000) is generated.
+import io
+import os
+import sys
+import gzip
+import json
+import time
+import contextlib
+import shutil
+import tempfile
+
+import numpy as np
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND)
+
+from dashboard_context_bench import make_upload, MATERIALS  # noqa: E402
+
+DASHBOARD_MATERIALS = MATERIALS[:6]
+
+
+def median_ms(fn, repeat: int) -> float:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return float(np.median(samples))
+
+
+def row_counts(payload: dict) -> str:
+    return ", ".join(f"{len(payload[k])} {k}" for k in ("forecast", "recommendations", "historical"))
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[sys.argv.index("--repeat") + 1]) if "--repeat" in sys.argv else 15
+    rows = int(sys.argv[sys.argv.index("--rows") + 1]) if "--rows" in sys.argv else 200_000
+    workdir = tempfile.mkdtemp(prefix="response_bench_")
+    try:
+        os.makedirs(os.path.join(workdir, "data", "uploads"))
+        csv_path = os.path.join(workdir, "data", "uploads", "bench.csv")
+        if "--csv" in sys.argv:
+            shutil.copy(sys.argv[sys.argv.index("--csv") + 1], csv_path)
+        else:
+            make_upload(csv_path, rows)
+        os.chdir(workdir)
+
+        from fastapi.testclient import TestClient
+        from fastapi.encoders import jsonable_encoder
+        import app as appmod
+        from ml.serialize import columnarize, encode_json
+
+        # keep the Python payload /dashboard-data hands to format_response()
+        captured = {}
+        format_response = appmod.format_response
+
+        def capture(payload, fmt, response=None):
+            captured["payload"] = payload
+            return format_response(payload, fmt, response)
+
+        appmod.format_response = capture
+        client = TestClient(appmod.app)
+
+        for granularity in ("monthly", "daily"):
+            form = dict(filename="bench.csv", materials=json.dumps(DASHBOARD_MATERIALS), engine="holt_winters",
+                        granularity=granularity, current_inventory="800", supplierReliability="90")
+            sizes = {}
+            for fmt in ("records", "columnar"):
+                with contextlib.redirect_stdout(io.StringIO()):  # the endpoint's progress prints
+                    r = client.post("/dashboard-data", data={**form, "format": fmt},
+                                    headers={"Accept-Encoding": "identity"})
+                r.raise_for_status()
+                sizes[fmt] = (len(r.content), len(gzip.compress(r.content)))
+            payload = captured["payload"]
+            records_ms = median_ms(lambda: json.dumps(jsonable_encoder(payload)), repeat)
+            columnar_ms = median_ms(lambda: encode_json(columnarize(payload)), repeat)
+
+            print(f"{granularity} ({row_counts(payload)} rows)")
+            print(f"  body:      {sizes['records'][0]:>9,} -> {sizes['columnar'][0]:>9,} bytes "
+                  f"({sizes['columnar'][0] / sizes['records'][0]:.1%})")
+            print(f"  gzip:      {sizes['records'][1]:>9,} -> {sizes['columnar'][1]:>9,} bytes")
+            print(f"  serialize: {records_ms:>9.1f} -> {columnar_ms:>9.1f} ms")
+    finally:
+        os.chdir(BACKEND)
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,54 @@
+# backend/benchmarks/risk_compiled_bench.py
+# Usage (from Backend/):  python benchmarks/risk_compiled_bench.py [--model PATH] [--repeat N]
+# Microbenchmark of risk scoring: sklearn pipeline (DataFrame in) vs CompiledRiskModel
+# (feature dicts in) at the batch sizes the alert endpoints use. Without --model the
+# pipeline is fitted on synthetic data by tests/risk_pipeline.py.
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND)
+sys.path.append(os.path.join(BACKEND, "tests"))
+
+from ml.risk_compiled import compile_pipeline, CompiledRiskModel  # noqa: E402
+from risk_pipeline import fit_synthetic_pipeline, synthetic_rows, NUM_FEATURES, CAT_FEATURES  # noqa: E402
+
+BATCH_SIZES = [1, 8, 64, 256, 1000]
+
+
+def timed_ms(fn, repeat: int) -> float:
+    """Median wall time of fn() in milliseconds (one untimed warm-up call first)."""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return float(np.median(samples))
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[sys.argv.index("--repeat") + 1]) if "--repeat" in sys.argv else 50
+    if "--model" in sys.argv:
+        path = sys.argv[sys.argv.index("--model") + 1]
+        model = joblib.load(path)
+        print(f"📦 Loaded {path}")
+    else:
+        model = fit_synthetic_pipeline()
+        print("🧪 Fitted a synthetic risk pipeline")
+    compiled = CompiledRiskModel(compile_pipeline(model))
+    X_all = synthetic_rows(max(BATCH_SIZES), seed=7)
+
+    print(f"{'rows':>6} {'pipeline ms':>12} {'compiled ms':>12} {'speedup':>8}")
+    for n in BATCH_SIZES:
+        rows = X_all.iloc[:n].to_dict("records")
+        # the alert engine starts from feature dicts, so the pipeline pays for the DataFrame too
+        pipeline_ms = timed_ms(lambda: model.predict_proba(pd.DataFrame(rows, columns=NUM_FEATURES + CAT_FEATURES)),
+                               repeat)
+        compiled_ms = timed_ms(lambda: compiled.predict_proba(rows), repeat)
+        print(f"{n:>6} {pipeline_ms:>12.3f} {compiled_ms:>12.3f} {pipeline_ms / compiled_ms:>7.1f}x")
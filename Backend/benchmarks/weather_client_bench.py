@@ -0,0 +1,62 @@
+# backend/benchmarks/weather_client_bench.py
+# Usage (from Backend/):  python benchmarks/weather_client_bench.py [--calls N] [--sites N] [--latency S]
+# Throughput of the Open-Meteo client against the local mock server from tests/weather_stub.py
+# (plain HTTP, so TLS handshake savings aren't included):
+#   sequential  one lookup at a time: new connection per call (requests.get) vs the pooled session
+#   batch       --sites locations with --latency seconds upstream: one by one vs fetch_many()
+#               at a few concurrency limits
+import os
+import sys
+import time
+
+import requests
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND)
+sys.path.append(os.path.join(BACKEND, "tests"))
+
+from ml.weather_client import WeatherClient, summarize  # noqa: E402
+from weather_stub import MeteoStub  # noqa: E402
+
+
+def arg(name: str, default):
+    return type(default)(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+
+def per_call_ms(fn, calls: int) -> float:
+    fn(0)
+    started = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - started) * 1000 / calls
+
+
+if __name__ == "__main__":
+    calls, sites, latency = arg("--calls", 500), arg("--sites", 50), arg("--latency", 0.05)
+    stub = MeteoStub().start()
+    try:
+        client = WeatherClient(stub.url)
+        params = WeatherClient._params
+
+        def unpooled(i):
+            summarize(requests.get(stub.url, params=params(10, 20), timeout=5).json())
+
+        print(f"sequential, 0 ms upstream ({calls} calls)")
+        print(f"  new connection per call: {per_call_ms(unpooled, calls):6.2f} ms/call")
+        print(f"  pooled session:          {per_call_ms(lambda i: client.fetch(10, 20), calls):6.2f} ms/call")
+
+        stub.latency = latency
+        coords = [(i * 0.5, i * 0.5) for i in range(sites)]
+        print(f"batch of {sites} sites, {latency * 1000:.0f} ms upstream")
+        started = time.perf_counter()
+        for lat, lon in coords:
+            client.fetch(lat, lon)
+        print(f"  one by one:              {time.perf_counter() - started:6.2f} s")
+        for concurrency in (4, 8, 16):
+            started = time.perf_counter()
+            results = client.fetch_many(coords, concurrency=concurrency)
+            failed = sum(isinstance(r, Exception) for r in results)
+            print(f"  fetch_many x{concurrency:<2}:          {time.perf_counter() - started:6.2f} s"
+                  + (f" ({failed} failed)" if failed else ""))
+    finally:
+        stub.stop()
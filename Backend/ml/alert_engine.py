@@ -2,17 +2,23 @@
 import os
 import json
 import time
-import joblib
-import requests
 import pandas as pd
 import numpy as np
 from difflib import get_close_matches
 from ml.ai_context_engine import ask_openai
-
-# ========== MODEL PATHS ==========
-RISK_MODEL_PATH = "ml/models/risk_assessor_v3.joblib"
-RECOVERY_MODEL_PATH = "ml/models/recovery_advisor_v3.joblib"
+from ml.weather_cache import WeatherCache
+from ml.weather_client import WeatherClient
+from ml.risk_compiled import CompiledRiskModel
+from ml.model_registry import model_registry
+
+# ========== MODELS (ml/models/<name>_v<version>.joblib|npz, see ml/model_registry.py) ==========
+RISK_MODEL = "risk_assessor"          # sklearn pipeline (.joblib) + its NumPy export (.npz, ml/risk_compiled.py)
+RECOVERY_MODEL = "recovery_advisor"
+RISK_COMPILED = os.getenv("RISK_COMPILED", "1") == "1"
+# above this many rows sklearn's Cython tree walk beats the NumPy one
+RISK_COMPILED_MAX_ROWS = int(os.getenv("RISK_COMPILED_MAX_ROWS", "256"))
 INCIDENT_LOG = "data/incidents.json"
+OPEN_METEO_URL = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
 
 os.makedirs(os.path.dirname(INCIDENT_LOG), exist_ok=True)
 
@@ -25,43 +31,70 @@ KNOWN_PHASES = [
 
 KNOWN_STRUCTURES = ["building", "bridge", "road", "dam", "tunnel", "warehouse"]
 
-# Load models if available
-risk_model = joblib.load(RISK_MODEL_PATH) if os.path.exists(RISK_MODEL_PATH) else None
-recovery_model = joblib.load(RECOVERY_MODEL_PATH) if os.path.exists(RECOVERY_MODEL_PATH) else None
+# Models load lazily (memory-mapped) on first use and hot-swap when a new version lands
+model_registry.register(RISK_MODEL, "npz", CompiledRiskModel)
+_stale_exports = set()
+
+
+def risk_pipeline():
+    return model_registry.get(RISK_MODEL)
+
+
+def recovery_model():
+    return model_registry.get(RECOVERY_MODEL)
+
+
+def compiled_risk_model():
+    """Compiled risk model, only if it was exported from the current joblib pipeline."""
+    source = model_registry.info(RISK_MODEL)
+    export = model_registry.info(RISK_MODEL, "npz")
+    if not RISK_COMPILED or source is None or export is None:
+        return None
+    try:
+        compiled = model_registry.get(RISK_MODEL, "npz")
+    except Exception:
+        return None
+    if compiled.source_sha256 != source.sha256:
+        if (source.path, source.mtime, export.mtime) not in _stale_exports:
+            _stale_exports.add((source.path, source.mtime, export.mtime))
+            print("⚠️ Compiled risk model is stale (run ml/risk_model_train.py --export-only); using the sklearn pipeline")
+        return None
+    return compiled
 
 
 # ---------------- WEATHER FETCH ----------------
+# one pooled client and one cache for every caller: predict_risk, generate_recovery_plan, ai_dynamic_risk_analysis
+weather_client = WeatherClient(OPEN_METEO_URL)
+weather_cache = WeatherCache(weather_client.fetch)
+
+
+def fallback_weather():
+    """Random realistic defaults when live weather is unavailable."""
+    return {
+        "temperature": 28 + np.random.uniform(-3, 3),
+        "rain": np.random.uniform(0, 10),
+        "humidity": 60 + np.random.uniform(-10, 10),
+        "wind": 8 + np.random.uniform(-3, 3)
+    }
+
+
 def fetch_weather(lat, lon):
-    """Fetch weather with safe fallback."""
+    """Fetch weather (cached per grid cell and hour) with safe fallback."""
     try:
-        url = (
-            f"https://api.open-meteo.com/v1/forecast?"
-            f"latitude={lat}&longitude={lon}&hourly=temperature_2m,precipitation,humidity_2m,wind_speed_10m"
-            f"&forecast_days=1"
-        )
-        r = requests.get(url, timeout=(3, 5))
-        data = r.json()
-        if "hourly" in data:
-            df = pd.DataFrame(data["hourly"])
-            next6 = df.tail(6)
-            return {
-                "temperature": float(next6["temperature_2m"].mean()),
-                "rain": float(next6["precipitation"].sum()),
-                "humidity": float(next6["humidity_2m"].mean()),
-                "wind": float(next6["wind_speed_10m"].mean()),
-            }
-        else:
-            raise KeyError("hourly key missing in response")
-
+        return weather_cache.get(lat, lon)
     except Exception as e:
         print("⚠️ Weather fetch failed:", e)
-        # fallback random realistic defaults
-        return {
-            "temperature": 28 + np.random.uniform(-3, 3),
-            "rain": np.random.uniform(0, 10),
-            "humidity": 60 + np.random.uniform(-10, 10),
-            "wind": 8 + np.random.uniform(-3, 3)
-        }
+        return fallback_weather()
+
+
+def fetch_weather_many(coords):
+    """fetch_weather for a list of (lat, lon); missing cells are fetched concurrently."""
+    results = weather_cache.get_many(list(coords), weather_client.fetch_many)
+    for i, weather in enumerate(results):
+        if isinstance(weather, BaseException):
+            print("⚠️ Weather fetch failed:", weather)
+            results[i] = fallback_weather()
+    return results
 
 
 # ---------------- NORMALIZATION ----------------
@@ -75,22 +108,15 @@ def normalize_text(text, known_list):
 
 
 # ---------------- RISK PREDICTION ----------------
-def predict_risk(project):
-    """
-    Predicts construction risk dynamically using weather + phase + structure + materials.
-    Auto-aligns with the trained pipeline's 7 input columns.
-    """
+RISK_FEATURES = ["temperature", "rain", "humidity", "wind", "materials_complexity", "phase", "structure"]
 
-    lat, lon = project.get("latitude"), project.get("longitude")
+
+def _risk_row(project, weather):
+    """(phase, structure, feature row) for one project — the 7 columns the pipeline was trained on."""
     phase = normalize_text(project.get("phase"), KNOWN_PHASES)
     struct = normalize_text(project.get("structure_type"), KNOWN_STRUCTURES)
     materials = project.get("materials", [])
-
-    # Fetch live weather
-    weather = fetch_weather(lat, lon)
-
-    # Build dynamic DataFrame with 7 columns (matching training)
-    features = pd.DataFrame([{
+    row = {
         "temperature": weather["temperature"],
         "rain": weather["rain"],
         "humidity": weather["humidity"],
@@ -98,26 +124,54 @@ def predict_risk(project):
         "materials_complexity": len(materials),
         "phase": phase,
         "structure": struct
-    }])
+    }
+    return phase, struct, row
 
-    if risk_model:
+
+def _risk_proba(rows):
+    """
+    (probabilities, classes) for feature rows. Small batches use the compiled model: same
+    probabilities as the pipeline, without the DataFrame / validation overhead.
+    """
+    compiled = compiled_risk_model()
+    if compiled is not None and len(rows) <= RISK_COMPILED_MAX_ROWS:
+        return compiled.predict_proba(rows), compiled.classes_
+    try:
+        pipeline = risk_pipeline()
+        return pipeline.predict_proba(pd.DataFrame(rows, columns=RISK_FEATURES)), pipeline.classes_
+    except Exception as e:
+        if compiled is None:
+            raise
+        print("⚠️ Pipeline predict failed, using the compiled model:", e)
+        return compiled.predict_proba(rows), compiled.classes_
+
+
+def _score_risk(rows, weathers, phases):
+    """[(label, confidence)] per feature row — one predict_proba call for the whole batch."""
+    if model_registry.info(RISK_MODEL):
         try:
-            pred = risk_model.predict(features)[0]
-            conf = float(np.max(risk_model.predict_proba(features)))
+            proba, classes = _risk_proba(rows)
+            # label = argmax class, exactly what predict() returns, without running the forest twice
+            labels = classes[np.argmax(proba, axis=1)]
+            return [(label, float(conf)) for label, conf in zip(labels, proba.max(axis=1))]
         except Exception as e:
             print("⚠️ Model predict failed:", e)
-            pred, conf = "Medium", 0.6
-    else:
-        # Heuristic fallback
+            return [("Medium", 0.6)] * len(rows)
+
+    # Heuristic fallback
+    scored = []
+    for weather, phase in zip(weathers, phases):
         score = 0
         if weather["rain"] > 20: score += 2
         if weather["humidity"] > 85: score += 2
         if weather["wind"] > 35: score += 1
         if "slab" in phase or "concrete" in phase: score += 1
         pred = "High" if score >= 4 else "Medium" if score >= 2 else "Low"
-        conf = 0.6 + score * 0.1
+        scored.append((pred, 0.6 + score * 0.1))
+    return scored
 
-    # Generate alert
+
+def _risk_alert(project, phase, struct, weather, pred, conf):
     # Generate alert
     if pred == "High" and weather["rain"] > 20:
         alert = f"🌧️ Rain forecasted near {project['location']}. Postpone {phase} work immediately."
@@ -139,6 +193,50 @@ def predict_risk(project):
         "recommended_action": "What to do next" if pred == "High" else "Acknowledge"
     }
 
+
+def predict_risk(project):
+    """
+    Predicts construction risk dynamically using weather + phase + structure + materials.
+    Auto-aligns with the trained pipeline's 7 input columns.
+    """
+    # Fetch live weather
+    weather = fetch_weather(project.get("latitude"), project.get("longitude"))
+    phase, struct, row = _risk_row(project, weather)
+    (pred, conf), = _score_risk([row], [weather], [phase])
+    return _risk_alert(project, phase, struct, weather, pred, conf)
+
+
+def predict_risk_batch(projects):
+    """
+    predict_risk for many projects: weather for all sites is fetched (or reused from
+    the cache) concurrently and the model scores every project in one call.
+    Results come back in input order; a project that can't be scored gets {"error": ...}.
+    """
+    results = [None] * len(projects)
+    coords = [(p.get("latitude"), p.get("longitude")) if isinstance(p, dict) else (None, None) for p in projects]
+    weathers = fetch_weather_many(coords)
+
+    # rows are built one by one: a malformed project only fails its own slot
+    valid, rows = [], []
+    for i, (project, weather) in enumerate(zip(projects, weathers)):
+        try:
+            if not isinstance(project, dict):
+                raise TypeError("project must be an object")
+            rows.append(_risk_row(project, weather))
+            valid.append(i)
+        except Exception as e:
+            results[i] = {"error": str(e) or type(e).__name__}
+
+    # only the valid rows are scored, then mapped back to their input positions
+    scored = _score_risk([row for _, _, row in rows], [weathers[i] for i in valid],
+                         [phase for phase, _, _ in rows]) if rows else []
+    for i, (phase, struct, _), (pred, conf) in zip(valid, rows, scored):
+        try:
+            results[i] = _risk_alert(projects[i], phase, struct, weathers[i], pred, conf)
+        except Exception as e:
+            results[i] = {"error": str(e) or type(e).__name__}
+    return results
+
 # ---------------- RECOVERY ADVICE ----------------
 def generate_recovery_plan(project, loss_report):
     """Suggest actions dynamically based on phase, structure, and weather"""
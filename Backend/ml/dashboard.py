@@ -0,0 +1,277 @@
+# backend/ml/dashboard.py
+"""
+Vectorized building blocks for /dashboard-data.
+
+Everything here works off data that is already aggregated once per upload
+(the SeriesIndex, upload_summary()) or computed once per request, so the dashboard does no
+per-material passes over the raw history. material_section() builds one
+material's part of the payload as soon as its forecast is ready (which is
+what the streaming endpoint sends per material); dashboard_summary() folds
+the sections into the cross-material totals, insights and bulk orders.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .dataset import dataset_key, get_columns, read_header
+from .recommendation import generate_procurement_recommendations_batch, consolidate_bulk_orders
+from .safety_stock import optimize_safety_stock, lead_time_samples, lead_time_table
+
+URGENCY_REASONS = {
+    "critical": "Low stock vs forecast",
+    "urgent": "Stock nearing forecast threshold",
+    "ok": "Inventory level sufficient",
+}
+# the only upload columns upload_summary() reads
+SUMMARY_COLS = ["Material_Name", "Average_Delivery_Time_Days", "Delivery_Delays", "Supplier_Reliability_Score"]
+UPLOAD_SUMMARIES = 8  # uploads whose summaries are kept
+# fallback per-material scores when a heuristic can't be computed
+FEATURE_DEFAULTS = {
+    "seasonality": 0.1,
+    "past_consumption": 0.1,
+    "supplier_reliability": 0.05,
+    "weather": 0.05,
+    "regional_risk": 0.02,
+}
+
+_summaries = OrderedDict()
+_summary_lock = threading.Lock()
+
+
+def classify_urgency(forecasted_demand, current_inventory: float) -> tuple:
+    """
+    critical: inventory below half the forecast, urgent: below 120% of it, ok otherwise.
+    Returns (urgency, insight_reason) arrays.
+    """
+    demand = np.asarray(forecasted_demand, dtype=float)
+    urgency = np.select(
+        [current_inventory < demand * 0.5, current_inventory < demand * 1.2],
+        ["critical", "urgent"],
+        default="ok",
+    )
+    reason = np.select(
+        [urgency == "critical", urgency == "urgent"],
+        [URGENCY_REASONS["critical"], URGENCY_REASONS["urgent"]],
+        default=URGENCY_REASONS["ok"],
+    )
+    return urgency, reason
+
+
+def historical_records(series_index, materials) -> list:
+    """Month-end usage rows (date, quantity, material) for all materials, from the index."""
+    frames = []
+    for mat in materials:
+        monthly = series_index.monthly(mat)
+        if monthly is None or monthly.empty:
+            print(f"⚠️ No historical data found for {mat}")
+            continue
+        frames.append(monthly.assign(material=mat))
+    if not frames:
+        return []
+    return pd.concat(frames, ignore_index=True).to_dict(orient="records")
+
+
+def upload_summary(csv_path: str) -> dict:
+    """
+    Material-independent aggregates of an upload (lead time table, supplier
+    reliability totals, which optional columns exist), memoized per dataset_key.
+    Only the few columns they need are read, never the full history.
+    """
+    key = dataset_key(csv_path)
+    with _summary_lock:
+        summary = _summaries.get(key)
+        if summary is not None:
+            _summaries.move_to_end(key)
+            return summary
+    df = get_columns(csv_path, SUMMARY_COLS)
+    sr = pd.to_numeric(df["Supplier_Reliability_Score"], errors="coerce") if "Supplier_Reliability_Score" in df.columns else None
+    summary = {
+        "columns": read_header(csv_path),
+        "rows": len(df),
+        "lead_table": lead_time_table(df),
+        # sum / count of the scores present; upload_signals() fills the gaps per request
+        "supplier_reliability": (float(sr.sum()), int(sr.count())) if sr is not None else None,
+    }
+    with _summary_lock:
+        _summaries[key] = summary
+        while len(_summaries) > UPLOAD_SUMMARIES:
+            _summaries.popitem(last=False)
+    return summary
+
+
+def upload_signals(summary: dict, supplier_reliability: float) -> dict:
+    """Scores that depend only on the upload, not on the material (computed once per request)."""
+    supplier_score = 0.0
+    try:
+        mean = supplier_reliability
+        if summary["supplier_reliability"] is not None:
+            total, count = summary["supplier_reliability"]
+            # mean of the column with missing scores replaced by the request's value
+            mean = (total + supplier_reliability * (summary["rows"] - count)) / summary["rows"]
+        supplier_score = float(min(1.0, (100.0 - mean) / 100.0))  # more unreliability increases importance
+    except Exception:
+        supplier_score = 0.1
+    return {
+        "supplier_reliability": supplier_score,
+        "weather": 0.2 if "Weather_Condition" in summary["columns"] else 0.0,
+        "regional_risk": 0.1 if "Regional_Risk_Level" in summary["columns"] else 0.0,
+    }
+
+
+def material_scores(forecast_df: pd.DataFrame, daily: pd.DataFrame, signals: dict) -> dict:
+    """Clamped feature-importance heuristics for one material."""
+    try:
+        # seasonality: spread of month means of the forecast
+        season_score = 0.0
+        dates = pd.to_datetime(forecast_df["forecast_date"], errors="coerce")
+        if not dates.isna().all():
+            month_means = forecast_df["yhat"].groupby(dates.dt.month).mean()
+            if not month_means.empty:
+                season_score = float(min(1.0, (month_means.std() / (month_means.mean() + 1e-6))))
+        # past consumption: lag-1 autocorrelation of daily usage changes (index rows are date-sorted)
+        past_score = 0.0
+        if daily is not None and not daily.empty:
+            q = daily["Quantity_Used"]
+            past_score = abs(q.pct_change().fillna(0).autocorr(lag=1)) if len(q) >= 3 else 0.1
+
+        raw = {"seasonality": season_score, "past_consumption": past_score, **signals}
+        return {name: max(0.0, min(1.0, value)) for name, value in raw.items()}
+    except Exception as e:
+        print(f"❌ Feature importance calc failed: {e}")
+        return dict(FEATURE_DEFAULTS)
+
+
+def _forecast_columns(forecast_df: pd.DataFrame) -> pd.DataFrame:
+    """Ensure forecast_df has the columns we expect (forecast_date, yhat)."""
+    if "forecast_date" not in forecast_df.columns and "ds" in forecast_df.columns:
+        forecast_df = forecast_df.rename(columns={"ds": "forecast_date"})
+    if "yhat" not in forecast_df.columns and "forecasted" in forecast_df.columns:
+        forecast_df["yhat"] = forecast_df["forecasted"]
+    return forecast_df
+
+
+def material_section(material: str, forecast_df: pd.DataFrame, series_index, params: dict,
+                     lead_table: dict, signals: dict, service_level: float, rec_df: pd.DataFrame = None) -> dict:
+    """
+    One material's dashboard payload.
+
+    Args:
+        params: lead_time_days, current_inventory, supplier_reliability for the recommendation math.
+        lead_table: ml.safety_stock.lead_time_table() of the upload.
+        signals: upload_signals() of the upload.
+        rec_df: this material's rows of a batch recommendation run, when the caller
+            already made one for all materials (computed here otherwise).
+    Returns {"material", "forecast", "recommendations", "historical", "safety_stock",
+    "feature_scores"} with JSON-ready records, plus the recommendation frame under "rec_df".
+    """
+    forecast_df = _forecast_columns(forecast_df)
+    if rec_df is None:
+        rec_df, _ = generate_procurement_recommendations_batch(forecast_df, pd.DataFrame([{"material": material, **params}]),
+                                                               bulk_orders=False)
+    rec_df = rec_df.reset_index(drop=True)
+    if not rec_df.empty:
+        rec_df["urgency"], rec_df["insight_reason"] = classify_urgency(rec_df["forecasted_demand"],
+                                                                       params["current_inventory"])
+
+    # Monte Carlo reorder point / safety stock from the forecast band + supplier lead times
+    safety_stock = None
+    lead_samples, lead_source = lead_time_samples(lead_table, material)
+    if lead_source is None:
+        lead_samples, lead_source = [params["lead_time_days"]], "request"
+    try:
+        stock = optimize_safety_stock(forecast_df, lead_samples, service_level=service_level)
+        safety_stock = {"material": material, "lead_time_source": lead_source, **stock}
+    except Exception as e:
+        print(f"⚠️ Safety stock optimization failed for {material}: {e}")
+
+    return {
+        "material": material,
+        "forecast": forecast_df.to_dict(orient="records"),
+        "recommendations": rec_df.to_dict(orient="records"),
+        "historical": historical_records(series_index, [material]),
+        "safety_stock": safety_stock,
+        "feature_scores": material_scores(forecast_df, series_index.daily(material), signals),
+        "rec_df": rec_df,
+    }
+
+
+def material_sections(forecasts: list, series_index, params: dict, lead_table: dict,
+                      signals: dict, service_level: float) -> list:
+    """
+    material_section() for several (material, forecast_df) pairs, with the
+    recommendations of all of them computed in one batch run.
+    """
+    if not forecasts:
+        return []
+    forecasts = [(mat, _forecast_columns(f)) for mat, f in forecasts]
+    rec_all, _ = generate_procurement_recommendations_batch(
+        pd.concat([f for _, f in forecasts], ignore_index=True),
+        pd.DataFrame([{"material": mat, **params} for mat, _ in forecasts]),
+        bulk_orders=False,
+    )
+    by_material = dict(tuple(rec_all.groupby("material", sort=False)))
+    counts = pd.Series([str(mat) for mat, _ in forecasts]).value_counts()
+    sections = []
+    for mat, forecast_df in forecasts:
+        # a material requested twice can't be told apart in the batch output: recompute it
+        rec_df = by_material.get(str(mat), rec_all.iloc[0:0]) if counts[str(mat)] == 1 else None
+        sections.append(material_section(mat, forecast_df, series_index, params, lead_table, signals,
+                                         service_level, rec_df=rec_df))
+    return sections
+
+
+def feature_importance(feature_scores: list) -> dict:
+    """Per-material scores averaged over materials and normalized to percent."""
+    raw = {name: float(sum(s[name] for s in feature_scores) / len(feature_scores)) if feature_scores else 0.0
+           for name in FEATURE_DEFAULTS}
+    total_raw = sum(raw.values()) or 1.0
+    return {
+        "Seasonality": round((raw["seasonality"] / total_raw) * 100, 1),
+        "Past Consumption": round((raw["past_consumption"] / total_raw) * 100, 1),
+        "Supplier Reliability": round((raw["supplier_reliability"] / total_raw) * 100, 1),
+        "Weather Impact": round((raw["weather"] / total_raw) * 100, 1),
+        "Regional Risk": round((raw["regional_risk"] / total_raw) * 100, 1),
+    }
+
+
+def dashboard_summary(sections: list, supplier_reliability: float, weather: str,
+                      budget: float, lead_time_days: int) -> tuple:
+    """
+    Cross-material part of the dashboard from material_section() results.
+    Returns (summary, bulk_orders records).
+    """
+    all_recs = [r for sec in sections for r in sec["recommendations"]]
+    total_forecast = sum(r.get("forecasted_demand", 0) for r in all_recs)
+    total_recommended = sum(r.get("recommended_order_quantity", 0) for r in all_recs)
+
+    insights = []
+    if total_recommended > total_forecast and total_forecast > 0:
+        insights.append("Bulk orders exceed forecast — consider splitting orders or adjusting suppliers.")
+    if any(r.get("urgency") == "critical" for r in all_recs):
+        insights.append("⚠️ Some materials are critically low — prioritize replenishment.")
+    if supplier_reliability < 80:
+        insights.append("Supplier reliability below 80% — add safety stock.")
+    if str(weather).lower() in ["rainy", "humid"]:
+        insights.append("Weather/region risk high — allow for delivery delays.")
+    if not insights:
+        insights.append("Looks good. Monitor monthly usage and supplier performance.")
+
+    importance = feature_importance([sec["feature_scores"] for sec in sections])
+    print("🔥 Feature Importance Computed:", importance)
+    summary = {
+        "total_forecast_tons": round(total_forecast, 2),
+        "total_recommended_tons": round(total_recommended, 2),
+        "avg_supplier_reliability": supplier_reliability,
+        "budget": budget,
+        "lead_time_days": lead_time_days,
+        "insights": insights,
+        "feature_importance": importance,
+    }
+
+    # bulk orders span materials
+    cols = ["material", "recommended_order_date", "recommended_order_quantity"]
+    rec_frames = [sec["rec_df"][cols] for sec in sections if not sec["rec_df"].empty]
+    bulk = consolidate_bulk_orders(pd.concat(rec_frames, ignore_index=True)) if rec_frames else pd.DataFrame()
+    return summary, bulk.to_dict(orient="records")
@@ -0,0 +1,360 @@
+# backend/ml/dataset.py
+"""
+Canonical columnar copies of uploaded histories.
+
+/upload-data converts each CSV once into an Arrow/Feather file next to it
+(<name>.canonical.feather) with stripped headers, fixed column names, parsed
+dates, numeric columns and categorical material/supplier names. The
+analytics endpoints load that artifact (memory-mapped) instead of re-parsing
+the CSV text on every request.
+
+Loaded frames are kept in a process-wide LRU (DatasetCache) keyed by
+(path, mtime, size) under a byte budget, and handed out as read-only views.
+Each entry also carries the per-material SeriesIndex, built on first use;
+for very large uploads the index is aggregated out of core from the CSV and
+the full frame is only loaded if an endpoint actually asks for it. Endpoints
+that need a few columns of the whole upload read just those (get_columns).
+"""
+import os
+import uuid
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from .series_index import SeriesIndex
+from .utils import aggregate_daily_chunks, DATE_COLUMN_CANDIDATES
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional: fall back to parsing the CSV every time
+    feather = None
+    print("⚠️ pyarrow not installed, uploads will be re-parsed from CSV on every request")
+
+ARTIFACT_SUFFIX = ".canonical.feather"
+CSV_ENCODING = "latin-1"
+
+# common misspellings / variants -> canonical names used downstream
+CANONICAL_RENAMES = {
+    "Date_of_Materail_Usage": "Date_of_Material_Usage",
+    "Supllier_Reliability_Score": "Supplier_Reliability_Score",
+}
+DATE_COLS = ["Date_of_Material_Usage", "Start_Date", "End_Date"]
+NUMERIC_COLS = [
+    "Quantity_Used", "Planned_Quantity", "Budget_Planned_Quantity",
+    "Supplier_Reliability_Score", "Average_Delivery_Time_Days", "Delivery_Delays",
+    "Contractor_Team_Size", "Number_of_Shifts_Work_Hours", "rainfall_mm",
+]
+CATEGORICAL_COLS = ["Material_Name", "Supplier_Name"]
+
+DATASET_CACHE_BYTES = int(os.getenv("DATASET_CACHE_BYTES", str(512 * 1024 * 1024)))
+# uploads at least this big get their series index from a chunked scan of the CSV
+# instead of loading the whole frame
+OUT_OF_CORE_MIN_BYTES = int(os.getenv("OUT_OF_CORE_MIN_BYTES", str(256 * 1024 * 1024)))
+OUT_OF_CORE_CHUNK_ROWS = int(os.getenv("OUT_OF_CORE_CHUNK_ROWS", "500000"))
+SERIES_COLS = DATE_COLUMN_CANDIDATES + ["Material_Name", "Quantity_Used", "rainfall_mm"]
+
+
+def canonicalize(df: pd.DataFrame, categorical: bool = True, date_formats: dict = None) -> pd.DataFrame:
+    """
+    Normalize headers, names and dtypes of a raw upload.
+    When converting in chunks, pass categorical=False (per-chunk category
+    dictionaries wouldn't line up) and the date_formats guessed from the first
+    chunk, so every chunk parses dates the way a whole-file parse would.
+    """
+    df.columns = [c.strip() for c in df.columns]
+    df = df.rename(columns=CANONICAL_RENAMES)
+
+    date_formats = date_formats or {}
+    for col in DATE_COLS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce", format=date_formats.get(col))
+    for col in NUMERIC_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    # material names are matched case-insensitively everywhere, store them that way
+    if "Material_Name" in df.columns:
+        df["Material_Name"] = df["Material_Name"].astype(str).str.strip().str.lower()
+    if "Supplier_Name" in df.columns:
+        df["Supplier_Name"] = df["Supplier_Name"].astype(str).str.strip()
+    if categorical:
+        df = to_categorical(df)
+    return df
+
+
+def guess_date_formats(df: pd.DataFrame) -> dict:
+    """
+    strftime format of each date column, guessed from its first value as pandas
+    does ("mixed", i.e. per-value parsing, when that value has no clear format).
+    """
+    formats = {}
+    for col in DATE_COLS:
+        if col in df.columns:
+            first = df[col].dropna()
+            if not first.empty:
+                formats[col] = guess_datetime_format(str(first.iloc[0])) or "mixed"
+    return formats
+
+
+def to_categorical(df: pd.DataFrame) -> pd.DataFrame:
+    for col in CATEGORICAL_COLS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def read_csv_canonical(csv_path: str) -> pd.DataFrame:
+    return canonicalize(pd.read_csv(csv_path, encoding=CSV_ENCODING))
+
+
+def artifact_path(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + ARTIFACT_SUFFIX
+
+
+def artifact_is_fresh(csv_path: str) -> bool:
+    path = artifact_path(csv_path)
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(csv_path)
+
+
+def temp_path(path: str, suffix: str = ".tmp") -> str:
+    """Unique sibling of `path` to write before an atomic os.replace(); safe across threads and processes."""
+    return f"{path}.{uuid.uuid4().hex}{suffix}"
+
+
+def build_artifact(csv_path: str, df: pd.DataFrame = None):
+    """Write the canonical artifact for `csv_path`. Returns its path, or None if unavailable."""
+    if feather is None:
+        return None
+    if df is None:
+        df = read_csv_canonical(csv_path)
+    path = artifact_path(csv_path)
+    tmp_path = temp_path(path)
+    try:
+        # uncompressed so the file can be memory-mapped without a decode step
+        feather.write_feather(df.reset_index(drop=True), tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+        return path
+    except Exception as e:
+        print("⚠️ Failed to write canonical dataset:", e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+
+def load_dataset(csv_path: str) -> pd.DataFrame:
+    """
+    Load an uploaded history in canonical form.
+    Uses the memory-mapped artifact when it is up to date, otherwise parses the
+    CSV once and (re)builds the artifact for next time.
+    """
+    if feather is not None and artifact_is_fresh(csv_path):
+        try:
+            # split_blocks keeps columns separate so numeric ones stay zero-copy views of the mmap
+            table = feather.read_table(artifact_path(csv_path), memory_map=True)
+            # artifacts written chunk by chunk store names as plain strings
+            return to_categorical(table.to_pandas(split_blocks=True))
+        except Exception as e:
+            print("⚠️ Canonical dataset unreadable, re-parsing CSV:", e)
+
+    df = read_csv_canonical(csv_path)
+    build_artifact(csv_path, df)
+    return df
+
+
+def build_series_index_out_of_core(csv_path: str, chunk_rows: int = OUT_OF_CORE_CHUNK_ROWS) -> SeriesIndex:
+    """
+    Series index straight from the CSV with bounded memory: only the date,
+    material, quantity and rainfall columns are read, chunk by chunk, and
+    folded into the daily per-material aggregate.
+    """
+    chunks = pd.read_csv(
+        csv_path, encoding=CSV_ENCODING, dtype=str, chunksize=chunk_rows,
+        usecols=lambda c: c.strip() in SERIES_COLS,
+    )
+    daily = aggregate_daily_chunks(chunks, ["date", "Quantity_Used", "Material_Name"])
+    return SeriesIndex(daily)
+
+
+def canonical_name(column: str) -> str:
+    column = column.strip()
+    return CANONICAL_RENAMES.get(column, column)
+
+
+def read_header(csv_path: str) -> list:
+    """Canonical column names of an upload (only the header line is read)."""
+    return [canonical_name(c) for c in pd.read_csv(csv_path, encoding=CSV_ENCODING, nrows=0).columns]
+
+
+def read_columns(csv_path: str, columns, chunk_rows: int = OUT_OF_CORE_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Just `columns` (canonical names; absent ones are skipped) of an upload, in
+    canonical form: from the memory-mapped artifact when it is up to date,
+    otherwise from a chunked scan of the CSV that never parses the other columns.
+    """
+    present = [c for c in read_header(csv_path) if c in set(columns)]
+    if feather is not None and artifact_is_fresh(csv_path):
+        try:
+            table = feather.read_table(artifact_path(csv_path), columns=present, memory_map=True)
+            return to_categorical(table.to_pandas(split_blocks=True))
+        except Exception as e:
+            print("⚠️ Canonical dataset unreadable, scanning CSV:", e)
+
+    chunks = pd.read_csv(csv_path, encoding=CSV_ENCODING, chunksize=chunk_rows,
+                         usecols=lambda c: canonical_name(c) in present)
+    frames, date_formats = [], None
+    for chunk in chunks:
+        if date_formats is None:
+            date_formats = guess_date_formats(chunk.rename(columns=canonical_name))
+        frames.append(canonicalize(chunk, categorical=False, date_formats=date_formats))
+    if not frames:
+        return pd.DataFrame(columns=present)
+    return to_categorical(pd.concat(frames, ignore_index=True))
+
+
+def freeze(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rebuild `df` on top of non-writeable arrays (no data copy).
+    Any in-place write (.loc/.iloc/.values[...] = ...) on it, or on a shallow
+    copy of it, raises instead of silently corrupting the shared frame;
+    replacing or adding whole columns on a shallow copy still works.
+    """
+    cols = {}
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            codes = s.cat.codes.to_numpy()
+            codes.flags.writeable = False
+            cols[col] = pd.Categorical.from_codes(codes, dtype=s.dtype)
+        else:
+            arr = s.to_numpy()
+            arr.flags.writeable = False
+            cols[col] = arr
+    return pd.DataFrame(cols, index=df.index, copy=False)
+
+
+class DatasetCache:
+    """LRU of parsed upload frames and/or their series index, evicted by resident bytes."""
+
+    def __init__(self, max_bytes: int = DATASET_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (path, mtime_ns, size) -> {"df", "index", "nbytes"}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(entry["nbytes"] for entry in self._entries.values())
+
+    @staticmethod
+    def key(csv_path: str) -> tuple:
+        """Identity of one version of an upload: (path, mtime_ns, size)."""
+        st = os.stat(csv_path)
+        return (os.path.abspath(csv_path), st.st_mtime_ns, st.st_size)
+
+    def _evict(self):
+        while len(self._entries) > 1 and self.resident_bytes > self.max_bytes:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _entry(self, csv_path: str) -> dict:
+        key = self.key(csv_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            # a re-uploaded file makes older entries for the same path unreachable
+            for old_key in [k for k in self._entries if k[0] == key[0]]:
+                del self._entries[old_key]
+            entry = self._entries[key] = {"df": None, "index": None, "nbytes": 0}
+            return entry
+
+    def _add(self, entry: dict, field: str, value, nbytes: int):
+        with self._lock:
+            if entry[field] is None:
+                entry[field] = value
+                entry["nbytes"] += nbytes
+                self._evict()
+            return entry[field]
+
+    def _frame(self, entry: dict, csv_path: str) -> pd.DataFrame:
+        if entry["df"] is None:
+            df = load_dataset(csv_path)
+            # measured before freezing: pandas can't deep-size read-only object arrays
+            nbytes = int(df.memory_usage(deep=True).sum())
+            self._add(entry, "df", freeze(df), nbytes)
+        return entry["df"]
+
+    def get(self, csv_path: str) -> pd.DataFrame:
+        """Return a read-only view of the canonical frame for `csv_path`."""
+        entry = self._entry(csv_path)
+        return self._frame(entry, csv_path).copy(deep=False)
+
+    def get_index(self, csv_path: str) -> SeriesIndex:
+        """
+        Per-material series index for `csv_path`, built once per cached dataset.
+        Large files that aren't loaded already are scanned out of core, so the
+        full frame never has to fit in memory.
+        """
+        entry = self._entry(csv_path)
+        if entry["index"] is None:
+            if entry["df"] is None and os.path.getsize(csv_path) >= OUT_OF_CORE_MIN_BYTES:
+                print(f"📚 Building series index out of core for {os.path.basename(csv_path)}")
+                index = build_series_index_out_of_core(csv_path)
+            else:
+                index = SeriesIndex.from_frame(self._frame(entry, csv_path))
+            self._add(entry, "index", index, index.nbytes)
+        return entry["index"]
+
+    def get_columns(self, csv_path: str, columns) -> pd.DataFrame:
+        """
+        Only `columns` of an upload. Served from the cached frame when it is already
+        loaded; otherwise read on their own (read_columns), without loading the frame.
+        """
+        entry = self._entry(csv_path)
+        df = entry["df"]
+        if df is not None:
+            return df[[c for c in df.columns if c in set(columns)]].copy(deep=False)
+        return read_columns(csv_path, columns)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "loaded": sum(entry["df"] is not None for entry in self._entries.values()),
+                "indexed": sum(entry["index"] is not None for entry in self._entries.values()),
+                "resident_bytes": self.resident_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+dataset_cache = DatasetCache()
+
+
+def get_dataset(csv_path: str) -> pd.DataFrame:
+    """Cached, read-only canonical frame for an uploaded CSV."""
+    return dataset_cache.get(csv_path)
+
+
+def get_columns(csv_path: str, columns) -> pd.DataFrame:
+    """Some canonical columns of an upload, without loading the full frame if it isn't cached."""
+    return dataset_cache.get_columns(csv_path, columns)
+
+
+def get_series_index(csv_path: str) -> SeriesIndex:
+    """Cached per-material series index for an uploaded CSV."""
+    return dataset_cache.get_index(csv_path)
+
+
+def dataset_key(csv_path: str) -> tuple:
+    """Key that changes whenever the uploaded file is replaced."""
+    return DatasetCache.key(csv_path)
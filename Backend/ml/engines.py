@@ -0,0 +1,148 @@
+# backend/ml/engines.py
+"""
+Lightweight pure-NumPy forecasting engines.
+
+Every engine takes a regular (gap-free) series `y` and returns in-sample fitted
+values, `periods` future point forecasts and an 80% interval around them, the
+same band Prophet produces with its default interval_width.
+"""
+import numpy as np
+
+INTERVAL_Z = 1.2816  # two-sided 80%, matches Prophet's default interval_width
+
+# auto-routing thresholds
+INTERMITTENT_ZERO_SHARE = 0.5  # at least half the periods without usage -> croston
+PROPHET_MIN_POINTS = 730       # Prophet's yearly seasonality needs ~2 years of history
+
+# smoothing parameter grid searched by holt_winters (evaluated in one vectorized pass)
+_ALPHAS = np.array([0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9])
+_BETAS = np.array([0.0, 0.05, 0.1, 0.2])
+_GAMMAS = np.array([0.0, 0.1, 0.3])
+_PHI = 0.98  # damped trend so long horizons don't run away
+
+
+def _result(fitted, future, sigma, spread):
+    """`spread` scales the one-step sigma for each future step."""
+    width = INTERVAL_Z * sigma * spread
+    return {
+        "fitted": fitted,
+        "fitted_lower": fitted - INTERVAL_Z * sigma,
+        "fitted_upper": fitted + INTERVAL_Z * sigma,
+        "yhat": future,
+        "yhat_lower": future - width,
+        "yhat_upper": future + width,
+    }
+
+
+def holt_winters(y: np.ndarray, periods: int, season_length: int = 7) -> dict:
+    """
+    Additive Holt-Winters with a damped trend.
+    All (alpha, beta, gamma) combinations are run side by side as vectors and
+    the one with the lowest in-sample SSE is kept. Falls back to plain damped
+    Holt when there are fewer than two full seasons.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    m = season_length if n >= 2 * season_length else 1
+    gammas = _GAMMAS if m > 1 else np.array([0.0])
+
+    alpha, beta, gamma = (g.ravel() for g in np.meshgrid(_ALPHAS, _BETAS, gammas, indexing="ij"))
+    n_params = len(alpha)
+
+    # initial state from the first season(s)
+    first = y[:m].mean()
+    trend0 = (y[m:2 * m].mean() - first) / m if m > 1 else (y[1] - y[0] if n > 1 else 0.0)
+    level = np.full(n_params, first)
+    trend = np.full(n_params, trend0)
+    season = np.tile(y[:m] - first if m > 1 else np.zeros(1), (n_params, 1))
+
+    fitted = np.empty((n_params, n))
+    for t in range(n):
+        s = t % m
+        fitted[:, t] = level + _PHI * trend + season[:, s]
+        new_level = alpha * (y[t] - season[:, s]) + (1 - alpha) * (level + _PHI * trend)
+        trend = beta * (new_level - level) + (1 - beta) * _PHI * trend
+        season[:, s] = gamma * (y[t] - new_level) + (1 - gamma) * season[:, s]
+        level = new_level
+
+    sse = ((fitted - y) ** 2).sum(axis=1)
+    best = int(np.argmin(sse))
+
+    steps = np.arange(1, periods + 1)
+    damped = np.cumsum(_PHI ** steps)
+    future = level[best] + damped * trend[best] + season[best, (n + steps - 1) % m]
+    sigma = float(np.std(y - fitted[best])) if n > 1 else 0.0
+    # SES-style variance growth: sigma^2 * (1 + (h - 1) * alpha^2)
+    spread = np.sqrt(1 + (steps - 1) * alpha[best] ** 2)
+    return _result(fitted[best], future, sigma, spread)
+
+
+def seasonal_naive(y: np.ndarray, periods: int, season_length: int = 7) -> dict:
+    """Repeat the last observed season (plain naive when history is shorter than a season)."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    m = season_length if n >= season_length else 1
+
+    fitted = np.concatenate([y[:m], y[:-m]]) if n > m else y.copy()
+    resid = (y - fitted)[m:]
+    sigma = float(np.std(resid)) if len(resid) > 1 else 0.0
+
+    steps = np.arange(1, periods + 1)
+    future = y[n - m + (steps - 1) % m]
+    # uncertainty grows once per season we extrapolate
+    return _result(fitted, future, sigma, np.sqrt((steps - 1) // m + 1))
+
+
+def croston(y: np.ndarray, periods: int, season_length: int = 7, alpha: float = 0.1) -> dict:
+    """
+    Croston's method with the Syntetos-Boylan bias correction for intermittent demand.
+    Demand size and inter-demand interval are smoothed separately; the forecast is
+    the flat per-period rate size / interval.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    demand_idx = np.flatnonzero(y)
+    if len(demand_idx) == 0:
+        zeros = np.zeros(periods)
+        return _result(np.zeros(n), zeros, 0.0, np.ones(periods))
+
+    sizes = y[demand_idx]
+    intervals = np.diff(demand_idx, prepend=-1).astype(float)
+
+    z, p = sizes[0], intervals[0]
+    rates = np.empty(len(demand_idx))
+    for i in range(len(demand_idx)):
+        if i:
+            z = alpha * sizes[i] + (1 - alpha) * z
+            p = alpha * intervals[i] + (1 - alpha) * p
+        rates[i] = (1 - alpha / 2) * z / p
+
+    # rate known after each demand event, held flat until the next one
+    event = np.searchsorted(demand_idx, np.arange(n), side="right") - 1
+    fitted = np.where(event >= 0, rates[np.maximum(event, 0)], 0.0)
+    fitted = np.concatenate([[0.0], fitted[:-1]])  # one-step-ahead
+
+    sigma = float(np.std(y - fitted)) if n > 1 else 0.0
+    future = np.full(periods, rates[-1])
+    return _result(fitted, future, sigma, np.ones(periods))
+
+
+ENGINES = {
+    "holt_winters": holt_winters,
+    "seasonal_naive": seasonal_naive,
+    "croston": croston,
+}
+ENGINE_CHOICES = ["auto", "prophet"] + list(ENGINES)
+
+
+def select_engine(y: np.ndarray, season_length: int = 7, prophet_min_points: int = PROPHET_MIN_POINTS) -> str:
+    """Route a series to the cheapest engine that suits its length and sparsity."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n == 0 or (y == 0).mean() >= INTERMITTENT_ZERO_SHARE:
+        return "croston"
+    if n < 2 * season_length:
+        return "seasonal_naive"
+    if n < prophet_min_points:
+        return "holt_winters"
+    return "prophet"
@@ -1,89 +1,171 @@
 import pandas as pd
 from prophet import Prophet
 import os
-from .utils import clean_and_validate_data
+from .series_index import SeriesIndex
+from .model_cache import model_cache, model_cache_key, dataset_fingerprint
+from .engines import ENGINES, ENGINE_CHOICES, select_engine
 
 FORECAST_DIR = "data/forecasts"
 os.makedirs(FORECAST_DIR, exist_ok=True)
 
-def generate_forecast(df: pd.DataFrame, material: str, horizon_months: int = 6):
+# "auto" sends short/sparse series to the NumPy engines and long dense ones to Prophet
+DEFAULT_ENGINE = os.getenv("FORECAST_ENGINE", "auto")
+DEFAULT_GRANULARITY = "monthly"
+
+# per-granularity settings: pandas freq, season length and the history Prophet needs
+GRANULARITIES = {
+    "monthly": {"freq": "ME", "season_length": 12, "prophet_min_points": 24},
+    "daily": {"freq": "D", "season_length": 7, "prophet_min_points": 730},
+}
+
+
+def _prophet_forecast(history: pd.DataFrame, material: str, optional_cols, periods: int,
+                      freq: str, include_history: bool) -> pd.DataFrame:
+    """Fit (or reuse) a Prophet model and predict `periods` future steps at `freq`."""
+    model_config = {"yearly_seasonality": True}
+    cache_key = model_cache_key(dataset_fingerprint(history), material, optional_cols, {**model_config, "freq": freq})
+    model = model_cache.get(cache_key)
+    if model is None:
+        model = Prophet(**model_config)
+        for col in optional_cols:
+            model.add_regressor(col)
+        print("⚡ df_prophet shape:", history.shape)
+        print(history.head())
+        model.fit(history)
+        model_cache.put(cache_key, model)
+    else:
+        print(f"♻️ Reusing cached Prophet model for '{material}'")
+
+    future = model.make_future_dataframe(periods=periods, freq=freq, include_history=include_history)
+    for col in optional_cols:
+        future[col] = history[col].mean()
+
+    return model.predict(future)[["ds", "yhat", "yhat_lower", "yhat_upper"]]
+
+
+def _light_forecast(series: pd.Series, engine: str, periods: int, freq: str,
+                    season_length: int, include_history: bool) -> pd.DataFrame:
+    """Run one of the NumPy engines on a gap-free series."""
+    out = ENGINES[engine](series.to_numpy(), periods, season_length=season_length)
+    future = pd.DataFrame({
+        "ds": pd.date_range(series.index[-1], periods=periods + 1, freq=freq)[1:],
+        "yhat": out["yhat"],
+        "yhat_lower": out["yhat_lower"],
+        "yhat_upper": out["yhat_upper"],
+    })
+    if not include_history:
+        return future
+    fitted = pd.DataFrame({
+        "ds": series.index,
+        "yhat": out["fitted"],
+        "yhat_lower": out["fitted_lower"],
+        "yhat_upper": out["fitted_upper"],
+    })
+    return pd.concat([fitted, future], ignore_index=True)
+
+
+def generate_forecast(df: pd.DataFrame, material: str, horizon_months: int = 6, engine: str = None,
+                      granularity: str = DEFAULT_GRANULARITY, include_history: bool = False,
+                      series_index: SeriesIndex = None):
     """
     Generates monthly forecast from historical CSV for a given material.
     Uses optional regressors if available in the historical CSV.
-    """
 
-   # 🧹 Step 1: Normalize date column naming
-    if "Date_of_Materail_Usage" in df.columns:
-      df.rename(columns={"Date_of_Materail_Usage": "date"}, inplace=True)
-    elif "Date_of_Material_Usage" in df.columns:
-      df.rename(columns={"Date_of_Material_Usage": "date"}, inplace=True)
+    engine: "prophet", one of the NumPy engines in ml.engines
+    ("holt_winters", "seasonal_naive", "croston") or "auto" to pick by
+    series length and sparsity. Defaults to FORECAST_ENGINE.
 
-    # ✅ Required columns (your actual CSV headers)
-    required_cols = ["date", "Quantity_Used", "Material_Name"]
+    granularity: "monthly" (default) aggregates history to month-end totals
+    before fitting and forecasts `horizon_months` future months. "daily" fits
+    the daily series and forecasts horizon_months * 30 future days.
 
-    # ✅ Clean + validate via utils
-    df_clean = clean_and_validate_data(df, required_cols)
+    include_history: also return in-sample fitted values for the history
+    period. Off by default so callers only get the future periods.
 
-    # ✅ Make sure material names are clean lowercase
-    df_clean["Material_Name"] = df_clean["Material_Name"].astype(str).str.strip().str.lower()
+    series_index: prebuilt per-material index of the same upload. When given,
+    `df` is ignored (may be None) and the material's daily series is sliced
+    from the index instead of re-cleaning the whole frame.
+    """
+    engine = (engine or DEFAULT_ENGINE).strip().lower()
+    if engine not in ENGINE_CHOICES:
+        raise ValueError(f"Unknown forecast engine '{engine}'. Expected one of: {ENGINE_CHOICES}")
+    granularity = (granularity or DEFAULT_GRANULARITY).strip().lower()
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity '{granularity}'. Expected one of: {list(GRANULARITIES)}")
+
+    # 🧹 Per-material daily series (cleaned + aggregated once per upload)
+    if series_index is None:
+        series_index = SeriesIndex.from_frame(df)
 
     # 🧩 Optional regressors
     optional_cols = [
         "Weather_Condition", "Regional_Risk_Level", "Delivery_Delays",
         "Average_Delivery_Time_Days", "Contractor_Team_Size", "Number_of_Shifts_Work_Hours"
     ]
-    for col in optional_cols:
-        if col not in df_clean.columns:
-            df_clean[col] = 0
-
-    # 🎯 Filter for selected material (case-insensitive)
-    material_lower = material.strip().lower()
-    df_material = df_clean[df_clean["Material_Name"] == material_lower]
-    
-    print("🧾 Materials available in CSV:", df_clean["Material_Name"].unique())
+
+    # 🎯 Select material (case-insensitive)
+    df_material = series_index.daily(material)
+
+    print("🧾 Materials available in CSV:", series_index.materials())
     print("🔍 User searched for:", material)
 
-    if df_material.empty:
+    if df_material is None or df_material.empty:
        print(f"⚠️ No data found for material '{material}', using overall project trends instead.")
     # use all materials for generic forecast
-       df_material = df_clean.copy()
+       df_material = series_index.daily_all.copy()
        df_material["Material_Name"] = material  # tag as current material
 
     # 🔄 Prepare for Prophet
     df_prophet = df_material.rename(columns={"date": "ds", "Quantity_Used": "y"})
+    for col in optional_cols:
+        if col not in df_prophet.columns:
+            df_prophet[col] = 0
     df_prophet = df_prophet[["ds", "y"] + optional_cols].sort_values("ds")
     df_prophet['ds'] = pd.to_datetime(df_prophet['ds'])
 
-    # 🔮 Prophet model
-    model = Prophet(yearly_seasonality=True)
-    for col in optional_cols:
-        model.add_regressor(col)
-        print("⚡ df_prophet shape:", df_prophet.shape)
-        print(df_prophet.head())
-    model.fit(df_prophet)
-
-    # 🧠 Generate future predictions
-    future = model.make_future_dataframe(periods=horizon_months * 30, freq='D')
-    for col in optional_cols:
-        future[col] = df_prophet[col].mean()
-
-    forecast = model.predict(future)
+    # 📅 Fit at the requested resolution: monthly totals or raw daily rows
+    settings = GRANULARITIES[granularity]
+    freq = settings["freq"]
+    if granularity == "monthly":
+        history = (
+            df_prophet.set_index("ds")
+            .resample(freq)
+            .agg({"y": "sum", **{col: "mean" for col in optional_cols}})
+            .fillna(0)
+            .reset_index()
+        )
+        periods = horizon_months
+    else:
+        history = df_prophet
+        periods = horizon_months * 30
+
+    # 🔮 Pick the engine: lightweight engines need a regular grid (no usage = 0)
+    series = history.groupby("ds")["y"].sum().asfreq(freq, fill_value=0)
+    if engine == "auto":
+        engine = select_engine(series.to_numpy(), season_length=settings["season_length"],
+                               prophet_min_points=settings["prophet_min_points"])
+    print(f"🔧 Forecast engine for '{material}' ({granularity}): {engine}")
+
+    if engine == "prophet":
+        forecast = _prophet_forecast(history, material, optional_cols, periods, freq, include_history)
+    else:
+        forecast = _light_forecast(series, engine, periods, freq, settings["season_length"], include_history)
 
-    # 📅 Aggregate to monthly
     forecast_out = forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].copy()
     forecast_out['ds'] = pd.to_datetime(forecast_out['ds'])
 
-# Aggregate properly from the end of your dataset
-    last_date = df_prophet['ds'].max()
-    future_months = pd.date_range(last_date, periods=horizon_months, freq='M')
-
-    monthly_forecast = (
-        forecast_out.set_index('ds')
-        .resample('M')
-        .sum()
-        .loc[future_months]
-        .reset_index()
-        )
+    # Monthly totals of the future periods only (what the CSV export holds)
+    future_out = forecast_out[forecast_out['ds'] > history['ds'].max()]
+    if granularity == "monthly":
+        monthly_forecast = future_out.copy()
+    else:
+        monthly_forecast = (
+            future_out.set_index('ds')
+            .resample(GRANULARITIES["monthly"]["freq"])
+            .sum()
+            .head(horizon_months)
+            .reset_index()
+            )
     monthly_forecast["material"] = material
     monthly_forecast.rename(columns={'ds': 'forecast_date'}, inplace=True)
 
@@ -91,28 +173,18 @@ def generate_forecast(df: pd.DataFrame, material: str, horizon_months: int = 6):
     out_path = os.path.join(FORECAST_DIR, f"{material}_forecast.csv")
     monthly_forecast.to_csv(out_path, index=False)
 
-    forecast_out = forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].copy()
-
     # --- AFTER ALL RESAMPLING / CLEANING ---
     # Make sure the output has required columns for recommendation
-    if "ds" in forecast_out.columns:
-        forecast_out.rename(columns={"ds": "forecast_date"}, inplace=True)
-
-    if "forecast_date" not in forecast_out.columns:
-        forecast_out.reset_index(inplace=True)
-        if "index" in forecast_out.columns:
-            forecast_out.rename(columns={"index": "forecast_date"}, inplace=True)
+    forecast_out.rename(columns={"ds": "forecast_date"}, inplace=True)
 
     # Add material column
     forecast_out["material"] = material
 
     # Keep only the columns needed downstream
-    required_cols = ["forecast_date", "yhat", "material"]
-    forecast_out = forecast_out[[col for col in required_cols if col in forecast_out.columns]]
+    required_cols = ["forecast_date", "yhat", "yhat_lower", "yhat_upper", "material"]
+    forecast_out = forecast_out[required_cols]
 
     print("✅ Final Forecast Columns:", forecast_out.columns.tolist())
     print(f"✅ Final Forecast Shape: {forecast_out.shape}")
 
     return forecast_out
-
-    return monthly_forecast
\ No newline at end of file
@@ -0,0 +1,122 @@
+# backend/ml/forecast_cache.py
+"""
+Result cache for the forecast stage of the pipeline.
+
+A forecast only depends on the uploaded file, the material, the horizon and
+the forecast options (engine, granularity, include_history). Inventory,
+lead time, reliability and the other procurement inputs only feed the cheap
+recommendation stage, so they are deliberately not part of the key:
+re-posting with different stock levels reuses the cached forecast instead of
+refitting. Concurrent misses on the same key are coalesced by
+forecast_flight, so identical requests arriving together fit only once.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from .forecast import generate_forecast, DEFAULT_ENGINE, DEFAULT_GRANULARITY
+from .series_index import normalize_material
+from .singleflight import SingleFlight
+
+FORECAST_CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", "256"))
+
+
+def forecast_cache_key(dataset_key, material, horizon_months, engine=None,
+                       granularity=None, include_history=False) -> tuple:
+    """
+    dataset_key: ml.dataset.dataset_key() of the upload (changes on re-upload).
+    Materials are matched case-insensitively, like the series index does.
+    """
+    return (
+        tuple(dataset_key),
+        normalize_material(material),
+        int(horizon_months),
+        (engine or DEFAULT_ENGINE).strip().lower(),
+        (granularity or DEFAULT_GRANULARITY).strip().lower(),
+        bool(include_history),
+    )
+
+
+def relabel(forecast: pd.DataFrame, material=None) -> pd.DataFrame:
+    """Show the material name as the caller spelled it (cache entries are shared across casings)."""
+    if material is not None and "material" in forecast.columns:
+        forecast["material"] = material
+    return forecast
+
+
+class ForecastCache:
+    """In-memory LRU of forecast frames."""
+
+    def __init__(self, max_items: int = FORECAST_CACHE_SIZE):
+        self.max_items = max_items
+        self._forecasts = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, material=None):
+        """A private copy of the cached forecast (labelled with `material` if given), or None."""
+        with self._lock:
+            forecast = self._forecasts.get(key)
+            if forecast is None:
+                self.misses += 1
+                return None
+            self._forecasts.move_to_end(key)
+            self.hits += 1
+        return relabel(forecast.copy(), material)
+
+    def peek(self, key, material=None):
+        """Like get(), without touching the LRU order or the hit/miss counters."""
+        with self._lock:
+            forecast = self._forecasts.get(key)
+        return None if forecast is None else relabel(forecast.copy(), material)
+
+    def put(self, key, forecast: pd.DataFrame):
+        with self._lock:
+            self._forecasts[key] = forecast.copy()
+            self._forecasts.move_to_end(key)
+            while len(self._forecasts) > self.max_items:
+                self._forecasts.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "items": len(self._forecasts),
+                "max_items": self.max_items,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+forecast_cache = ForecastCache()
+# in-flight forecast fits, keyed like the cache
+forecast_flight = SingleFlight("forecast")
+
+
+def cached_forecast(dataset_key, df, material, horizon_months=6, **forecast_kwargs) -> tuple:
+    """
+    generate_forecast() behind the cache.
+    Returns (forecast_df, served_from_cache).
+    """
+    key = forecast_cache_key(dataset_key, material, horizon_months,
+                             engine=forecast_kwargs.get("engine"),
+                             granularity=forecast_kwargs.get("granularity"),
+                             include_history=forecast_kwargs.get("include_history", False))
+    forecast = forecast_cache.get(key, material)
+    if forecast is not None:
+        print(f"♻️ Serving cached forecast for '{material}'")
+        return forecast, True
+
+    def fit():
+        # a fit that finished between our miss and claiming the key is already stored
+        stored = forecast_cache.peek(key, material)
+        if stored is not None:
+            return stored
+        fitted = generate_forecast(df, material, horizon_months, **forecast_kwargs)
+        forecast_cache.put(key, fitted)
+        return fitted
+
+    forecast, shared = forecast_flight.do(key, fit)
+    return (relabel(forecast.copy(), material) if shared else forecast), False
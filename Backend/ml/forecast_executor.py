@@ -0,0 +1,315 @@
+# backend/ml/forecast_executor.py
+"""
+Fan out per-material forecasts across a process pool.
+
+Prophet fits are CPU bound and hold the GIL, so multi-material requests run
+each material in its own worker process and the results are merged back in
+the order the materials were requested. A failing or slow material only
+marks its own result with an error: a fit that runs past its timeout has its
+worker stopped and the pool replaced, and fits of other requests that die
+with that pool are resubmitted once.
+"""
+import os
+import math
+import time
+import signal
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, CancelledError, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+from .forecast import generate_forecast
+from .forecast_cache import forecast_cache, forecast_cache_key, forecast_flight, relabel
+
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", str(os.cpu_count() or 1)))
+FORECAST_TASK_TIMEOUT = float(os.getenv("FORECAST_TASK_TIMEOUT", "120"))  # <= 0: no timeout
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# workers report (task token, pid) when they pick a task up; the parent stamps the time.
+# A future is already "running" while it sits in the pool's call queue, so this is the
+# only reliable start time for the per-task timeout (and tells us which process to stop).
+_task_starts = {}
+_task_tokens = itertools.count()
+_start_queue = None
+_worker_start_queue = None  # set in the workers by _init_worker
+
+
+def _collect_starts(queue):
+    while True:
+        token, pid = queue.get()
+        _task_starts[token] = (pid, time.monotonic())
+
+
+def _init_worker(queue):
+    global _worker_start_queue
+    _worker_start_queue = queue
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """The process-wide pool; always FORECAST_WORKERS processes, whoever creates it first."""
+    global _pool, _start_queue
+    with _pool_lock:
+        if _start_queue is None:
+            _start_queue = multiprocessing.SimpleQueue()
+            threading.Thread(target=_collect_starts, args=(_start_queue,), name="forecast-starts",
+                             daemon=True).start()
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=FORECAST_WORKERS, initializer=_init_worker,
+                                        initargs=(_start_queue,))
+        return _pool
+
+
+def reset_pool(pool: ProcessPoolExecutor):
+    """
+    Retire a broken/hung pool so the next submit starts fresh workers. Only swaps
+    `pool` out if it is still the current one (another request may have done it
+    already), and leaves its queued work alone.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def _stop_worker(pid: int):
+    """Terminate a worker stuck on an abandoned fit (the pool then counts as broken)."""
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _error_text(e: BaseException) -> str:
+    # CancelledError / TimeoutError stringify to ""; an empty error would read as success
+    return str(e) or type(e).__name__
+
+
+def _run_forecast(df, material, horizon_months, forecast_kwargs):
+    return generate_forecast(df, material, horizon_months, **forecast_kwargs)
+
+
+def _run_pooled(token, df, material, horizon_months, forecast_kwargs):
+    if _worker_start_queue is not None:
+        _worker_start_queue.put((token, os.getpid()))
+    return _run_forecast(df, material, horizon_months, forecast_kwargs)
+
+
+def forecast_materials(df, tasks, max_workers: int = None, timeout: float = None,
+                       series_index=None, dataset_key=None, **forecast_kwargs) -> list:
+    """
+    Forecast several materials from the same history.
+
+    Args:
+        df: historical DataFrame (treated as read-only; each task gets its own view).
+            Ignored when series_index is given.
+        tasks: list of (material, horizon_months) tuples.
+        series_index: prebuilt SeriesIndex of the upload; workers then only receive
+            the slice for their own material instead of the whole history.
+        dataset_key: ml.dataset.dataset_key() of the upload. When given, forecasts
+            are served from / stored in the forecast cache and only misses are fitted.
+        max_workers: how many of these fits may be in the shared pool (FORECAST_WORKERS
+            processes) at once; defaults to FORECAST_WORKERS. Without a timeout, <= 1
+            runs the fits inline instead.
+        timeout: per-task timeout in seconds, measured from when the task starts running;
+            defaults to FORECAST_TASK_TIMEOUT, <= 0 disables it. Timed fits always run in
+            the pool (a worker stuck on a fit can be stopped, an inline fit can't).
+        **forecast_kwargs: passed through to generate_forecast (engine, granularity, ...).
+
+    Returns:
+        list of {"material", "forecast", "error", "cached", "shared"} dicts in the same order as tasks.
+        "error" is a non-empty string whenever "forecast" is None.
+    """
+    results = [None] * len(tasks)
+    for i, res in iter_forecast_materials(df, tasks, max_workers, timeout, series_index=series_index,
+                                          dataset_key=dataset_key, **forecast_kwargs):
+        results[i] = res
+    return results
+
+
+def iter_forecast_materials(df, tasks, max_workers: int = None, timeout: float = None,
+                            series_index=None, dataset_key=None, **forecast_kwargs):
+    """
+    Same as forecast_materials(), but yields (task_index, result) as each material
+    finishes: cache hits first, then fits in completion order. Closing the
+    generator early cancels the fits that haven't started yet.
+
+    With a dataset_key, a material that another request is already fitting is
+    not refitted: this request waits for that fit (single-flight) and its result
+    is marked "shared".
+    """
+    max_workers = FORECAST_WORKERS if max_workers is None else max_workers
+    timeout = FORECAST_TASK_TIMEOUT if timeout is None else timeout
+    timed = timeout > 0
+    results = [{"material": mat, "forecast": None, "error": None, "cached": False, "shared": False}
+               for mat, _ in tasks]
+
+    # ♻️ forecast stage cache: only materials that miss get fitted
+    cache_keys = {}
+    if dataset_key is not None:
+        for i, (mat, hm) in enumerate(tasks):
+            cache_keys[i] = forecast_cache_key(dataset_key, mat, hm, **forecast_kwargs)
+            cached = forecast_cache.get(cache_keys[i], mat)
+            if cached is not None:
+                results[i]["forecast"] = cached
+                results[i]["cached"] = True
+    todo = [i for i, res in enumerate(results) if not res["cached"]]
+    for i, res in enumerate(results):
+        if res["cached"]:
+            yield i, res
+
+    # 🔗 single-flight: lead the fits nobody is running yet, follow the others
+    flights = {i: forecast_flight.claim(cache_keys[i]) for i in todo if i in cache_keys}
+    followers = [i for i in todo if i in flights and not flights[i][1]]
+    todo = [i for i in todo if i not in flights or flights[i][1]]
+
+    def finish(i):
+        """Store a finished fit and hand it to any requests waiting on it."""
+        res = results[i]
+        if res["forecast"] is None and not res["error"]:
+            res["error"] = "no forecast produced"
+        if i in cache_keys and res["forecast"] is not None:
+            forecast_cache.put(cache_keys[i], res["forecast"])
+        if i in flights:
+            flight, _ = flights.pop(i)
+            error = RuntimeError(res["error"]) if res["error"] else None
+            forecast_flight.resolve(cache_keys[i], flight, result=res["forecast"], error=error)
+
+    def follow(i, wait_timeout):
+        flight, _ = flights.pop(i)
+        res = results[i]
+        try:
+            res["forecast"] = relabel(flight.wait(wait_timeout).copy(), tasks[i][0])
+            res["shared"] = True
+        except Exception as e:
+            res["error"] = f"shared forecast failed: {e}"
+
+    def task_args(mat, remote):
+        if series_index is None:
+            return df.copy(deep=False), {}
+        return None, {"series_index": series_index.subset(mat) if remote else series_index}
+
+    # a fit that finished between our cache miss and claiming the key is already stored
+    for i in list(todo):
+        stored = forecast_cache.peek(cache_keys[i], tasks[i][0]) if i in cache_keys else None
+        if stored is not None:
+            todo.remove(i)
+            results[i]["forecast"], results[i]["cached"] = stored, True
+            finish(i)
+            yield i, results[i]
+
+    pending = set()
+    tokens = {}
+    try:
+        # single worker or single material: no point paying for IPC, unless the fit has a
+        # timeout - only a pool worker can be stopped when it overruns
+        if not timed and (max_workers <= 1 or len(todo) <= 1):
+            for i in todo:
+                mat, hm = tasks[i]
+                try:
+                    data, extra = task_args(mat, remote=False)
+                    results[i]["forecast"] = _run_forecast(data, mat, hm, {**forecast_kwargs, **extra})
+                except Exception as e:
+                    print(f"❌ Forecast failed for {mat}: {e}")
+                    results[i]["error"] = _error_text(e)
+                finish(i)
+                yield i, results[i]
+            for i in followers:
+                follow(i, None)
+                yield i, results[i]
+            return
+
+        futures, pools, retried = {}, {}, set()
+
+        def submit(i):
+            """Queue task i on the current pool, replacing it if it broke or was retired meanwhile."""
+            mat, hm = tasks[i]
+            data, extra = task_args(mat, remote=True)
+            for attempt in range(2):
+                pool, token = get_pool(), next(_task_tokens)
+                try:
+                    fut = pool.submit(_run_pooled, token, data, mat, hm, {**forecast_kwargs, **extra})
+                except RuntimeError:  # BrokenProcessPool, or shut down by another request
+                    reset_pool(pool)
+                    if attempt:
+                        raise
+                    continue
+                futures[fut], pools[fut], tokens[fut] = i, pool, token
+                return fut
+
+        # this call keeps at most max_workers of its fits in the pool at once; the rest wait here
+        backlog = list(todo)
+
+        def top_up():
+            while backlog and len(pending) < max(1, max_workers):
+                pending.add(submit(backlog.pop(0)))
+
+        top_up()
+        waiting = set(followers)
+        follow_deadline = time.monotonic() + timeout if timed else math.inf
+        while pending or waiting or backlog:
+            if pending:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            else:
+                done = set()
+                time.sleep(0.05)
+            for fut in done:
+                i = futures[fut]
+                res = results[i]
+                _task_starts.pop(tokens.pop(fut), None)
+                try:
+                    res["forecast"] = fut.result()
+                except (BrokenProcessPool, CancelledError) as e:
+                    # the pool died under this fit (a worker crashed, or a hung one was stopped):
+                    # give it one more go on a fresh pool
+                    reset_pool(pools[fut])
+                    error = f"worker crashed: {_error_text(e)}"
+                    if i not in retried:
+                        retried.add(i)
+                        try:
+                            pending.add(submit(i))
+                            continue
+                        except RuntimeError as retry_error:
+                            error = f"worker pool unavailable: {_error_text(retry_error)}"
+                    res["error"] = error
+                except Exception as e:
+                    print(f"❌ Forecast failed for {res['material']}: {e}")
+                    res["error"] = _error_text(e)
+                finish(i)
+                yield i, res
+
+            now = time.monotonic()
+            for fut in list(pending):
+                start = _task_starts.get(tokens[fut])
+                if not timed or fut.done() or start is None or now - start[1] <= timeout:
+                    continue
+                i = futures[fut]
+                pending.discard(fut)
+                _task_starts.pop(tokens.pop(fut), None)
+                # the worker is still busy with the abandoned fit: new work goes to a fresh
+                # pool, and the worker is stopped (fits it breaks elsewhere get retried there)
+                reset_pool(pools[fut])
+                _stop_worker(start[0])
+                results[i]["error"] = f"timed out after {timeout:g}s"
+                finish(i)
+                yield i, results[i]
+
+            for i in list(waiting):
+                if flights[i][0].done() or now > follow_deadline:
+                    waiting.discard(i)
+                    follow(i, 0)
+                    yield i, results[i]
+            top_up()
+    finally:
+        # consumer went away (e.g. a streaming client disconnected): drop queued fits
+        for fut in pending:
+            fut.cancel()
+        for token in tokens.values():
+            _task_starts.pop(token, None)
+        # release fits this request was leading so their followers don't hang
+        for i, (flight, leader) in list(flights.items()):
+            if leader:
+                forecast_flight.resolve(cache_keys[i], flight, error=RuntimeError("leading request was cancelled"))
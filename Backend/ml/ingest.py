@@ -0,0 +1,206 @@
+# backend/ml/ingest.py
+"""
+Bounded-memory ingestion of uploaded CSVs.
+
+stream_upload() copies the request body to disk in fixed-size chunks while
+hashing it, and rejects the file as soon as the header line is known to be
+missing required columns. ingest_csv() then makes a single chunked pass over
+the saved file that writes the canonical Feather artifact batch by batch and,
+optionally, collects row-level validation stats. Neither step ever holds more
+than one chunk of the file in memory.
+"""
+import os
+import csv
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from .dataset import (
+    CSV_ENCODING, CANONICAL_RENAMES, NUMERIC_COLS, artifact_path, canonicalize, guess_date_formats, feather,
+    temp_path,
+)
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+UPLOAD_CHUNK_ROWS = int(os.getenv("UPLOAD_CHUNK_ROWS", "100000"))
+MAX_HEADER_BYTES = 64 * 1024
+
+REQUIRED_UPLOAD_COLS = ["Date_of_Materail_Usage", "Material_Name", "Quantity_Used"]
+DATE_COL = CANONICAL_RENAMES["Date_of_Materail_Usage"]
+MAX_REPORTED_MATERIALS = 50
+
+
+class UploadValidationError(ValueError):
+    pass
+
+
+def parse_header(header_bytes: bytes) -> list:
+    """Column names from the first line of a CSV, stripped like the upload parser does."""
+    line = header_bytes.split(b"\n", 1)[0].decode(CSV_ENCODING).rstrip("\r")
+    return [c.strip() for c in next(csv.reader([line]), [])]
+
+
+async def stream_upload(file, dest_path: str, required_cols=REQUIRED_UPLOAD_COLS,
+                        chunk_bytes: int = UPLOAD_CHUNK_BYTES) -> dict:
+    """
+    Copy an UploadFile to `dest_path` chunk by chunk.
+    The header is validated as soon as its line has arrived; a bad file is
+    rejected before the rest of the body is read. The destination only
+    appears (atomically) once the whole body has been written.
+    Returns {"bytes", "sha256", "columns"}.
+    """
+    # unique per request: concurrent uploads of the same filename must not share a part file
+    tmp_path = temp_path(dest_path, ".part")
+    digest = hashlib.sha256()
+    header = b""
+    columns = None
+    size = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            while True:
+                chunk = await file.read(chunk_bytes)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+
+                if columns is None:
+                    header += chunk[:MAX_HEADER_BYTES]
+                    if b"\n" in header or len(header) >= MAX_HEADER_BYTES:
+                        columns = _check_header(header, required_cols)
+                        header = b""
+
+        if columns is None:  # file without a trailing newline after the header
+            columns = _check_header(header, required_cols)
+        os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return {"bytes": size, "sha256": digest.hexdigest(), "columns": columns}
+
+
+def _check_header(header: bytes, required_cols) -> list:
+    columns = parse_header(header)
+    missing = [c for c in required_cols if c not in columns]
+    if missing:
+        raise UploadValidationError(f"CSV missing columns: {missing}")
+    return columns
+
+
+def _arrow_schema(chunk: pd.DataFrame):
+    """Fixed schema for every batch, so a chunk full of blanks can't change a column's type."""
+    fields = []
+    for col in chunk.columns:
+        if pd.api.types.is_datetime64_any_dtype(chunk[col]):
+            fields.append(pa.field(col, pa.timestamp("ns")))
+        elif col in NUMERIC_COLS:
+            fields.append(pa.field(col, pa.float64()))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+
+class RowValidator:
+    """Accumulates row-level data-quality stats over canonicalized chunks."""
+
+    def __init__(self, known_materials=None):
+        self.known = {str(m).strip().lower() for m in known_materials} if known_materials else None
+        self.rows = 0
+        self.dates_parsed = 0
+        self.negative_quantity = 0
+        self.missing_quantity = 0
+        self.blank_material = 0
+        self.materials = set()
+
+    def update(self, chunk: pd.DataFrame):
+        self.rows += len(chunk)
+        if DATE_COL in chunk.columns:
+            self.dates_parsed += int(chunk[DATE_COL].notna().sum())
+        if "Quantity_Used" in chunk.columns:
+            q = chunk["Quantity_Used"].to_numpy(dtype=float)
+            self.negative_quantity += int((q < 0).sum())
+            self.missing_quantity += int(np.isnan(q).sum())
+        if "Material_Name" in chunk.columns:
+            names = chunk["Material_Name"]
+            blank = names.isin(["", "nan"])
+            self.blank_material += int(blank.sum())
+            self.materials.update(names[~blank].unique())
+
+    def report(self) -> dict:
+        materials = sorted(self.materials)
+        unknown = [m for m in materials if m not in self.known] if self.known is not None else []
+        return {
+            "rows": self.rows,
+            "date_parse_rate": round(self.dates_parsed / self.rows, 4) if self.rows else 0.0,
+            "unparsed_dates": self.rows - self.dates_parsed,
+            "negative_quantity_rows": self.negative_quantity,
+            "missing_quantity_rows": self.missing_quantity,
+            "blank_material_rows": self.blank_material,
+            "material_count": len(materials),
+            "materials": materials[:MAX_REPORTED_MATERIALS],
+            "unknown_materials": unknown[:MAX_REPORTED_MATERIALS],
+        }
+
+
+def ingest_csv(csv_path: str, validate_rows: bool = False, known_materials=None,
+               chunk_rows: int = UPLOAD_CHUNK_ROWS) -> dict:
+    """
+    One chunked pass over a saved upload: writes the canonical artifact batch by
+    batch (when pyarrow is available) and optionally validates rows.
+    Returns {"artifact": path or None, "validation": stats or None}.
+    """
+    write_artifact = feather is not None and pa is not None
+    validator = RowValidator(known_materials) if validate_rows else None
+    if not write_artifact and validator is None:
+        return {"artifact": None, "validation": None}
+
+    path = artifact_path(csv_path)
+    tmp_path = temp_path(path)
+    writer = None
+    schema = None
+    error = None
+    date_formats = None
+    try:
+        # everything as text first; canonicalize() decides the real dtypes per column
+        for chunk in pd.read_csv(csv_path, encoding=CSV_ENCODING, dtype=str, chunksize=chunk_rows):
+            if date_formats is None:
+                chunk.columns = [c.strip() for c in chunk.columns]
+                date_formats = guess_date_formats(chunk.rename(columns=CANONICAL_RENAMES))
+            chunk = canonicalize(chunk, categorical=False, date_formats=date_formats)
+            for col in NUMERIC_COLS:
+                if col in chunk.columns:
+                    chunk[col] = chunk[col].astype(float)
+            if validator is not None:
+                validator.update(chunk)
+            if write_artifact:
+                if writer is None:
+                    schema = _arrow_schema(chunk)
+                    writer = pa.ipc.new_file(tmp_path, schema)  # Feather v2 == Arrow IPC file
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        if writer is not None:
+            writer.close()
+            writer = None
+            os.replace(tmp_path, path)
+        else:
+            path = None
+    except Exception as e:
+        print("⚠️ Chunked ingest failed, artifact will be built on first access:", e)
+        error = str(e)
+        path = None
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    report = validator.report() if validator is not None else None
+    if report is not None and error:
+        report["error"] = f"validation stopped early: {error}"
+    return {"artifact": path if write_artifact else None, "validation": report}
@@ -0,0 +1,177 @@
+# backend/ml/jobs.py
+"""
+In-process job queue for long-running work (forecast fits, dashboards).
+
+Submitting returns a job id at once; a bounded thread pool runs the work
+off the request threadpool, so slow fits can't starve cheap endpoints like
+/health. Finished jobs keep their result for JOB_RESULT_TTL seconds and are
+purged after that. A queued job can be cancelled outright; a running one
+is only flagged, since Python threads can't be interrupted (its result is
+discarded when it finishes).
+Jobs run in lanes, each with its own workers: background work such as the
+post-upload forecast warm-up goes to the "warmup" lane, so it can never
+take the workers interactive jobs queue for.
+"""
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+WARMUP_JOB_WORKERS = int(os.getenv("WARMUP_JOB_WORKERS", "1"))
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "900"))
+MAX_JOBS = int(os.getenv("MAX_JOBS", "1000"))  # queued + running + retained
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+DEFAULT_LANE = "default"
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+class Job:
+    def __init__(self, kind: str, params: dict = None, lane: str = DEFAULT_LANE):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.lane = lane
+        self.params = params or {}
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.error_status = None
+        self.cancel_requested = False
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "lane": self.lane,
+            "status": self.status,
+            "params": self.params,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "runtime_s": round(self.finished - self.started, 3) if self.started and self.finished else None,
+            "expires": self.finished + JOB_RESULT_TTL if self.finished else None,
+        }
+
+
+class JobQueue:
+    """Job registry plus one worker pool per lane (`lanes` maps extra lanes to their worker count)."""
+
+    def __init__(self, workers: int = JOB_WORKERS, ttl: float = JOB_RESULT_TTL, max_jobs: int = MAX_JOBS,
+                 lanes: dict = None):
+        self.workers = workers
+        self.lanes = {DEFAULT_LANE: workers, **(lanes or {})}
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pools = {}
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.expired = 0
+
+    def _executor(self, lane: str) -> ThreadPoolExecutor:
+        # created lazily so importing the app doesn't spawn threads
+        if lane not in self._pools:
+            self._pools[lane] = ThreadPoolExecutor(max_workers=self.lanes[lane], thread_name_prefix=f"job-{lane}")
+        return self._pools[lane]
+
+    def _purge(self, now: float):
+        """Drop finished jobs whose result has outlived the TTL (caller holds the lock)."""
+        for job_id in [j.id for j in self._jobs.values() if j.finished and now - j.finished > self.ttl]:
+            del self._jobs[job_id]
+            self.expired += 1
+
+    def submit(self, kind: str, fn, *args, params: dict = None, lane: str = DEFAULT_LANE, **kwargs) -> Job:
+        """Queue fn(*args, **kwargs) in `lane`; `params` is echoed back in the job status."""
+        if lane not in self.lanes:
+            raise ValueError(f"Unknown job lane '{lane}'. Expected one of: {list(self.lanes)}")
+        job = Job(kind, params, lane)
+        with self._lock:
+            self._purge(time.time())
+            if len(self._jobs) >= self.max_jobs:
+                raise JobQueueFull(f"Job queue is full ({self.max_jobs} jobs)")
+            self._jobs[job.id] = job
+            job.future = self._executor(lane).submit(self._run, job, fn, args, kwargs)
+        print(f"🧾 Queued {kind} job {job.id}")
+        return job
+
+    def _run(self, job: Job, fn, args, kwargs):
+        with self._lock:
+            if job.cancel_requested:
+                return
+            job.status, job.started = RUNNING, time.time()
+        try:
+            result, error, error_status = fn(*args, **kwargs), None, None
+        except Exception as e:
+            result, error = None, str(getattr(e, "detail", None) or e)
+            error_status = getattr(e, "status_code", None)
+        with self._lock:
+            job.finished = time.time()
+            if job.cancel_requested:
+                job.status = CANCELLED
+            elif error is not None:
+                job.status, job.error, job.error_status = FAILED, error, error_status
+                self.failed += 1
+                print(f"❌ {job.kind} job {job.id} failed: {error}")
+            else:
+                job.status, job.result = DONE, result
+                self.completed += 1
+
+    def get(self, job_id: str):
+        with self._lock:
+            self._purge(time.time())
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str):
+        """Cancel a job; returns it (None if unknown). Finished jobs are left as they are."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return job
+            job.cancel_requested = True
+            self.cancelled += 1
+            if job.status == QUEUED:
+                job.future.cancel()
+                job.status, job.finished = CANCELLED, time.time()
+            return job
+
+    def list(self, kind: str = None) -> list:
+        with self._lock:
+            self._purge(time.time())
+            return [j.to_dict() for j in self._jobs.values() if kind is None or j.kind == kind]
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._purge(time.time())
+            by_status = {s: 0 for s in (QUEUED, RUNNING) + FINISHED}
+            lanes = {lane: {"workers": n, QUEUED: 0, RUNNING: 0} for lane, n in self.lanes.items()}
+            for job in self._jobs.values():
+                by_status[job.status] += 1
+                if job.status in (QUEUED, RUNNING):
+                    lanes[job.lane][job.status] += 1
+            return {
+                "workers": self.workers,
+                "lanes": lanes,
+                "ttl_s": self.ttl,
+                "jobs": len(self._jobs),
+                **by_status,
+                "completed_total": self.completed,
+                "failed_total": self.failed,
+                "cancelled_total": self.cancelled,
+                "expired_total": self.expired,
+            }
+
+
+job_queue = JobQueue(lanes={"warmup": WARMUP_JOB_WORKERS})
@@ -0,0 +1,177 @@
+# backend/ml/model_cache.py
+"""
+Two-tier cache for fitted Prophet models.
+
+Models are keyed by a fingerprint of the training frame (derived from the
+uploaded CSV content), the material, the regressor set and the model config.
+Hot models live in an in-memory LRU; every fitted model is also written to
+data/models/<key>.json with Prophet's JSON serializer so restarts stay warm.
+The disk tier is capped by file count and total size; the least recently
+used files (by mtime, refreshed on every disk hit) are pruned after each write.
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from prophet.serialize import model_to_json, model_from_json
+
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", "data/models")
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "32"))
+MODEL_DISK_MAX_FILES = int(os.getenv("MODEL_DISK_MAX_FILES", "500"))
+MODEL_DISK_MAX_BYTES = int(os.getenv("MODEL_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """Stable content hash of a DataFrame (values + column names)."""
+    h = hashlib.sha256()
+    h.update(",".join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def model_cache_key(fingerprint: str, material: str, regressors, config: dict) -> str:
+    payload = json.dumps({
+        "data": fingerprint,
+        "material": str(material).strip().lower(),
+        "regressors": sorted(regressors),
+        "config": config,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ModelCache:
+    """In-memory LRU in front of an on-disk store of serialized models."""
+
+    def __init__(self, cache_dir: str = MODEL_CACHE_DIR, max_items: int = MODEL_CACHE_SIZE,
+                 max_disk_files: int = MODEL_DISK_MAX_FILES, max_disk_bytes: int = MODEL_DISK_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+        self.max_disk_files = max_disk_files
+        self.max_disk_bytes = max_disk_bytes
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _remember(self, key, model):
+        with self._lock:
+            self._models[key] = model
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_items:
+                self._models.popitem(last=False)
+
+    def get(self, key: str):
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return model
+
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                model = model_from_json(f.read())
+            self._touch(path)
+            self._remember(key, model)
+            with self._lock:
+                self.disk_hits += 1
+            return model
+        except FileNotFoundError:
+            pass  # never written, or pruned
+        except Exception as e:
+            print(f"⚠️ Corrupt cached model {key}, refitting:", e)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, model):
+        self._remember(key, model)
+        # write to a temp file first so readers never see a half-written model
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(model_to_json(model))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print("⚠️ Failed to persist model:", e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.prune()
+
+    @staticmethod
+    def _touch(path: str):
+        # mtime doubles as the disk tier's last-used time
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _disk_files(self) -> list:
+        """(mtime, size, path) of every stored model, oldest first."""
+        files = []
+        try:
+            entries = list(os.scandir(self.cache_dir))
+        except FileNotFoundError:
+            return files
+        for entry in entries:
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue  # pruned by another process
+            files.append((st.st_mtime, st.st_size, entry.path))
+        files.sort()
+        return files
+
+    def prune(self) -> int:
+        """Delete least recently used model files until the disk tier is within its caps."""
+        files = self._disk_files()
+        count, total = len(files), sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in files:
+            if count <= self.max_disk_files and total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass  # another worker got there first
+            count -= 1
+            total -= size
+        if removed:
+            with self._lock:
+                self.disk_evictions += removed
+        return removed
+
+    def stats(self) -> dict:
+        files = self._disk_files()
+        with self._lock:
+            return {
+                "memory_items": len(self._models),
+                "max_items": self.max_items,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "disk_files": len(files),
+                "disk_bytes": sum(size for _, size, _ in files),
+                "max_disk_files": self.max_disk_files,
+                "max_disk_bytes": self.max_disk_bytes,
+                "disk_evictions": self.disk_evictions,  # by this process; fits in pool workers prune too
+            }
+
+
+model_cache = ModelCache()
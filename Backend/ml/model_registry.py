@@ -0,0 +1,296 @@
+# backend/ml/model_registry.py
+"""
+Registry for the pre-trained models in ml/models/.
+
+Files are discovered by name: <name>_v<version>.joblib (sklearn pipelines)
+or .npz (NumPy exports); unversioned files count as version 0. Nothing is
+loaded at import: get(name) loads the newest version on first use, with
+joblib's mmap_mode (and a member-by-member memory map for .npz) so the
+arrays are backed by the page cache and shared between uvicorn workers.
+
+The directory is re-scanned at most every MODEL_CHECK_INTERVAL seconds on
+access. When a newer version appears, or the loaded file changes on disk,
+the replacement is loaded next to the old model and swapped in with one
+assignment; requests already holding the old model finish with it. If the
+new file can't be loaded (e.g. still being copied; write to a temp name
+and rename), the old model keeps serving and the load is retried once the
+file changes again. Per-model load time and memory footprint are kept for /models.
+"""
+import os
+import re
+import time
+import mmap
+import struct
+import zipfile
+import threading
+
+import joblib
+import numpy as np
+
+from .singleflight import SingleFlight
+from .risk_compiled import file_sha256
+
+MODEL_DIR = os.getenv("MODEL_DIR", "ml/models")
+MODEL_CHECK_INTERVAL = float(os.getenv("MODEL_CHECK_INTERVAL", "5"))
+MODEL_MMAP = os.getenv("MODEL_MMAP", "1") == "1"
+
+MODEL_FILE = re.compile(r"^(?P<name>.+?)(?:_v(?P<version>\d+))?\.(?P<kind>joblib|npz)$")
+MMAP_MIN_BYTES = 4096  # smaller arrays are just read
+
+
+def _rss_bytes():
+    """Resident set size of this process (Linux); None where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _mapped_bytes(obj, seen=None) -> int:
+    """Bytes of memory-mapped NumPy arrays reachable from obj."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        base = obj
+        while isinstance(base, np.ndarray) and not isinstance(base, np.memmap):
+            base = base.base
+        return obj.nbytes if isinstance(base, (np.memmap, mmap.mmap)) else 0
+    if isinstance(obj, dict):
+        return sum(_mapped_bytes(v, seen) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_mapped_bytes(v, seen) for v in obj)
+    if hasattr(obj, "__dict__"):
+        return _mapped_bytes(vars(obj), seen)
+    return 0
+
+
+def load_npz(path: str, mmap_mode: str = "r") -> dict:
+    """
+    Arrays of an .npz file. np.load() can't memory-map archive members, so
+    uncompressed members of at least MMAP_MIN_BYTES are mapped straight from
+    their offset in the archive; everything else is read normally.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            key = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if not mmap_mode or info.compress_type != zipfile.ZIP_STORED or info.file_size < MMAP_MIN_BYTES:
+                with zf.open(info) as member:
+                    arrays[key] = np.lib.format.read_array(member, allow_pickle=False)
+                continue
+            # local file header: fixed 30 bytes, then the file name and extra field
+            f.seek(info.header_offset)
+            name_len, extra_len = struct.unpack("<HH", f.read(30)[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f"{path}: object arrays can't be memory-mapped ({key})")
+            arrays[key] = np.memmap(path, dtype=dtype, mode=mmap_mode, offset=f.tell(), shape=shape,
+                                    order="F" if fortran_order else "C")
+    return arrays
+
+
+class ModelFile:
+    def __init__(self, path: str, name: str, version: int, kind: str):
+        stat = os.stat(path)
+        self.path = path
+        self.name = name
+        self.version = version
+        self.kind = kind
+        self.mtime = stat.st_mtime
+        self.size = stat.st_size
+        self._sha256 = None
+
+    @property
+    def sha256(self) -> str:
+        # computed on demand (e.g. to pair an .npz export with its joblib), once per file state
+        if self._sha256 is None:
+            self._sha256 = file_sha256(self.path)
+        return self._sha256
+
+    def same_file(self, other) -> bool:
+        return other is not None and (self.path, self.mtime, self.size) == (other.path, other.mtime, other.size)
+
+
+class ModelEntry:
+    """A loaded model plus what it cost to load."""
+
+    def __init__(self, file: ModelFile, model, load_ms: float, rss_delta, mapped_bytes: int):
+        self.file = file
+        self.model = model
+        self.load_ms = load_ms
+        self.rss_delta = rss_delta
+        self.mapped_bytes = mapped_bytes
+        self.loaded_at = time.time()
+
+    def to_dict(self) -> dict:
+        return {
+            "loaded": True,
+            "loaded_at": self.loaded_at,
+            "load_ms": round(self.load_ms, 1),
+            "mapped_bytes": self.mapped_bytes,    # shared page cache, not per worker
+            "rss_delta_bytes": self.rss_delta,    # private memory the load added (approximate)
+        }
+
+
+class ModelRegistry:
+    def __init__(self, model_dir: str = MODEL_DIR, check_interval: float = MODEL_CHECK_INTERVAL,
+                 use_mmap: bool = MODEL_MMAP):
+        self.model_dir = model_dir
+        self.check_interval = check_interval
+        self.use_mmap = use_mmap
+        self._files = {}      # (name, kind) -> newest ModelFile
+        self._entries = {}    # (name, kind) -> ModelEntry in service
+        self._builders = {}   # (name, kind) -> callable(raw) -> model, e.g. CompiledRiskModel for arrays
+        self._failed = {}     # (name, kind) -> (ModelFile, error) of the last failed load
+        self._last_scan = None
+        self._lock = threading.Lock()
+        self._flight = SingleFlight("model load")
+        self.loads = 0
+        self.reloads = 0
+        self.errors = 0
+
+    def register(self, name: str, kind: str, build):
+        """Turn the raw load result (joblib object / dict of arrays) of a model into its runtime form."""
+        self._builders[(name, kind)] = build
+
+    # ---- discovery ----
+    def scan(self) -> dict:
+        """Re-read the model directory; keeps the newest version per (name, kind)."""
+        found = {}
+        try:
+            names = sorted(os.listdir(self.model_dir))
+        except FileNotFoundError:
+            names = []
+        for filename in names:
+            m = MODEL_FILE.match(filename)
+            if not m:
+                continue
+            key, version = (m["name"], m["kind"]), int(m["version"] or 0)
+            try:
+                file = ModelFile(os.path.join(self.model_dir, filename), m["name"], version, m["kind"])
+            except FileNotFoundError:  # removed while scanning
+                continue
+            if key not in found or version > found[key].version:
+                found[key] = file
+        with self._lock:
+            previous = self._files
+            for key, file in found.items():
+                if file.same_file(previous.get(key)):
+                    found[key] = previous[key]  # keep the cached sha256
+            self._files = found
+            self._last_scan = time.monotonic()
+        return found
+
+    def _current(self, name: str, kind: str):
+        if self._last_scan is None or time.monotonic() - self._last_scan >= self.check_interval:
+            self.scan()
+        return self._files.get((name, kind))
+
+    def info(self, name: str, kind: str = "joblib"):
+        """Newest ModelFile for a model (without loading it); None if there is none."""
+        return self._current(name, kind)
+
+    # ---- loading ----
+    def _load(self, file: ModelFile) -> ModelEntry:
+        key = (file.name, file.kind)
+        rss_before, started = _rss_bytes(), time.perf_counter()
+        if file.kind == "npz":
+            raw = load_npz(file.path, "r" if self.use_mmap else None)
+        else:
+            raw = joblib.load(file.path, mmap_mode="r" if self.use_mmap else None)
+        build = self._builders.get(key)
+        model = build(raw) if build else raw
+        load_ms = (time.perf_counter() - started) * 1000
+        rss_after = _rss_bytes()
+        entry = ModelEntry(file, model, load_ms,
+                           rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+                           _mapped_bytes(raw))
+        with self._lock:
+            old = self._entries.get(key)
+            self._entries[key] = entry  # the swap: readers see the old or the new entry, never a mix
+            self._failed.pop(key, None)
+            self.loads += 1
+            self.reloads += old is not None
+        verb = "Reloaded" if old is not None else "Loaded"
+        print(f"📦 {verb} model {os.path.basename(file.path)} in {load_ms:.0f} ms")
+        return entry
+
+    def entry(self, name: str, kind: str = "joblib"):
+        """Entry of the newest version of a model, loading / hot-swapping as needed; None if absent."""
+        key = (name, kind)
+        file = self._current(name, kind)
+        entry = self._entries.get(key)
+        if file is None or (entry is not None and file.same_file(entry.file)):
+            return entry
+        failed = self._failed.get(key)
+        if failed is not None and file.same_file(failed[0]):
+            # don't retry a broken file until it changes
+            if entry is None:
+                raise RuntimeError(f"Model {os.path.basename(file.path)} failed to load: {failed[1]}")
+            return entry
+        try:
+            return self._flight.do((name, kind, file.path, file.mtime, file.size), lambda: self._load(file))[0]
+        except Exception as e:
+            with self._lock:
+                self._failed[key] = (file, str(e))
+                self.errors += 1
+            print(f"⚠️ Failed to load model {os.path.basename(file.path)}:", e)
+            if entry is None:
+                raise
+            return entry
+
+    def get(self, name: str, kind: str = "joblib"):
+        """The model object itself (see entry())."""
+        entry = self.entry(name, kind)
+        return entry.model if entry is not None else None
+
+    def reload(self) -> dict:
+        """Re-scan now and load every changed model that was already in service."""
+        self.scan()
+        for name, kind in list(self._entries):
+            try:
+                self.entry(name, kind)
+            except Exception:
+                pass
+        return self.stats()
+
+    def stats(self) -> dict:
+        if self._last_scan is None:
+            self.scan()
+        with self._lock:
+            models = []
+            for (name, kind), file in sorted(self._files.items()):
+                entry = self._entries.get((name, kind))
+                failed = self._failed.get((name, kind))
+                models.append({
+                    "name": name,
+                    "kind": kind,
+                    "version": file.version,
+                    "path": file.path,
+                    "size_bytes": file.size,
+                    "mtime": file.mtime,
+                    "loaded_version": entry.file.version if entry else None,
+                    "stale": bool(entry) and not file.same_file(entry.file),
+                    "load_error": failed[1] if failed else None,
+                    **(entry.to_dict() if entry else {"loaded": False}),
+                })
+            return {
+                "dir": self.model_dir,
+                "mmap": self.use_mmap,
+                "check_interval_s": self.check_interval,
+                "loads": self.loads,
+                "reloads": self.reloads,
+                "errors": self.errors,
+                "models": models,
+            }
+
+
+model_registry = ModelRegistry()
@@ -1,9 +1,26 @@
 # recommendation.py
+import numpy as np
 import pandas as pd
 
 # Default buffer stock settings
 DEFAULT_SAFETY_STOCK_PERCENT = 0.10  # Keep 10% of forecasted need as safety stock
 
+# Optional context columns carried through to every recommendation row
+OPTIONAL_COLS = [
+    'Average_Delivery_Time_Days', 'Delivery_Delays', 'Contractor_Team_Size',
+    'Number_of_Shifts_Work_Hours', 'Planned_Quantity', 'Project_Phase',
+    'Notes_Special_Conditions', 'Budget_Planned_Quantity', 'Weather_Condition',
+    'Regional_Risk_Level'
+]
+
+# Per-material parameters understood by the batch API, with their defaults
+BATCH_PARAM_DEFAULTS = {
+    'lead_time_days': 10,
+    'current_inventory': 0.0,
+    'supplier_reliability': 100.0,
+    'safety_stock_percent': DEFAULT_SAFETY_STOCK_PERCENT,
+}
+
 
 def generate_procurement_recommendations(
     forecast_df: pd.DataFrame,
@@ -92,7 +109,7 @@ def generate_procurement_recommendations(
     # For per-row logic, we'll use a broadcasted current_inventory if provided as scalar.
     recommendations['recommended_order_quantity'] = (
         recommendations['total_need'] - float(current_inventory)
-    ).apply(lambda x: max(0, x)).round().astype(int)
+    ).clip(lower=0).round().astype(int)
 
     # Reset (conceptual) inventory after first use
     # NOTE: we intentionally do **not** mutate the passed in current_inventory here, backend handles per-material stock if provided.
@@ -108,12 +125,7 @@ def generate_procurement_recommendations(
     recommendations['recommended_order_date'] = pd.to_datetime(recommendations['recommended_order_date'], errors='coerce')
 
     # ✅ Step 8: Add optional fields if missing
-    optional_cols = [
-        'Average_Delivery_Time_Days', 'Delivery_Delays', 'Contractor_Team_Size',
-        'Number_of_Shifts_Work_Hours', 'Planned_Quantity', 'Project_Phase',
-        'Notes_Special_Conditions', 'Budget_Planned_Quantity', 'Weather_Condition',
-        'Regional_Risk_Level'
-    ]
+    optional_cols = OPTIONAL_COLS
     for col in optional_cols:
         if col not in recommendations.columns:
             recommendations[col] = None
@@ -153,3 +165,120 @@ def generate_procurement_recommendations(
 
     # Return both DataFrames (frontend/backend will convert to JSON lists)
     return final_output, bulk_orders_df
+
+
+def order_quantities(yhat, current_inventory, supplier_reliability, safety_stock_percent):
+    """
+    Recommended order quantity for forecasted demand `yhat`, as NumPy math that
+    broadcasts: pass per-row arrays (batch mode) or arrays shaped for a grid of
+    scenarios and get the quantity for every combination at once.
+    """
+    yhat = np.clip(np.asarray(yhat, dtype=float), 0, None)
+    total_need = yhat + yhat * safety_stock_percent
+    reliability = np.clip(np.asarray(supplier_reliability, dtype=float) / 100.0, 0.1, None)  # prevent div/0
+    total_need = np.round(total_need / reliability)
+    return np.round(np.clip(total_need - current_inventory, 0, None)).astype(int)
+
+
+def order_dates(forecast_date, lead_time_days):
+    """Order date = month start of the demand month minus the lead time (broadcasts like order_quantities)."""
+    need_date = pd.DatetimeIndex(forecast_date).to_period('M').start_time.to_numpy()
+    return need_date - np.asarray(lead_time_days).astype('timedelta64[D]')
+
+
+def generate_procurement_recommendations_batch(
+    forecast_df: pd.DataFrame,
+    params_df: pd.DataFrame = None,
+    bulk_orders: bool = True
+) -> (pd.DataFrame, pd.DataFrame):
+    """
+    Multi-material version of generate_procurement_recommendations.
+
+    Args:
+      - forecast_df: long format forecast for all materials
+        (material, forecast_date, yhat).
+      - params_df: one row per material with any of lead_time_days,
+        current_inventory, supplier_reliability (0-100), safety_stock_percent,
+        supplier and the OPTIONAL_COLS context fields. Missing materials or
+        values fall back to BATCH_PARAM_DEFAULTS.
+      - bulk_orders: False skips the bulk order consolidation (an empty frame is
+        returned), for callers that consolidate several batches themselves.
+
+    Every quantity and date is computed column-wise over all rows at once, the
+    same way the single-material function does it per material.
+
+    Returns:
+      - final_output (DataFrame): same columns as generate_procurement_recommendations
+      - bulk_orders_df (DataFrame): orders consolidated across materials per order
+        month (and supplier, when params_df has one): order_month, [supplier],
+        bulk_order_quantity, material_count, related_materials
+    """
+    required_cols = ['forecast_date', 'yhat', 'material']
+    if not all(col in forecast_df.columns for col in required_cols):
+        raise ValueError("Forecast DataFrame is missing required columns (forecast_date, yhat, material).")
+
+    material = forecast_df['material'].astype(str).to_numpy()
+    forecast_date = pd.to_datetime(forecast_df['forecast_date'], errors='coerce')
+    yhat = pd.to_numeric(forecast_df['yhat'], errors='coerce').fillna(0).clip(lower=0).to_numpy(dtype=float)
+
+    # ✅ Line every forecast row up with its material's parameters
+    key = pd.Index(np.char.lower(np.char.strip(material.astype(str))))
+    if params_df is not None and not params_df.empty:
+        params = params_df.copy()
+        params.index = params['material'].astype(str).str.strip().str.lower()
+        params = params[~params.index.duplicated(keep='last')].reindex(key)
+    else:
+        params = pd.DataFrame(index=key)
+
+    def param(name):
+        default = BATCH_PARAM_DEFAULTS[name]
+        if name not in params.columns:
+            return np.full(len(key), float(default))
+        return pd.to_numeric(params[name], errors='coerce').fillna(default).to_numpy(dtype=float)
+
+    # ✅ Safety stock, reliability-adjusted need, order quantity and order date
+    order_qty = order_quantities(yhat, param('current_inventory'), param('supplier_reliability'),
+                                 param('safety_stock_percent'))
+    order_date = order_dates(forecast_date, param('lead_time_days').astype(int))
+
+    final_output = pd.DataFrame({
+        'material': material,
+        'forecast_date': forecast_date.to_numpy(),
+        'recommended_order_quantity': order_qty,
+        'recommended_order_date': order_date,
+        'forecasted_demand': yhat,
+    })
+    for col in OPTIONAL_COLS:
+        final_output[col] = params[col].to_numpy() if col in params.columns else None
+    if 'supplier' in params.columns:
+        final_output['supplier'] = params['supplier'].fillna('').astype(str).to_numpy()
+
+    # Only show months with positive order quantity
+    final_output = final_output[final_output['recommended_order_quantity'] > 0].reset_index(drop=True)
+
+    # ✅ Bulk orders: one pass over every material's orders
+    bulk_orders_df = consolidate_bulk_orders(final_output) if bulk_orders else pd.DataFrame()
+
+    print("✅ Batch recommendation shape:", final_output.shape)
+    print("✅ Bulk orders shape:", bulk_orders_df.shape)
+    return final_output, bulk_orders_df
+
+
+def consolidate_bulk_orders(final_output: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bulk orders from recommendation rows of any number of materials: quantities
+    summed per order month (and supplier, when the rows have one).
+    """
+    keys = ['order_month'] + (['supplier'] if 'supplier' in final_output.columns else [])
+    if final_output.empty:
+        return pd.DataFrame(columns=keys + ['bulk_order_quantity', 'material_count', 'related_materials'])
+    order_date = pd.to_datetime(final_output['recommended_order_date'], errors='coerce')
+    return (
+        final_output
+        .assign(order_month=order_date.dt.to_period('M').astype(str))
+        .groupby(keys, sort=True)
+        .agg(bulk_order_quantity=('recommended_order_quantity', 'sum'),
+             material_count=('material', 'nunique'),
+             related_materials=('material', lambda m: ", ".join(pd.unique(m))))
+        .reset_index()
+    )
@@ -0,0 +1,178 @@
+# backend/ml/risk_compiled.py
+"""
+Array-backed copy of the risk pipeline for low-latency scoring.
+
+compile_pipeline() flattens the fitted sklearn Pipeline (mean imputer +
+StandardScaler for numbers, most-frequent imputer + OneHotEncoder for
+categories, RandomForestClassifier) into plain NumPy arrays:
+scaler constants, a category -> column lookup and the node arrays of all
+trees laid end to end. CompiledRiskModel scores rows with those arrays
+only: no DataFrame, no input validation, and every tree is walked at once,
+one depth level per step. It reproduces predict_proba exactly (same
+float32 inputs, same float64 thresholds, trees summed in the same order).
+
+The export is saved as an uncompressed .npz next to the joblib file and
+records the joblib's sha256, so a retrained pipeline is never paired with
+a stale export.
+"""
+import hashlib
+
+import numpy as np
+
+COMPILED_FORMAT = 1
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def compile_pipeline(model, source_path: str = None) -> dict:
+    """
+    Arrays for CompiledRiskModel from the fitted risk pipeline.
+    ValueError if the pipeline isn't the imputer/scaler/one-hot/forest layout it knows.
+    """
+    pre, forest = model.named_steps["preprocessor"], model.named_steps["clf"]
+    transformers = {name: (steps, cols) for name, steps, cols in pre.transformers_ if name != "remainder"}
+    if set(transformers) != {"num", "cat"} or [name for name, _, _ in pre.transformers_][:2] != ["num", "cat"]:
+        raise ValueError(f"Unsupported preprocessor layout: {list(transformers)}")
+    (num, num_cols), (cat, cat_cols) = transformers["num"], transformers["cat"]
+    imputer, scaler = num.named_steps["imputer"], num.named_steps["scaler"]
+    cat_imputer, encoder = cat.named_steps["imputer"], cat.named_steps["encoder"]
+    if imputer.strategy != "mean" or not np.all(np.isfinite(imputer.statistics_)):
+        raise ValueError("Numeric imputer must be a fitted mean imputer")
+    if encoder.drop is not None or encoder.handle_unknown != "ignore" or getattr(encoder, "infrequent_categories_", None):
+        raise ValueError("One-hot encoder must use drop=None and handle_unknown='ignore'")
+
+    # one-hot layout: category code -> output column, codes numbered across all categorical features
+    categories, cat_offsets, offset = [], [0], len(num_cols)
+    for values in encoder.categories_:
+        categories.extend(str(v) for v in values)
+        cat_offsets.append(cat_offsets[-1] + len(values))
+    n_features = offset + len(categories)
+    if n_features != forest.n_features_in_:
+        raise ValueError(f"Pipeline emits {n_features} features, forest expects {forest.n_features_in_}")
+
+    # all trees end to end; leaves point at themselves (that is how the predictor spots them)
+    left, right, feature, threshold, proba, roots = [], [], [], [], [], []
+    start = 0
+    for est in forest.estimators_:
+        t = est.tree_
+        nodes = np.arange(t.node_count)
+        is_leaf = t.children_left == -1
+        left.append(np.where(is_leaf, nodes, t.children_left) + start)
+        right.append(np.where(is_leaf, nodes, t.children_right) + start)
+        feature.append(np.where(is_leaf, 0, t.feature))
+        threshold.append(np.where(is_leaf, 0.0, t.threshold))
+        value = t.value[:, 0, :forest.n_classes_].astype(np.float64)
+        normalizer = value.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        proba.append(value / normalizer)  # what DecisionTreeClassifier.predict_proba returns per leaf
+        roots.append(start)
+        start += t.node_count
+
+    return {
+        "format": np.array(COMPILED_FORMAT),
+        "source_sha256": np.array(file_sha256(source_path) if source_path else ""),
+        "classes": np.asarray(forest.classes_).astype(str),
+        "num_features": np.asarray(num_cols).astype(str),
+        "num_fill": imputer.statistics_.astype(np.float64),
+        "num_mean": (scaler.mean_ if scaler.with_mean else np.zeros(len(num_cols))).astype(np.float64),
+        "num_scale": (scaler.scale_ if scaler.with_std else np.ones(len(num_cols))).astype(np.float64),
+        "cat_features": np.asarray(cat_cols).astype(str),
+        "cat_fill": np.asarray(cat_imputer.statistics_).astype(str),
+        "categories": np.asarray(categories).astype(str),
+        "cat_offsets": np.asarray(cat_offsets, dtype=np.int32),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int16),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "proba": np.concatenate(proba),
+    }
+
+
+def save_compiled(arrays: dict, path: str):
+    np.savez(path, **arrays)  # uncompressed, so members can be read without inflating
+
+
+class CompiledRiskModel:
+    def __init__(self, arrays):
+        if int(arrays["format"]) != COMPILED_FORMAT:
+            raise ValueError(f"Unsupported compiled model format {int(arrays['format'])}")
+        self.source_sha256 = str(arrays["source_sha256"])
+        self.classes_ = np.asarray(arrays["classes"]).astype(object)
+        self.num_features = [str(c) for c in arrays["num_features"]]
+        self.cat_features = [str(c) for c in arrays["cat_features"]]
+        self.num_fill = arrays["num_fill"]
+        self.num_mean = arrays["num_mean"]
+        self.num_scale = arrays["num_scale"]
+        self.cat_fill = [str(v) for v in arrays["cat_fill"]]
+        offsets = arrays["cat_offsets"]
+        categories = arrays["categories"]
+        n_num = len(self.num_features)
+        # per categorical feature: value -> column of the transformed matrix
+        self.cat_columns = [
+            {str(categories[code]): n_num + code for code in range(offsets[i], offsets[i + 1])}
+            for i in range(len(self.cat_features))
+        ]
+        self.n_features = n_num + int(offsets[-1])
+        self.roots = arrays["roots"]
+        left, right = arrays["left"], arrays["right"]
+        self.children = np.stack([left, right], axis=1).ravel()  # 2*node -> left, 2*node+1 -> right
+        self.is_leaf = left == np.arange(len(left))
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.proba = arrays["proba"]
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def transform(self, rows) -> np.ndarray:
+        """Feature dicts -> the float32 matrix the forest sees (imputed, scaled, one-hot)."""
+        X = np.zeros((len(rows), self.n_features), dtype=np.float64)
+        num = np.array([[row.get(c, np.nan) for c in self.num_features] for row in rows], dtype=np.float64)
+        num = np.where(np.isnan(num), self.num_fill, num)
+        X[:, :len(self.num_features)] = (num - self.num_mean) / self.num_scale
+        for name, columns, fill in zip(self.cat_features, self.cat_columns, self.cat_fill):
+            for i, row in enumerate(rows):
+                value = row.get(name)
+                if isinstance(value, float) and value != value:  # NaN -> most frequent category
+                    value = fill
+                # unknown categories (None included, as in the pipeline) stay all-zero
+                col = None if value is None else columns.get(str(value))
+                if col is not None:
+                    X[i, col] = 1.0
+        return X.astype(np.float32)
+
+    def predict_proba(self, rows) -> np.ndarray:
+        """Class probabilities (columns ordered like classes_) for a list of feature dicts."""
+        n = len(rows)
+        if n == 0:
+            return np.zeros((0, len(self.classes_)))
+        X = self.transform(rows)
+        n_trees = len(self.roots)
+        # one walker per (row, tree); walkers that reach a leaf are dropped, so deep
+        # but rarely taken branches don't cost a full pass over every row and tree
+        leaves = np.tile(self.roots, n)
+        walker = np.flatnonzero(~self.is_leaf[leaves])
+        node = leaves[walker]
+        base = (walker // n_trees) * self.n_features  # row offset into the flattened X
+        X = X.ravel()
+        while walker.size:
+            go_right = X[base + self.feature[node]] > self.threshold[node]
+            node = self.children[2 * node + go_right]
+            settled = self.is_leaf[node]
+            leaves[walker[settled]] = node[settled]
+            walker, node, base = walker[~settled], node[~settled], base[~settled]
+        # (trees, rows, classes) summed over the outer axis adds the trees one by one, like the forest does
+        leaf_proba = self.proba[leaves.reshape(n, n_trees).T]
+        return leaf_proba.sum(axis=0) / n_trees
+
+    def predict(self, rows) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(rows), axis=1)]
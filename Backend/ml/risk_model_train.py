@@ -1,8 +1,13 @@
 # backend/ml/risk_model_train.py
+# Usage (from Backend/):  python ml/risk_model_train.py [--export-only] [--allow-unverified]
+#   --export-only       skip training; recompile the saved pipeline into the NumPy export
+#   --allow-unverified  save the export even when the pipeline can't predict here to check it
+# tests/test_risk_compiled.py and benchmarks/risk_compiled_bench.py test and time the export on a fresh fit.
 import pandas as pd
 import numpy as np
 import joblib
 import os
+import sys
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.model_selection import train_test_split
@@ -10,6 +15,14 @@ from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml.risk_compiled import compile_pipeline, save_compiled, CompiledRiskModel
+
+MODEL_PATH = "ml/models/risk_assessor_v3.joblib"
+COMPILED_PATH = "ml/models/risk_assessor_v3.npz"
+EXPORT_ONLY = "--export-only" in sys.argv
+ALLOW_UNVERIFIED = "--allow-unverified" in sys.argv
+
 np.random.seed(42)
 
 # ========== Synthetic Adaptive Training Dataset ==========
@@ -65,11 +78,37 @@ X = df[num_features + cat_features]
 y = df["risk_level"]
 
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-model.fit(X_train, y_train)
 
-acc = model.score(X_test, y_test)
-print(f"🎯 Adaptive Risk Model Accuracy: {acc*100:.2f}%")
+if EXPORT_ONLY:
+    model = joblib.load(MODEL_PATH)
+    print(f"📦 Loaded {MODEL_PATH} for export")
+else:
+    model.fit(X_train, y_train)
+
+    acc = model.score(X_test, y_test)
+    print(f"🎯 Adaptive Risk Model Accuracy: {acc*100:.2f}%")
+
+    os.makedirs("ml/models", exist_ok=True)
+    joblib.dump(model, MODEL_PATH)
+    print(f"✅ Saved model: {MODEL_PATH}")
 
-os.makedirs("ml/models", exist_ok=True)
-joblib.dump(model, "ml/models/risk_assessor_v3.joblib")
-print("✅ Saved model: ml/models/risk_assessor_v3.joblib")
+# ========== Compiled Export (NumPy inference path used by alert_engine) ==========
+arrays = compile_pipeline(model, MODEL_PATH)
+compiled = CompiledRiskModel(arrays)
+rows = X_test.to_dict("records")
+try:
+    expected = model.predict_proba(X_test)
+except Exception as e:
+    # e.g. a pipeline pickled by another scikit-learn version: the fitted arrays still load
+    if not ALLOW_UNVERIFIED:
+        raise SystemExit(f"❌ Pipeline can't predict here ({e}), so the export can't be verified; "
+                         "not saved (rerun with --allow-unverified to save it anyway)")
+    print(f"⚠️ Pipeline can't predict here ({e}); saving unverified export (--allow-unverified)")
+    expected = None
+if expected is not None:
+    got = compiled.predict_proba(rows)
+    if not np.array_equal(got, expected):
+        raise SystemExit(f"❌ Compiled model differs from pipeline (max |Δp| = {np.abs(got - expected).max():.3g}); not saved")
+    print(f"🧪 Compiled model matches pipeline on {len(rows)} held-out rows")
+save_compiled(arrays, COMPILED_PATH)
+print(f"✅ Saved compiled model: {COMPILED_PATH} ({os.path.getsize(COMPILED_PATH) / 1e6:.1f} MB)")
@@ -0,0 +1,136 @@
+# backend/ml/safety_stock.py
+"""
+Monte Carlo safety stock / reorder point optimizer.
+
+Instead of a flat DEFAULT_SAFETY_STOCK_PERCENT, demand paths are sampled from
+the forecast's own uncertainty (the 80% yhat_lower/yhat_upper band turned back
+into a per-period sigma) together with supplier lead times taken from the
+upload (Average_Delivery_Time_Days + Delivery_Delays). The reorder point is
+the lead-time demand quantile at the target service level; safety stock is
+what it holds above the expected lead-time demand. All paths are drawn and
+accumulated as (paths x periods) arrays, so tens of thousands of paths cost
+milliseconds.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from .engines import INTERVAL_Z
+from .series_index import normalize_material
+
+DEFAULT_SERVICE_LEVEL = float(os.getenv("SAFETY_STOCK_SERVICE_LEVEL", "0.95"))
+MC_PATHS = int(os.getenv("SAFETY_STOCK_PATHS", "20000"))
+MC_SEED = 42  # fixed so the dashboard doesn't jitter between refreshes
+
+
+def lead_time_table(df: pd.DataFrame) -> dict:
+    """
+    Observed supplier lead times in days (average delivery time + delays) from an
+    upload, grouped by material in one pass. The None key holds every row's samples.
+    """
+    if df is None or "Average_Delivery_Time_Days" not in df.columns:
+        return {}
+    lead = pd.to_numeric(df["Average_Delivery_Time_Days"], errors="coerce")
+    if "Delivery_Delays" in df.columns:
+        lead = lead + pd.to_numeric(df["Delivery_Delays"], errors="coerce").fillna(0)
+    valid = (lead.notna() & (lead >= 0)).to_numpy()
+    if not valid.any():
+        return {}
+
+    samples = lead.to_numpy(dtype=float)[valid]
+    table = {None: samples}
+    if "Material_Name" in df.columns:
+        names = df["Material_Name"][valid].reset_index(drop=True)
+        for mat, g in pd.Series(samples).groupby(names, sort=False, observed=True):
+            key = normalize_material(mat)
+            table[key] = np.concatenate([table[key], g.to_numpy()]) if key in table else g.to_numpy()
+    return table
+
+
+def lead_time_samples(table: dict, material: str = None) -> tuple:
+    """
+    Lead time samples for `material` from lead_time_table(): its own rows when
+    it has any, otherwise every row. Returns (samples, source) with source
+    "material", "all materials" or None.
+    """
+    own = table.get(normalize_material(material)) if material is not None else None
+    if own is not None and own.size:
+        return own, "material"
+    if table.get(None) is not None:
+        return table[None], "all materials"
+    return np.empty(0), None
+
+
+def simulate_lead_time_demand(yhat, sigma, period_days: float, lead_times, n_paths: int,
+                              rng: np.random.Generator) -> tuple:
+    """
+    Demand accumulated over a sampled lead time, one value per path.
+    Period demands are drawn independently as Normal(yhat, sigma) clipped at 0;
+    a lead time ending inside a period takes the matching fraction of it, and
+    one running past the horizon continues at the last period's sampled rate.
+    Returns (lead_time_demand, sampled_lead_times).
+    """
+    lead = rng.choice(np.asarray(lead_times, dtype=float), size=n_paths)
+    # only the periods some lead time can reach need sampling
+    n_periods = int(min(len(yhat), np.floor(lead.max() / period_days) + 1))
+    yhat = np.asarray(yhat, dtype=float)[:n_periods]
+    sigma = np.asarray(sigma, dtype=float)[:n_periods]
+
+    demand = np.clip(rng.normal(yhat, sigma, size=(n_paths, n_periods)), 0, None)
+    cum = np.zeros((n_paths, n_periods + 1))
+    np.cumsum(demand, axis=1, out=cum[:, 1:])
+
+    pos = lead / period_days
+    full = np.minimum(np.floor(pos).astype(int), n_periods)
+    frac = pos - full
+    rows = np.arange(n_paths)
+    ltd = cum[rows, full] + frac * demand[rows, np.minimum(full, n_periods - 1)]
+    return ltd, lead
+
+
+def optimize_safety_stock(forecast_df: pd.DataFrame, lead_times, service_level: float = DEFAULT_SERVICE_LEVEL,
+                          n_paths: int = MC_PATHS, seed: int = MC_SEED) -> dict:
+    """
+    Reorder point and safety stock for one material's forecast.
+
+    Args:
+        forecast_df: forecast_date, yhat, yhat_lower, yhat_upper (future periods).
+        lead_times: lead time samples in days (e.g. from lead_time_samples), or a scalar.
+        service_level: probability of not stocking out during a replenishment lead time.
+    """
+    if not 0 < service_level < 1:
+        raise ValueError("service_level must be between 0 and 1")
+    if forecast_df is None or forecast_df.empty:
+        raise ValueError("empty forecast")
+    lead_times = np.atleast_1d(np.asarray(lead_times, dtype=float))
+    if lead_times.size == 0:
+        raise ValueError("no lead time samples")
+
+    yhat = np.clip(pd.to_numeric(forecast_df["yhat"], errors="coerce").fillna(0).to_numpy(dtype=float), 0, None)
+    if {"yhat_lower", "yhat_upper"}.issubset(forecast_df.columns):
+        band = (forecast_df["yhat_upper"] - forecast_df["yhat_lower"]).to_numpy(dtype=float)
+        sigma = np.nan_to_num(np.clip(band, 0, None) / (2 * INTERVAL_Z))
+    else:
+        sigma = np.zeros_like(yhat)
+
+    dates = pd.to_datetime(forecast_df["forecast_date"], errors="coerce")
+    steps = dates.diff().dt.days.dropna()
+    period_days = float(steps.median()) if not steps.empty and steps.median() > 0 else 30.0
+
+    rng = np.random.default_rng(seed)
+    ltd, lead = simulate_lead_time_demand(yhat, sigma, period_days, lead_times, n_paths, rng)
+
+    reorder_point = float(np.quantile(ltd, service_level))
+    expected = float(ltd.mean())
+    safety_stock = max(0.0, reorder_point - expected)
+    return {
+        "service_level": service_level,
+        "reorder_point": round(reorder_point, 2),
+        "safety_stock": round(safety_stock, 2),
+        "expected_lead_time_demand": round(expected, 2),
+        "safety_stock_percent": round(safety_stock / expected, 4) if expected > 0 else 0.0,
+        "mean_lead_time_days": round(float(lead.mean()), 2),
+        "p95_lead_time_days": round(float(np.quantile(lead, 0.95)), 2),
+        "paths": n_paths,
+    }
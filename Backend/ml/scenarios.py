@@ -0,0 +1,144 @@
+# backend/ml/scenarios.py
+"""
+What-if sweeps over procurement parameters.
+
+Takes one material's forecast and a grid of lead times, inventories, supplier
+reliabilities and safety stock percentages, and evaluates the recommendation
+math (ml.recommendation.order_quantities / order_dates) for every combination
+at once by broadcasting NumPy arrays. Nothing is re-forecast per scenario.
+"""
+import os
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from .recommendation import order_quantities, order_dates, BATCH_PARAM_DEFAULTS
+
+MAX_SCENARIOS = int(os.getenv("MAX_SCENARIOS", "100000"))
+
+# grid axes in the order the quantity/cost surfaces are laid out
+QUANTITY_AXES = ["current_inventory", "supplier_reliability", "safety_stock_percent"]
+
+
+def _check_grid_size(count: int, spec: str):
+    if count > MAX_SCENARIOS:
+        raise ValueError(f"Grid '{spec[:40]}' has {count} values, the limit is {MAX_SCENARIOS}")
+
+
+def parse_grid(spec: str):
+    """
+    Grid values from a form field: a JSON list ("[5, 10, 20]"), an inclusive
+    range "start:stop:step" ("0:500:25") or a comma-separated list. Empty -> None.
+    Grids with more than MAX_SCENARIOS values are rejected before they are built.
+    """
+    spec = (spec or "").strip()
+    if not spec:
+        return None
+    if spec.startswith("["):
+        values = json.loads(spec)
+        if not isinstance(values, list):
+            raise ValueError(f"Grid must be a JSON list: '{spec[:40]}'")
+        _check_grid_size(len(values), spec)
+        try:
+            return [float(v) for v in values]
+        except TypeError:
+            raise ValueError(f"Grid values must be numbers: '{spec[:40]}'")
+    if ":" in spec:
+        start, stop, step = (float(v) for v in spec.split(":"))
+        if not all(math.isfinite(v) for v in (start, stop, step)):
+            raise ValueError(f"Grid range must be finite: '{spec}'")
+        if step <= 0:
+            raise ValueError(f"Grid step must be positive: '{spec}'")
+        _check_grid_size(max(0, math.floor((stop - start) / step) + 1), spec)
+        return np.arange(start, stop + step / 2, step).tolist()
+    values = [v for v in spec.split(",") if v.strip()]
+    _check_grid_size(len(values), spec)
+    return [float(v) for v in values]
+
+
+def _axis(values, default) -> np.ndarray:
+    """Sorted, de-duplicated grid values (the default alone when none are given)."""
+    if values is None or len(values) == 0:
+        values = [default]
+    return np.unique(np.asarray(values, dtype=float))
+
+
+def sweep_scenarios(forecast_df: pd.DataFrame, lead_time_days=None, current_inventory=None,
+                    supplier_reliability=None, safety_stock_percent=None,
+                    unit_cost: float = 1.0) -> dict:
+    """
+    Evaluate every parameter combination for one forecast.
+
+    Order quantities don't depend on lead time and order dates depend only on
+    it, so they are computed on their own sub-grids:
+      - order_quantity[i, r, s, t] (inventory x reliability x safety stock x period)
+      - order_date[l, t]           (lead time x period)
+      - total_cost[i, r, s]        (sum over periods x unit_cost)
+      - cost_sensitivity[axis]     d total_cost / d axis value, same shape as
+                                   total_cost (only for axes with 2+ values)
+    """
+    grid = {
+        "lead_time_days": _axis(lead_time_days, BATCH_PARAM_DEFAULTS["lead_time_days"]).astype(int),
+        "current_inventory": _axis(current_inventory, BATCH_PARAM_DEFAULTS["current_inventory"]),
+        "supplier_reliability": _axis(supplier_reliability, BATCH_PARAM_DEFAULTS["supplier_reliability"]),
+        "safety_stock_percent": _axis(safety_stock_percent, BATCH_PARAM_DEFAULTS["safety_stock_percent"]),
+    }
+    scenario_count = int(np.prod([len(v) for v in grid.values()]))
+    if scenario_count > MAX_SCENARIOS:
+        raise ValueError(f"{scenario_count} scenarios requested, the limit is {MAX_SCENARIOS}")
+
+    forecast_date = pd.to_datetime(forecast_df["forecast_date"], errors="coerce")
+    yhat = pd.to_numeric(forecast_df["yhat"], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+    # (I, 1, 1, 1) x (R, 1, 1) x (S, 1) x (T,) -> (I, R, S, T)
+    inv = grid["current_inventory"][:, None, None, None]
+    rel = grid["supplier_reliability"][None, :, None, None]
+    ssp = grid["safety_stock_percent"][None, None, :, None]
+    qty = order_quantities(yhat[None, None, None, :], inv, rel, ssp)
+
+    # (L, 1) x (T,) -> (L, T)
+    dates = order_dates(forecast_date, grid["lead_time_days"][:, None])
+
+    total_quantity = qty.sum(axis=-1)
+    total_cost = total_quantity * float(unit_cost)
+    sensitivity = {}
+    for axis, name in enumerate(QUANTITY_AXES):
+        if len(grid[name]) > 1:
+            sensitivity[name] = np.gradient(total_cost, grid[name], axis=axis)
+
+    return {
+        "grid": grid,
+        "scenario_count": scenario_count,
+        "forecast_date": forecast_date.to_numpy(),
+        "order_quantity": qty,
+        "order_date": dates,
+        "total_order_quantity": total_quantity,
+        "total_cost": total_cost,
+        "cost_sensitivity": sensitivity,
+    }
+
+
+def scenarios_to_json(result: dict) -> dict:
+    """Nested-list form of sweep_scenarios() output for an API response."""
+    def iso(arr):
+        return np.datetime_as_string(arr.astype("datetime64[D]")).tolist()
+
+    return {
+        "scenario_count": result["scenario_count"],
+        "grid": {k: v.tolist() for k, v in result["grid"].items()},
+        "forecast_date": iso(result["forecast_date"]),
+        "dims": {
+            "order_quantity": QUANTITY_AXES + ["period"],
+            "order_date": ["lead_time_days", "period"],
+            "total_order_quantity": QUANTITY_AXES,
+            "total_cost": QUANTITY_AXES,
+            "cost_sensitivity": QUANTITY_AXES,
+        },
+        "order_quantity": result["order_quantity"].tolist(),
+        "order_date": iso(result["order_date"]),
+        "total_order_quantity": result["total_order_quantity"].tolist(),
+        "total_cost": result["total_cost"].tolist(),
+        "cost_sensitivity": {k: v.tolist() for k, v in result["cost_sensitivity"].items()},
+    }
@@ -0,0 +1,89 @@
+# backend/ml/serialize.py
+"""
+Compact response encoding for the forecast-heavy endpoints.
+
+format=columnar turns every list of row dicts in a payload into one array
+per column: keys are sent once instead of once per row, dates become epoch
+milliseconds, and columns that are empty in every row (e.g. the optional
+recommendation context fields) are dropped and only listed by name.
+encode_json() uses orjson when it is installed and falls back to the
+standard library encoder.
+"""
+import json
+import math
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+RESPONSE_FORMATS = ("records", "columnar")
+
+
+def _missing(value) -> bool:
+    return value is None or value is pd.NaT or (isinstance(value, float) and math.isnan(value))
+
+
+def _epoch_ms(value):
+    return None if _missing(value) else int(pd.Timestamp(value).value // 1_000_000)
+
+
+def to_columnar(records: list) -> dict:
+    """
+    Column-oriented form of a list of row dicts:
+      {"rows", "columns", "data": {column: [values]}, "date_columns", "null_columns"}
+    Date/datetime columns hold epoch milliseconds; all-empty columns are left out of data.
+    """
+    columns = list(dict.fromkeys(key for row in records for key in row))
+    data, date_columns, null_columns = {}, [], []
+    for col in columns:
+        values = [row.get(col) for row in records]
+        first = next((v for v in values if not _missing(v)), None)
+        if first is None:
+            null_columns.append(col)
+            continue
+        if isinstance(first, (datetime, date, np.datetime64)):
+            values = [_epoch_ms(v) for v in values]
+            date_columns.append(col)
+        else:
+            values = [None if _missing(v) else v for v in values]
+        data[col] = values
+    return {
+        "rows": len(records),
+        "columns": list(data),
+        "data": data,
+        "date_columns": date_columns,
+        "null_columns": null_columns,
+    }
+
+
+def columnarize(payload):
+    """Apply to_columnar() to every list of row dicts inside a response payload."""
+    if isinstance(payload, list) and payload and all(isinstance(row, dict) for row in payload):
+        return to_columnar(payload)
+    if isinstance(payload, dict):
+        return {key: columnarize(value) for key, value in payload.items()}
+    return payload
+
+
+def _default(value):
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return None if value is pd.NaT else value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def encode_json(payload) -> bytes:
+    """UTF-8 JSON bytes (orjson writes NaN/inf as null; the fallback rejects them like Starlette does)."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
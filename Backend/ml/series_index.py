@@ -0,0 +1,99 @@
+# backend/ml/series_index.py
+"""
+Per-material series index for one uploaded dataset.
+
+The upload is cleaned and aggregated to daily totals once, then split by
+normalized material name into prebuilt daily and monthly series plus a few
+summary stats. Forecasting and the dashboard look materials up in O(1)
+instead of re-cleaning and filtering the whole file for every material.
+"""
+import pandas as pd
+
+from .utils import clean_and_validate_data
+
+MONTHLY_FREQ = "ME"
+DATE_COLUMN_VARIANTS = ["Date_of_Materail_Usage", "Date_of_Material_Usage"]
+
+
+def normalize_material(material) -> str:
+    return str(material).strip().lower()
+
+
+class SeriesIndex:
+    def __init__(self, daily: pd.DataFrame):
+        """
+        daily: output of clean_and_validate_data
+        (Material_Name, date, Quantity_Used, rainfall_mm; one row per material per day).
+        """
+        self.daily_all = daily.reset_index(drop=True)
+        self._daily = {
+            mat: g.reset_index(drop=True)
+            for mat, g in self.daily_all.groupby("Material_Name", sort=False)
+        }
+
+        # one grouped resample for every material at once
+        monthly = (
+            self.daily_all.set_index("date")
+            .groupby("Material_Name")["Quantity_Used"]
+            .resample(MONTHLY_FREQ)
+            .sum()
+            .rename("quantity")
+            .reset_index()
+        ) if not self.daily_all.empty else pd.DataFrame(columns=["Material_Name", "date", "quantity"])
+        self._monthly = {
+            mat: g[["date", "quantity"]].reset_index(drop=True)
+            for mat, g in monthly.groupby("Material_Name", sort=False)
+        }
+
+        self._stats = {}
+        for mat, g in self._daily.items():
+            m = self._monthly[mat]
+            self._stats[mat] = {
+                "material": mat,
+                "days_with_usage": int((g["Quantity_Used"] > 0).sum()),
+                "first_date": g["date"].min(),
+                "last_date": g["date"].max(),
+                "total_usage": float(g["Quantity_Used"].sum()),
+                "avg_monthly": float(m["quantity"].mean()) if not m.empty else 0.0,
+                "months": int(len(m)),
+            }
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "SeriesIndex":
+        """Build from a raw or canonical upload frame (not modified)."""
+        df = df.copy(deep=False)
+        for col in DATE_COLUMN_VARIANTS:
+            if col in df.columns:
+                df = df.rename(columns={col: "date"})
+                break
+        daily = clean_and_validate_data(df, ["date", "Quantity_Used", "Material_Name"])
+        return cls(daily.sort_values(["Material_Name", "date"]))
+
+    def materials(self) -> list:
+        return list(self._daily)
+
+    def daily(self, material):
+        """Daily rows for `material`, or None if it never appears in the upload."""
+        return self._daily.get(normalize_material(material))
+
+    def monthly(self, material):
+        """Month-end totals (date, quantity) for `material`, or None."""
+        return self._monthly.get(normalize_material(material))
+
+    def summary(self, material=None):
+        if material is None:
+            return list(self._stats.values())
+        return self._stats.get(normalize_material(material))
+
+    def subset(self, material) -> "SeriesIndex":
+        """
+        Small index holding just what a forecast for `material` needs, cheap to
+        ship to a worker process. Unknown materials keep the full history so the
+        forecaster can fall back to overall project trends.
+        """
+        daily = self.daily(material)
+        return SeriesIndex(daily if daily is not None else self.daily_all)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.daily_all.memory_usage(deep=True).sum())
@@ -0,0 +1,86 @@
+# backend/ml/singleflight.py
+"""
+Single-flight call coalescing.
+
+When several requests need the same computation at the same time (e.g. a
+whole team opening one project's dashboard), only the first one - the
+leader - runs it; the others wait for the leader and share its result.
+Keys are only held while the computation is in flight, so this complements
+the result caches rather than replacing them.
+"""
+import threading
+
+
+class Flight:
+    """One in-flight computation that followers can wait on."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None):
+        """The leader's result (raises the leader's error). TimeoutError if not done in time."""
+        if not self._done.wait(timeout):
+            raise TimeoutError("shared computation still running")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    def __init__(self, name: str = "flight"):
+        self.name = name
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    def claim(self, key) -> tuple:
+        """
+        Join the flight for `key`, starting it if there is none.
+        Returns (flight, is_leader); the leader must call resolve() exactly once.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self.shared += 1
+                return flight, False
+            flight = self._flights[key] = Flight()
+            self.leaders += 1
+            return flight, True
+
+    def resolve(self, key, flight: Flight, result=None, error: BaseException = None):
+        """Publish the leader's outcome to every follower and release the key."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.result, flight.error = result, error
+        flight._done.set()
+
+    def do(self, key, fn, timeout: float = None) -> tuple:
+        """Run fn() once per key across concurrent callers. Returns (result, shared)."""
+        flight, leader = self.claim(key)
+        if not leader:
+            print(f"🔗 Joining in-flight {self.name} for {key}")
+            return flight.wait(timeout), True
+        try:
+            result = fn()
+        except BaseException as e:
+            self.resolve(key, flight, error=e)
+            raise
+        self.resolve(key, flight, result=result)
+        return result, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "leaders": self.leaders,
+                "shared": self.shared,  # duplicate computations avoided
+            }
@@ -2,7 +2,10 @@
 # ml/utils.py
 
 import pandas as pd
-from typing import List
+from typing import List, Iterable
+from pandas.tseries.api import guess_datetime_format
+
+DATE_COLUMN_CANDIDATES = ['Date_of_Materail_Usage', 'Date_of_Material_Usage', 'date']
 
 def clean_and_validate_data(df: pd.DataFrame, required_cols: List[str]) -> pd.DataFrame:
     """
@@ -25,8 +28,7 @@ def clean_and_validate_data(df: pd.DataFrame, required_cols: List[str]) -> pd.Da
     df.columns = df.columns.str.strip()
 
     # ✅ Detect the correct date column
-    possible_date_cols = ['Date_of_Materail_Usage', 'Date_of_Material_Usage', 'date']
-    date_col = next((col for col in possible_date_cols if col in df.columns), None)
+    date_col = next((col for col in DATE_COLUMN_CANDIDATES if col in df.columns), None)
 
     if not date_col:
         raise ValueError("No valid date column found. Expected one of: 'Date_of_Materail_Usage', 'Date_of_Material_Usage', or 'date'.")
@@ -73,4 +75,79 @@ def clean_and_validate_data(df: pd.DataFrame, required_cols: List[str]) -> pd.Da
     # Rename date col back for Prophet usage
     aggregated_df.rename(columns={date_col: 'date'}, inplace=True)
 
-    return aggregated_df
\ No newline at end of file
+    return aggregated_df
+
+
+def aggregate_daily_chunks(chunks: Iterable[pd.DataFrame], required_cols: List[str],
+                           compact_rows: int = 1_000_000) -> pd.DataFrame:
+    """
+    Out-of-core counterpart of clean_and_validate_data for histories that don't
+    fit in memory. Applies the same cleaning rules chunk by chunk and folds each
+    chunk into per (material, day) partial sums, so memory is bounded by one
+    chunk plus the daily aggregate, never by the file.
+
+    Args:
+        chunks: raw DataFrame chunks of one upload (e.g. pd.read_csv(..., chunksize=n)).
+        required_cols: as for clean_and_validate_data.
+        compact_rows: merge the accumulated partials once they exceed this many rows.
+
+    Returns:
+        Material_Name, date, Quantity_Used (daily sum), rainfall_mm (daily mean),
+        sorted by material and date, like clean_and_validate_data.
+    """
+    date_col = None
+    date_format = None
+    partials = []
+    pending = 0
+
+    for chunk in chunks:
+        chunk.columns = chunk.columns.str.strip()
+        if date_col is None:
+            date_col = next((col for col in DATE_COLUMN_CANDIDATES if col in chunk.columns), None)
+            if not date_col:
+                raise ValueError("No valid date column found. Expected one of: 'Date_of_Materail_Usage', 'Date_of_Material_Usage', or 'date'.")
+            if not set(required_cols).issubset(set(chunk.columns) | {"date"}):
+                missing = set(required_cols) - set(chunk.columns) - {"date"}
+                raise ValueError(f"Missing required columns: {missing}. Must include: {required_cols}")
+
+        # pandas infers a date format from the first value (per-value parsing if it
+        # can't); pin that choice so all chunks agree with a whole-file parse
+        if date_format is None:
+            first = chunk[date_col].dropna()
+            if not first.empty:
+                date_format = guess_datetime_format(str(first.iloc[0])) or "mixed"
+        dates = pd.to_datetime(chunk[date_col], errors='coerce', format=date_format)
+        qty = pd.to_numeric(chunk['Quantity_Used'], errors='coerce')
+        keep = (dates.notna() & qty.notna() & (qty >= 0)).to_numpy()
+        if not keep.any():
+            continue
+
+        if 'rainfall_mm' in chunk.columns:
+            rain = pd.to_numeric(chunk['rainfall_mm'][keep], errors='coerce').fillna(0).to_numpy(dtype=float)
+        else:
+            rain = 0.0
+        part = pd.DataFrame({
+            'Material_Name': chunk['Material_Name'][keep].astype(str).str.strip().str.lower().to_numpy(),
+            'date': dates[keep].dt.floor('D').to_numpy(),
+            'Quantity_Used': qty[keep].to_numpy(dtype=float),
+            'rain_sum': rain,
+            'rain_count': 1,
+        }).groupby(['Material_Name', 'date'], sort=False).sum()
+        partials.append(part)
+        pending += len(part)
+
+        if pending > compact_rows:
+            partials = [pd.concat(partials).groupby(level=[0, 1], sort=False).sum()]
+            pending = len(partials[0])
+
+    if date_col is None:
+        raise ValueError("No valid date column found. Expected one of: 'Date_of_Materail_Usage', 'Date_of_Material_Usage', or 'date'.")
+    if not partials:
+        return pd.DataFrame({
+            'Material_Name': pd.Series(dtype=object), 'date': pd.Series(dtype='datetime64[ns]'),
+            'Quantity_Used': pd.Series(dtype=float), 'rainfall_mm': pd.Series(dtype=float),
+        })
+
+    daily = pd.concat(partials).groupby(level=[0, 1]).sum()
+    daily['rainfall_mm'] = daily.pop('rain_sum') / daily.pop('rain_count')
+    return daily.reset_index()[['Material_Name', 'date', 'Quantity_Used', 'rainfall_mm']]
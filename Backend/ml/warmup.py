@@ -0,0 +1,58 @@
+# backend/ml/warmup.py
+"""
+Forecast pre-warming after an upload.
+
+/upload-data queues warm_forecasts() in the job queue's "warmup" lane:
+every distinct material in the file is forecast at the default horizon(s)
+and stored in the forecast cache, so the first /forecast or /dashboard-data
+call for that upload is a cache hit instead of a round of Prophet fits.
+Materials are warmed, busiest first, a few at a time, so the warm-up never
+takes the whole process pool from interactive requests (which join an
+in-flight warm-up fit rather than repeat it).
+"""
+import os
+import time
+
+from .dataset import get_series_index, dataset_key
+from .forecast import DEFAULT_ENGINE, DEFAULT_GRANULARITY
+from .forecast_executor import forecast_materials, FORECAST_WORKERS
+
+WARMUP_ENABLED = os.getenv("FORECAST_WARMUP", "1") == "1"
+WARMUP_HORIZONS = [int(h) for h in os.getenv("WARMUP_HORIZONS", "6").split(",") if h.strip()]
+WARMUP_WORKERS = int(os.getenv("WARMUP_WORKERS", str(max(1, FORECAST_WORKERS // 2))))
+WARMUP_MAX_MATERIALS = int(os.getenv("WARMUP_MAX_MATERIALS", "100"))
+
+
+def warm_forecasts(csv_path: str, horizons=None, engine: str = DEFAULT_ENGINE,
+                   granularity: str = DEFAULT_GRANULARITY, max_workers: int = WARMUP_WORKERS) -> dict:
+    """
+    Forecast every material of an upload into the forecast cache.
+    All fits go to the shared pool in one call that keeps at most `max_workers`
+    of them in flight. Returns a per-upload report.
+    """
+    started = time.perf_counter()
+    horizons = horizons or WARMUP_HORIZONS
+    series_index = get_series_index(csv_path)
+    key = dataset_key(csv_path)
+
+    stats = sorted(series_index.summary(), key=lambda s: s["total_usage"], reverse=True)
+    materials = [s["material"] for s in stats[:WARMUP_MAX_MATERIALS]]
+    tasks = [(mat, hm) for hm in horizons for mat in materials]
+
+    report = {"materials": materials, "horizons": horizons, "engine": engine, "granularity": granularity,
+              "fitted": 0, "already_cached": 0, "shared": 0, "errors": []}
+    results = forecast_materials(None, tasks, max_workers=max_workers, series_index=series_index,
+                                 dataset_key=key, engine=engine, granularity=granularity)
+    for (mat, hm), res in zip(tasks, results):
+        if res["error"]:
+            report["errors"].append({"material": mat, "horizon_months": hm, "error": res["error"]})
+        elif res["cached"]:
+            report["already_cached"] += 1
+        elif res["shared"]:
+            report["shared"] += 1
+        else:
+            report["fitted"] += 1
+
+    report["elapsed_s"] = round(time.perf_counter() - started, 2)
+    print(f"🔥 Warmed {report['fitted']} forecasts for {os.path.basename(csv_path)} in {report['elapsed_s']}s")
+    return report
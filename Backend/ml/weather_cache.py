@@ -0,0 +1,202 @@
+# backend/ml/weather_cache.py
+"""
+Shared TTL cache for live weather lookups.
+
+Sites a few hundred metres apart get the same forecast, so coordinates are
+snapped to a grid cell (WEATHER_GRID_DEG degrees) and one upstream call
+serves the whole cell for the current forecast hour. An entry is fresh for
+WEATHER_TTL seconds within its hour; after that (or once the hour rolls
+over) it is served stale for up to WEATHER_STALE_TTL seconds while a single
+background refresh replaces it. Concurrent misses on one cell share a
+single upstream call; get_many() fetches the missing cells of a batch
+concurrently in one go. Only successful lookups are cached, and the cache
+holds at most WEATHER_CACHE_SIZE cells (least recently used go first).
+"""
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+
+from .singleflight import SingleFlight
+
+WEATHER_GRID_DEG = float(os.getenv("WEATHER_GRID_DEG", "0.1"))  # ~11 km at the equator
+WEATHER_TTL = float(os.getenv("WEATHER_TTL", "900"))
+WEATHER_STALE_TTL = float(os.getenv("WEATHER_STALE_TTL", "3600"))
+WEATHER_CACHE_SIZE = int(os.getenv("WEATHER_CACHE_SIZE", "1024"))
+
+
+def snap(lat, lon, grid: float = WEATHER_GRID_DEG) -> tuple:
+    """Centre of the grid cell holding (lat, lon). ValueError for missing/invalid coordinates."""
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid coordinates: {lat}, {lon}")
+    if not (math.isfinite(lat) and math.isfinite(lon)) or abs(lat) > 90 or abs(lon) > 180:
+        raise ValueError(f"invalid coordinates: {lat}, {lon}")
+    cell = lambda v: round((math.floor(v / grid) + 0.5) * grid, 6)
+    return cell(lat), cell(lon)
+
+
+def forecast_hour(now: float = None) -> int:
+    """UTC hour the cached forecast belongs to (hours since the epoch)."""
+    return int((time.time() if now is None else now) // 3600)
+
+
+class WeatherCache:
+    """
+    fetch_fn(lat, lon) -> dict does the upstream call (raising on failure);
+    it is called with the cell centre, never the caller's exact coordinates.
+    """
+
+    def __init__(self, fetch_fn, grid: float = WEATHER_GRID_DEG, ttl: float = WEATHER_TTL,
+                 stale_ttl: float = WEATHER_STALE_TTL, max_items: int = WEATHER_CACHE_SIZE):
+        self.fetch_fn = fetch_fn
+        self.grid = grid
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_items = max_items
+        self._entries = OrderedDict()  # cell -> (hour, fetched_at, weather)
+        self._refreshing = set()
+        self._flight = SingleFlight("weather fetch")
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    def _cached(self, cell):
+        """Usable cached weather for a cell (scheduling a refresh when stale); None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(cell)
+            if entry is not None:
+                hour, fetched_at, weather = entry
+                age = now - fetched_at
+                if hour == forecast_hour(now) and age < self.ttl:
+                    self._entries.move_to_end(cell)
+                    self.hits += 1
+                    return dict(weather)
+                if age < self.stale_ttl:
+                    self._entries.move_to_end(cell)
+                    self.stale_hits += 1
+                    refresh = cell not in self._refreshing
+                    if refresh:
+                        self._refreshing.add(cell)
+                else:
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+
+        if refresh:
+            threading.Thread(target=self._refresh, args=(cell,), daemon=True).start()
+        return dict(weather)
+
+    def get(self, lat, lon) -> dict:
+        """Weather for the cell of (lat, lon); raises if it has to be fetched and that fails."""
+        cell = snap(lat, lon, self.grid)
+        weather = self._cached(cell)
+        return weather if weather is not None else dict(self._load(cell))
+
+    def get_many(self, coords, fetch_many) -> list:
+        """
+        Weather for every (lat, lon). Cache misses are fetched together with
+        fetch_many(cells) -> [weather or exception per cell], one call per distinct cell.
+        Returns one weather dict or exception (invalid coordinates, failed fetch) per coordinate.
+        """
+        results, pending = [None] * len(coords), {}
+        for i, (lat, lon) in enumerate(coords):
+            try:
+                cell = snap(lat, lon, self.grid)
+            except ValueError as e:
+                results[i] = e
+                continue
+            weather = self._cached(cell) if cell not in pending else None
+            if weather is not None:
+                results[i] = weather
+            else:
+                pending.setdefault(cell, []).append(i)
+        if not pending:
+            return results
+
+        # cells already being fetched elsewhere are joined, the rest go out in one batch
+        flights = {cell: self._flight.claim(cell) for cell in pending}
+        leading = [cell for cell, (_, leader) in flights.items() if leader]
+        try:
+            fetched = fetch_many(leading) if leading else []
+        except Exception as e:
+            fetched = [e] * len(leading)
+        for cell, outcome in zip(leading, fetched):
+            flight = flights[cell][0]
+            if isinstance(outcome, BaseException):
+                with self._lock:
+                    self.errors += 1
+                self._flight.resolve(cell, flight, error=outcome)
+            else:
+                self._store(cell, outcome)
+                self._flight.resolve(cell, flight, result=outcome)
+
+        for cell, indexes in pending.items():
+            try:
+                outcome = flights[cell][0].wait()
+            except Exception as e:
+                outcome = e
+            for i in indexes:
+                results[i] = dict(outcome) if isinstance(outcome, dict) else outcome
+        return results
+
+    def _load(self, cell) -> dict:
+        weather, _ = self._flight.do(cell, lambda: self._fetch(cell))
+        return weather
+
+    def _fetch(self, cell) -> dict:
+        try:
+            weather = self.fetch_fn(*cell)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        self._store(cell, weather)
+        return weather
+
+    def _store(self, cell, weather: dict):
+        now = time.time()
+        with self._lock:
+            self._entries[cell] = (forecast_hour(now), now, weather)
+            self._entries.move_to_end(cell)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def _refresh(self, cell):
+        """Background revalidation; on failure the stale entry keeps being served."""
+        try:
+            self._load(cell)
+            with self._lock:
+                self.refreshes += 1
+        except Exception as e:
+            print("⚠️ Weather refresh failed:", e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(cell)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "cells": len(self._entries),
+                "max_cells": self.max_items,
+                "grid_deg": self.grid,
+                "ttl_s": self.ttl,
+                "stale_ttl_s": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "errors": self.errors,
+                "shared_fetches": self._flight.stats()["shared"],
+            }
@@ -0,0 +1,221 @@
+# backend/ml/weather_client.py
+"""
+HTTP client for the Open-Meteo forecast API.
+
+One keep-alive requests.Session (pool of WEATHER_POOL_SIZE connections) is
+shared by every caller, so repeat lookups skip the TCP/TLS handshake.
+Connection errors, timeouts and 429/5xx answers are retried up to
+WEATHER_RETRIES times with exponential backoff (Retry-After is honoured),
+but never past the request budget: WEATHER_BUDGET seconds for the whole
+lookup, retries included. fetch_many() looks up several coordinates
+concurrently (at most WEATHER_CONCURRENCY in flight) on an asyncio loop,
+using httpx when it is installed and the pooled session in worker threads
+otherwise.
+"""
+import os
+import math
+import time
+import asyncio
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+WEATHER_POOL_SIZE = int(os.getenv("WEATHER_POOL_SIZE", "10"))
+WEATHER_RETRIES = int(os.getenv("WEATHER_RETRIES", "2"))
+WEATHER_BACKOFF = float(os.getenv("WEATHER_BACKOFF", "0.25"))  # 0.25s, 0.5s, 1s, ...
+WEATHER_CONNECT_TIMEOUT = float(os.getenv("WEATHER_CONNECT_TIMEOUT", "3"))
+WEATHER_READ_TIMEOUT = float(os.getenv("WEATHER_READ_TIMEOUT", "5"))
+WEATHER_BUDGET = float(os.getenv("WEATHER_BUDGET", "8"))
+WEATHER_CONCURRENCY = int(os.getenv("WEATHER_CONCURRENCY", "8"))
+
+HOURLY_FIELDS = "temperature_2m,precipitation,relative_humidity_2m,wind_speed_10m"
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+SUMMARY_HOURS = 6
+
+
+class WeatherFetchError(RuntimeError):
+    pass
+
+
+def _values(hourly: dict, field: str) -> list:
+    return [v for v in hourly[field][-SUMMARY_HOURS:] if v is not None]
+
+
+def summarize(data: dict) -> dict:
+    """Open-Meteo response -> {temperature, rain, humidity, wind} over the last SUMMARY_HOURS hours."""
+    if "hourly" not in data:
+        raise KeyError("hourly key missing in response")
+    hourly = data["hourly"]
+    mean = lambda vals: sum(vals) / len(vals) if vals else math.nan
+    return {
+        "temperature": float(mean(_values(hourly, "temperature_2m"))),
+        "rain": float(sum(_values(hourly, "precipitation"))),
+        "humidity": float(mean(_values(hourly, "relative_humidity_2m"))),
+        "wind": float(mean(_values(hourly, "wind_speed_10m"))),
+    }
+
+
+class WeatherClient:
+    def __init__(self, url: str, pool_size: int = WEATHER_POOL_SIZE, retries: int = WEATHER_RETRIES,
+                 backoff: float = WEATHER_BACKOFF, budget: float = WEATHER_BUDGET,
+                 concurrency: int = WEATHER_CONCURRENCY):
+        self.url = url
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.budget = budget
+        self.concurrency = concurrency
+        self._session = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retried = 0
+        self.failures = 0
+
+    @property
+    def session(self) -> requests.Session:
+        # created lazily so importing the app doesn't open a pool
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    # ---- retry policy (shared by the sync and async paths) ----
+    @staticmethod
+    def _params(lat, lon) -> dict:
+        return {"latitude": lat, "longitude": lon, "hourly": HOURLY_FIELDS, "forecast_days": 1}
+
+    @staticmethod
+    def _timeout(deadline: float) -> tuple:
+        """(connect, read) timeouts for one attempt, clipped to what is left of the budget."""
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise TimeoutError("weather request budget exhausted")
+        return min(WEATHER_CONNECT_TIMEOUT, left), min(WEATHER_READ_TIMEOUT, left)
+
+    def _delay(self, attempt: int, deadline: float, retry_after=None) -> float:
+        """Seconds to sleep before the next attempt, or None when no attempt (or no budget) is left."""
+        delay = self.backoff * (2 ** attempt)
+        try:
+            delay = max(delay, float(retry_after)) if retry_after else delay
+        except ValueError:
+            pass
+        if attempt >= self.retries or time.monotonic() + delay >= deadline:
+            return None
+        with self._lock:
+            self.retried += 1
+        return delay
+
+    def _count(self, failed: bool = False):
+        with self._lock:
+            self.requests += 1
+            self.failures += failed
+
+    # ---- sync ----
+    def fetch(self, lat, lon, budget: float = None) -> dict:
+        """Weather summary for (lat, lon). Raises once retries or the budget run out."""
+        deadline = time.monotonic() + (self.budget if budget is None else budget)
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                r = self.session.get(self.url, params=self._params(lat, lon), timeout=self._timeout(deadline))
+                if r.status_code not in RETRY_STATUSES:
+                    r.raise_for_status()
+                    weather = summarize(r.json())
+                    self._count()
+                    return weather
+                retry_after, error = r.headers.get("Retry-After"), WeatherFetchError(f"HTTP {r.status_code}")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except Exception:
+                self._count(failed=True)
+                raise
+            delay = self._delay(attempt, deadline, retry_after)
+            if delay is None:
+                self._count(failed=True)
+                raise error
+            time.sleep(delay)
+            attempt += 1
+
+    # ---- async ----
+    async def _fetch_async(self, client, lat, lon, deadline: float) -> dict:
+        if client is None:
+            return await asyncio.to_thread(self.fetch, lat, lon, deadline - time.monotonic())
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                connect, read = self._timeout(deadline)
+                r = await client.get(self.url, params=self._params(lat, lon),
+                                     timeout=httpx.Timeout(read, connect=connect))
+                if r.status_code not in RETRY_STATUSES:
+                    r.raise_for_status()
+                    weather = summarize(r.json())
+                    self._count()
+                    return weather
+                retry_after, error = r.headers.get("Retry-After"), WeatherFetchError(f"HTTP {r.status_code}")
+            except httpx.TransportError as e:  # connect/read timeouts and connection errors
+                error = e
+            except Exception:
+                self._count(failed=True)
+                raise
+            delay = self._delay(attempt, deadline, retry_after)
+            if delay is None:
+                self._count(failed=True)
+                raise error
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def fetch_many_async(self, coords, concurrency: int = None, budget: float = None) -> list:
+        """
+        Fetch every (lat, lon) concurrently, at most `concurrency` at a time.
+        The budget covers the whole batch. Returns one weather dict or exception per coordinate.
+        """
+        deadline = time.monotonic() + (self.budget if budget is None else budget)
+        limit = asyncio.Semaphore(max(1, concurrency or self.concurrency))
+
+        async def one(client, lat, lon):
+            async with limit:
+                return await self._fetch_async(client, lat, lon, deadline)
+
+        if httpx is None:
+            return await asyncio.gather(*(one(None, lat, lon) for lat, lon in coords), return_exceptions=True)
+        # the async pool lives for one batch: each asyncio.run() gets a fresh loop
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        async with httpx.AsyncClient(limits=limits) as client:
+            return await asyncio.gather(*(one(client, lat, lon) for lat, lon in coords), return_exceptions=True)
+
+    def fetch_many(self, coords, concurrency: int = None, budget: float = None) -> list:
+        """Blocking wrapper around fetch_many_async() for sync endpoints / worker threads."""
+        coords = list(coords)
+        if not coords:
+            return []
+        return asyncio.run(self.fetch_many_async(coords, concurrency, budget))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "concurrency": self.concurrency,
+                "budget_s": self.budget,
+                "async_backend": "httpx" if httpx is not None else "threads",
+                "requests": self.requests,
+                "retries": self.retried,
+                "failures": self.failures,
+            }
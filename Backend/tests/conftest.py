@@ -0,0 +1,18 @@
+# backend/tests/conftest.py
+# Run from Backend/:  python -m pytest -q tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from weather_stub import MeteoStub
+
+
+@pytest.fixture
+def meteo():
+    """A running local Open-Meteo stub; stopped after the test."""
+    stub = MeteoStub().start()
+    yield stub
+    stub.stop()
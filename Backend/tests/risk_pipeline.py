@@ -0,0 +1,64 @@
+# backend/tests/risk_pipeline.py
+"""
+Synthetic risk pipelines for the compiled-export test and benchmark.
+
+fit_synthetic_pipeline() fits the risk_model_train.py layout on fresh data, so
+both run with whatever scikit-learn is installed; edge_rows() adds the inputs the
+alert engine can produce besides clean ones.
+"""
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.pipeline import Pipeline
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+
+NUM_FEATURES = ["temperature", "rain", "humidity", "wind", "materials_complexity"]
+CAT_FEATURES = ["phase", "structure"]
+PHASES = ["foundation", "slabbing", "curing", "painting", "roofing", "plumbing", "tiling"]
+STRUCTURES = ["building", "bridge", "road", "warehouse", "tunnel", "dam"]
+
+
+def synthetic_rows(n: int, seed: int) -> pd.DataFrame:
+    """Feature rows shaped like the alert engine's (same ranges as the training script)."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "temperature": rng.uniform(10, 45, n),
+        "rain": rng.uniform(0, 60, n),
+        "humidity": rng.uniform(30, 100, n),
+        "wind": rng.uniform(0, 70, n),
+        "materials_complexity": rng.integers(1, 10, n),
+        "phase": rng.choice(PHASES, n),
+        "structure": rng.choice(STRUCTURES, n),
+    })
+    return df[NUM_FEATURES + CAT_FEATURES]
+
+
+def fit_synthetic_pipeline(n: int = 1500, n_estimators: int = 200, seed: int = 42) -> Pipeline:
+    """A freshly fitted pipeline with the production layout (imputers, scaler, one-hot, forest)."""
+    X = synthetic_rows(n, seed)
+    y = np.where((X["rain"] > 25) | (X["humidity"] > 85), "High",
+                 np.where((X["wind"] > 40) | (X["temperature"] > 38), "Medium", "Low"))
+    preprocessor = ColumnTransformer(transformers=[
+        ("num", Pipeline([("imputer", SimpleImputer(strategy="mean")), ("scaler", StandardScaler())]), NUM_FEATURES),
+        ("cat", Pipeline([("imputer", SimpleImputer(strategy="most_frequent")),
+                          ("encoder", OneHotEncoder(handle_unknown="ignore"))]), CAT_FEATURES),
+    ])
+    model = Pipeline([("preprocessor", preprocessor),
+                      ("clf", RandomForestClassifier(n_estimators=n_estimators, random_state=seed))])
+    return model.fit(X, y)
+
+
+def edge_rows() -> pd.DataFrame:
+    """Rows the alert engine can produce besides clean ones: missing numbers, unknown / missing categories."""
+    return pd.DataFrame([
+        {"temperature": np.nan, "rain": 30.0, "humidity": 90.0, "wind": 5.0, "materials_complexity": 3,
+         "phase": "foundation", "structure": "bridge"},
+        {"temperature": 25.0, "rain": np.nan, "humidity": np.nan, "wind": np.nan, "materials_complexity": 0,
+         "phase": "unknown", "structure": "spaceport"},
+        {"temperature": 39.0, "rain": 0.0, "humidity": 40.0, "wind": 45.0, "materials_complexity": 12,
+         "phase": np.nan, "structure": None},
+        {"temperature": -5.0, "rain": 200.0, "humidity": 100.0, "wind": 150.0, "materials_complexity": 1,
+         "phase": "curing", "structure": "dam"},
+    ])[NUM_FEATURES + CAT_FEATURES]
@@ -0,0 +1,57 @@
+# backend/tests/test_ingest.py
+import asyncio
+import hashlib
+
+import pytest
+
+from ml.ingest import stream_upload, UploadValidationError
+
+HEADER = b"Date_of_Materail_Usage,Material_Name,Quantity_Used\n"
+
+
+class ChunkedUpload:
+    """Minimal UploadFile: read() hands out `body` in small pieces and yields to the event loop."""
+
+    def __init__(self, body: bytes, piece: int = 64):
+        self.body = body
+        self.piece = piece
+        self.offset = 0
+
+    async def read(self, size: int = -1) -> bytes:
+        await asyncio.sleep(0)
+        chunk = self.body[self.offset:self.offset + min(size, self.piece)]
+        self.offset += len(chunk)
+        return chunk
+
+
+def csv_body(material: str, rows: int = 200) -> bytes:
+    return HEADER + b"".join(f"2024-01-{i % 28 + 1:02d},{material},{i}\n".encode() for i in range(rows))
+
+
+def test_upload_is_written_and_hashed(tmp_path):
+    body = csv_body("cement")
+    dest = tmp_path / "upload.csv"
+    info = asyncio.run(stream_upload(ChunkedUpload(body), str(dest), chunk_bytes=100))
+    assert dest.read_bytes() == body
+    assert info["bytes"] == len(body) and info["sha256"] == hashlib.sha256(body).hexdigest()
+    assert info["columns"] == ["Date_of_Materail_Usage", "Material_Name", "Quantity_Used"]
+
+
+def test_concurrent_uploads_of_one_filename_do_not_mix(tmp_path):
+    dest = tmp_path / "upload.csv"
+    bodies = [csv_body("cement"), csv_body("steel")]
+
+    async def both():
+        return await asyncio.gather(*(stream_upload(ChunkedUpload(b), str(dest), chunk_bytes=100) for b in bodies))
+
+    infos = asyncio.run(both())
+    assert [i["sha256"] for i in infos] == [hashlib.sha256(b).hexdigest() for b in bodies]
+    assert dest.read_bytes() in bodies  # one whole upload, not an interleaving of the two
+    assert [p.name for p in tmp_path.iterdir()] == ["upload.csv"]
+
+
+def test_bad_header_is_rejected_without_leftovers(tmp_path):
+    body = b"date,material\n" + b"2024-01-01,cement\n" * 50
+    with pytest.raises(UploadValidationError, match="Quantity_Used"):
+        asyncio.run(stream_upload(ChunkedUpload(body), str(tmp_path / "bad.csv"), chunk_bytes=100))
+    assert list(tmp_path.iterdir()) == []
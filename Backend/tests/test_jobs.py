@@ -0,0 +1,53 @@
+# backend/tests/test_jobs.py
+import time
+import threading
+
+import pytest
+
+from ml.jobs import JobQueue, DONE, CANCELLED, QUEUED, RUNNING
+
+
+def wait_for(queue, job, statuses, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while queue.get(job.id).status not in statuses:
+        assert time.monotonic() < deadline, f"job stuck in {job.status}"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def queue():
+    return JobQueue(workers=1, lanes={"warmup": 1})
+
+
+def test_warmups_leave_interactive_workers_free(queue):
+    release = threading.Event()
+    warmups = [queue.submit("warmup", release.wait, params={"i": i}, lane="warmup") for i in range(3)]
+    wait_for(queue, warmups[0], (RUNNING,))
+
+    job = queue.submit("forecast", lambda: 42)
+    wait_for(queue, job, (DONE,))
+    assert job.result == 42 and job.lane == "default"
+
+    lanes = queue.stats()["lanes"]
+    assert lanes["warmup"] == {"workers": 1, QUEUED: 2, RUNNING: 1}
+    assert lanes["default"] == {"workers": 1, QUEUED: 0, RUNNING: 0}
+    release.set()
+    for warmup in warmups:
+        wait_for(queue, warmup, (DONE,))
+
+
+def test_queued_job_in_a_lane_can_be_cancelled(queue):
+    release = threading.Event()
+    running = queue.submit("warmup", release.wait, lane="warmup")
+    queued = queue.submit("warmup", release.wait, lane="warmup")
+    wait_for(queue, running, (RUNNING,))
+    assert queue.cancel(queued.id).status == CANCELLED
+    release.set()
+    wait_for(queue, running, (DONE,))
+    assert queue.get(queued.id).to_dict()["lane"] == "warmup"
+
+
+def test_unknown_lane_is_rejected(queue):
+    with pytest.raises(ValueError, match="Unknown job lane"):
+        queue.submit("forecast", lambda: None, lane="bulk")
+    assert queue.stats()["jobs"] == 0
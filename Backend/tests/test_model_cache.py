@@ -0,0 +1,66 @@
+# backend/tests/test_model_cache.py
+import os
+
+import pytest
+
+from ml import model_cache as mc
+from ml.model_cache import ModelCache
+
+
+@pytest.fixture(autouse=True)
+def plain_json(monkeypatch):
+    """Store plain dicts instead of fitted Prophet models."""
+    monkeypatch.setattr(mc, "model_to_json", lambda model: mc.json.dumps(model))
+    monkeypatch.setattr(mc, "model_from_json", lambda text: mc.json.loads(text))
+
+
+def age(cache, key, mtime):
+    os.utime(cache._path(key), (mtime, mtime))
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    ModelCache(str(tmp_path)).put("a", {"m": 1})
+    fresh = ModelCache(str(tmp_path))
+    assert fresh.get("a") == {"m": 1}
+    assert fresh.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_is_capped_by_file_count(tmp_path):
+    cache = ModelCache(str(tmp_path), max_disk_files=3)
+    for i, key in enumerate("abc"):
+        cache.put(key, {"m": key})
+        age(cache, key, 1_000_000 + i)
+    cache.put("d", {"m": "d"})
+    assert sorted(os.listdir(tmp_path)) == ["b.json", "c.json", "d.json"]
+    stats = cache.stats()
+    assert stats["disk_files"] == 3 and stats["disk_evictions"] == 1
+
+
+def test_disk_hit_refreshes_last_use(tmp_path):
+    cache = ModelCache(str(tmp_path), max_items=1, max_disk_files=2)
+    cache.put("a", {"m": "a"})
+    age(cache, "a", 1_000_000)
+    cache.put("b", {"m": "b"})
+    age(cache, "b", 1_000_001)
+    assert cache.get("a") == {"m": "a"}  # from disk: "a" is now the most recently used
+    cache.put("c", {"m": "c"})
+    assert sorted(os.listdir(tmp_path)) == ["a.json", "c.json"]
+
+
+def test_disk_tier_is_capped_by_size(tmp_path):
+    payload = {"m": "x" * 1000}
+    cache = ModelCache(str(tmp_path), max_disk_bytes=2500)
+    for i, key in enumerate("abcd"):
+        cache.put(key, payload)
+        age(cache, key, 1_000_000 + i)
+    stats = cache.stats()
+    assert stats["disk_files"] == 2 and stats["disk_bytes"] <= 2500
+    assert sorted(os.listdir(tmp_path)) == ["c.json", "d.json"]
+
+
+def test_pruned_model_is_a_miss(tmp_path):
+    cache = ModelCache(str(tmp_path), max_items=0)
+    cache.put("a", {"m": "a"})
+    os.remove(cache._path("a"))
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,51 @@
+# backend/tests/test_model_registry.py
+import os
+
+import joblib
+import pytest
+
+from ml.model_registry import ModelRegistry
+
+
+def write(path, payload=None, broken: bool = False, mtime: float = None):
+    if broken:
+        with open(path, "wb") as f:
+            f.write(b"not a pickle")
+    else:
+        joblib.dump(payload, path)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_loads_newest_version_and_swaps_on_change(tmp_path):
+    write(tmp_path / "demo_v1.joblib", {"v": 1})
+    registry = ModelRegistry(str(tmp_path), check_interval=0)
+    assert registry.get("demo") == {"v": 1}
+    write(tmp_path / "demo_v2.joblib", {"v": 2})
+    assert registry.get("demo") == {"v": 2}
+    assert registry.loads == 2 and registry.reloads == 1
+
+
+def test_broken_file_without_a_fallback_is_not_reloaded(tmp_path):
+    path = write(tmp_path / "demo_v1.joblib", broken=True, mtime=1_000_000)
+    registry = ModelRegistry(str(tmp_path), check_interval=0)
+    for _ in range(3):
+        with pytest.raises(Exception):
+            registry.get("demo")
+    assert registry.errors == 1  # the later calls raise the memoized failure
+    assert registry.stats()["models"][0]["load_error"]
+
+    write(path, {"v": 1}, mtime=2_000_000)  # fixed in place
+    assert registry.get("demo") == {"v": 1}
+    assert registry.stats()["models"][0]["load_error"] is None
+
+
+def test_broken_new_version_keeps_the_old_one_in_service(tmp_path):
+    write(tmp_path / "demo_v1.joblib", {"v": 1})
+    registry = ModelRegistry(str(tmp_path), check_interval=0)
+    assert registry.get("demo") == {"v": 1}
+    write(tmp_path / "demo_v2.joblib", broken=True)
+    assert registry.get("demo") == {"v": 1}
+    assert registry.get("demo") == {"v": 1}
+    assert registry.errors == 1
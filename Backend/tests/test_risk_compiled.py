@@ -0,0 +1,82 @@
+# backend/tests/test_risk_compiled.py
+import os
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.risk_compiled import compile_pipeline, save_compiled, CompiledRiskModel
+from risk_pipeline import fit_synthetic_pipeline, synthetic_rows, edge_rows
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ml", "models")
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    return fit_synthetic_pipeline(n_estimators=50)
+
+
+@pytest.fixture(scope="module")
+def rows() -> pd.DataFrame:
+    return pd.concat([synthetic_rows(1000, seed=7), edge_rows()], ignore_index=True)
+
+
+def test_compiled_matches_pipeline_exactly(pipeline, rows):
+    compiled = CompiledRiskModel(compile_pipeline(pipeline))
+    assert list(compiled.classes_) == list(pipeline.classes_)
+    got = compiled.predict_proba(rows.to_dict("records"))
+    np.testing.assert_array_equal(got, pipeline.predict_proba(rows))
+
+
+def test_edge_rows_match_pipeline(pipeline):
+    # missing numbers, unknown / missing categories, out-of-range values
+    X = edge_rows()
+    compiled = CompiledRiskModel(compile_pipeline(pipeline))
+    np.testing.assert_array_equal(compiled.predict_proba(X.to_dict("records")), pipeline.predict_proba(X))
+    assert list(compiled.predict(X.to_dict("records"))) == list(pipeline.predict(X))
+
+
+def test_single_rows_match_the_batch(pipeline, rows):
+    # the alert endpoint scores one project at a time
+    compiled = CompiledRiskModel(compile_pipeline(pipeline))
+    records = rows.to_dict("records")
+    batch = compiled.predict_proba(records)
+    single = np.vstack([compiled.predict_proba([row]) for row in records[-54:]])
+    np.testing.assert_array_equal(single, batch[-54:])
+    np.testing.assert_array_equal(single, pipeline.predict_proba(rows.iloc[-54:]))
+
+
+def test_empty_batch(pipeline):
+    compiled = CompiledRiskModel(compile_pipeline(pipeline))
+    assert compiled.predict_proba([]).shape == (0, len(pipeline.classes_))
+
+
+def test_saved_export_round_trips(pipeline, rows, tmp_path):
+    path = str(tmp_path / "risk.npz")
+    save_compiled(compile_pipeline(pipeline), path)
+    loaded = CompiledRiskModel.load(path)
+    np.testing.assert_array_equal(loaded.predict_proba(rows.to_dict("records")), pipeline.predict_proba(rows))
+
+
+def test_unsupported_format_is_rejected(pipeline):
+    arrays = compile_pipeline(pipeline)
+    arrays["format"] = np.asarray(int(arrays["format"]) + 1)
+    with pytest.raises(ValueError, match="Unsupported compiled model format"):
+        CompiledRiskModel(arrays)
+
+
+def test_shipped_export_matches_shipped_pipeline():
+    source = os.path.join(MODELS_DIR, "risk_assessor_v3.joblib")
+    export = os.path.join(MODELS_DIR, "risk_assessor_v3.npz")
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            model = joblib.load(source)
+            X = synthetic_rows(500, seed=11)
+            expected = model.predict_proba(X)
+    except Exception as e:  # pickled with another scikit-learn version
+        pytest.skip(f"shipped pipeline can't predict with this scikit-learn: {e}")
+    got = CompiledRiskModel.load(export).predict_proba(X.to_dict("records"))
+    np.testing.assert_array_equal(got, expected)
@@ -0,0 +1,107 @@
+# backend/tests/test_serialize.py
+import json
+import math
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml import serialize
+from ml.serialize import to_columnar, columnarize, encode_json
+
+
+def from_columnar(table: dict) -> list:
+    """Client-side inverse of to_columnar(): rows back, dates as Timestamps, null columns as None."""
+    rows = [{} for _ in range(table["rows"])]
+    for col in table["columns"]:
+        values = table["data"][col]
+        if col in table["date_columns"]:
+            values = [None if v is None else pd.Timestamp(v, unit="ms") for v in values]
+        for row, value in zip(rows, values):
+            row[col] = value
+    for col in table["null_columns"]:
+        for row in rows:
+            row[col] = None
+    return rows
+
+
+def normalized(records: list) -> list:
+    """What the records output means: missing values as None, dates as Timestamps."""
+    def value(v):
+        if v is None or v is pd.NaT or (isinstance(v, float) and math.isnan(v)):
+            return None
+        if isinstance(v, (datetime, date, np.datetime64)):
+            return pd.Timestamp(v)
+        if isinstance(v, np.generic):
+            return v.item()
+        return v
+    return [{k: value(v) for k, v in row.items()} for row in records]
+
+
+@pytest.fixture
+def forecast_records():
+    df = pd.DataFrame({
+        "forecast_date": pd.date_range("2025-01-31", periods=4, freq="ME"),
+        "material": ["cement"] * 4,
+        "yhat": [10.5, np.nan, 12.25, 13.0],
+        "yhat_lower": [9.0, 9.5, None, 11.0],
+        "reason": [None, None, None, None],
+        "order_by": [pd.Timestamp("2025-01-10"), pd.NaT, pd.Timestamp("2025-03-10"), pd.NaT],
+        "units": np.array([1, 2, 3, 4], dtype=np.int64),
+    })
+    return df.to_dict(orient="records")
+
+
+def test_columnar_round_trips_to_records(forecast_records):
+    table = to_columnar(forecast_records)
+    assert table["rows"] == 4
+    assert table["date_columns"] == ["forecast_date", "order_by"]
+    assert table["null_columns"] == ["reason"]
+    assert "reason" not in table["data"]
+    assert from_columnar(table) == normalized(forecast_records)
+
+
+def test_dates_become_epoch_ms(forecast_records):
+    table = to_columnar(forecast_records)
+    assert table["data"]["forecast_date"][0] == int(pd.Timestamp("2025-01-31").value // 1_000_000)
+    assert table["data"]["order_by"][1] is None  # NaT
+    # plain date / datetime objects are treated like Timestamps
+    mixed = to_columnar([{"d": date(2025, 1, 1)}, {"d": datetime(2025, 1, 2, 12)}, {"d": None}])
+    assert mixed["date_columns"] == ["d"]
+    assert mixed["data"]["d"] == [1735689600000, 1735819200000, None]
+
+
+def test_nan_and_missing_keys_become_null():
+    records = [{"a": 1.0, "b": float("nan")}, {"a": np.nan, "d": "x"}, {"a": 3.0, "c": None}]
+    table = to_columnar(records)
+    assert table["columns"] == ["a", "d"]
+    assert table["data"] == {"a": [1.0, None, 3.0], "d": [None, "x", None]}
+    assert table["null_columns"] == ["b", "c"]  # NaN-only counts as empty too
+    assert from_columnar(table) == [{"a": 1.0, "d": None, "b": None, "c": None},
+                                    {"a": None, "d": "x", "b": None, "c": None},
+                                    {"a": 3.0, "d": None, "b": None, "c": None}]
+
+
+def test_columnarize_only_touches_row_lists(forecast_records):
+    payload = {
+        "forecast": forecast_records,
+        "summary": {"total": 42, "materials": ["cement", "sand"]},
+        "errors": [],
+        "nested": {"rows": [{"x": 1}, {"x": 2}]},
+    }
+    out = columnarize(payload)
+    assert out["summary"] == payload["summary"]
+    assert out["errors"] == []
+    assert out["nested"]["rows"]["data"] == {"x": [1, 2]}
+    assert from_columnar(out["forecast"]) == normalized(forecast_records)
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_encoded_columnar_round_trips(forecast_records, monkeypatch, use_orjson):
+    if use_orjson and serialize.orjson is None:
+        pytest.skip("orjson not installed")
+    if not use_orjson:
+        monkeypatch.setattr(serialize, "orjson", None)
+    decoded = json.loads(encode_json(columnarize({"forecast": forecast_records})))
+    assert from_columnar(decoded["forecast"]) == normalized(forecast_records)
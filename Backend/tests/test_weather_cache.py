@@ -0,0 +1,172 @@
+# backend/tests/test_weather_cache.py
+import time
+import threading
+
+import pytest
+
+from ml import weather_cache as wc
+from ml.weather_cache import WeatherCache, snap
+from ml.weather_client import WeatherClient
+
+
+def make_cache(meteo, **kwargs) -> tuple:
+    client = WeatherClient(meteo.url, retries=0, budget=5)
+    return WeatherCache(client.fetch, **kwargs), client
+
+
+def wait_until(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.01)
+
+
+# ---- grid snapping ----
+def test_snap_returns_cell_centre():
+    assert snap(12.97, 77.59, 0.1) == (12.95, 77.55)
+    assert snap(-12.97, -77.59, 0.1) == (-12.95, -77.55)
+    assert snap("12.91", "77.51", 0.1) == snap(12.99, 77.59, 0.1)
+
+
+@pytest.mark.parametrize("lat, lon", [(None, 77.5), ("abc", 1), (91, 0), (0, 181), (float("nan"), 0)])
+def test_snap_rejects_invalid_coordinates(lat, lon):
+    with pytest.raises(ValueError):
+        snap(lat, lon)
+
+
+def test_sites_in_one_cell_share_one_upstream_call(meteo):
+    cache, _ = make_cache(meteo, grid=0.1)
+    first = cache.get(12.971, 77.594)
+    second = cache.get(12.93, 77.51)   # same 0.1 degree cell
+    assert first == second
+    assert meteo.count == 1
+    # the upstream call is made for the cell centre, not the caller's exact site
+    assert (float(meteo.requests[0]["latitude"]), float(meteo.requests[0]["longitude"])) == (12.95, 77.55)
+
+    cache.get(13.05, 77.55)  # next cell north
+    assert meteo.count == 2
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+# ---- TTL and stale-while-revalidate ----
+def test_fresh_entry_is_served_from_cache(meteo):
+    cache, _ = make_cache(meteo, ttl=60, stale_ttl=120)
+    cache.get(10, 20)
+    for _ in range(5):
+        cache.get(10, 20)
+    assert meteo.count == 1
+    assert cache.stats()["hits"] == 5
+
+
+def test_expired_entry_is_served_stale_while_one_refresh_runs(meteo):
+    cache, _ = make_cache(meteo, ttl=0.2, stale_ttl=60)
+    original = cache.get(10, 20)
+    time.sleep(0.3)
+
+    meteo.latency = 0.3  # keep the refresh in flight while more stale reads come in
+    started = time.monotonic()
+    stale = [cache.get(10, 20) for _ in range(3)]
+    assert time.monotonic() - started < 0.2, "stale reads must not wait for the refresh"
+    assert stale == [original] * 3
+    assert cache.stats()["stale_hits"] == 3
+
+    wait_until(lambda: cache.stats()["refreshes"] == 1)
+    assert meteo.count == 2  # one background refresh for three stale reads
+    cache.get(10, 20)
+    assert cache.stats()["hits"] == 1
+
+
+def test_new_forecast_hour_revalidates(meteo, monkeypatch):
+    cache, _ = make_cache(meteo, ttl=3600, stale_ttl=7200)
+    cache.get(10, 20)
+    hour = wc.forecast_hour()
+    monkeypatch.setattr(wc, "forecast_hour", lambda now=None: hour + 1)
+    cache.get(10, 20)
+    assert cache.stats()["stale_hits"] == 1
+    wait_until(lambda: cache.stats()["refreshes"] == 1)
+    assert meteo.count == 2
+
+
+def test_entry_past_stale_ttl_is_refetched(meteo):
+    cache, _ = make_cache(meteo, ttl=0.1, stale_ttl=0.2)
+    cache.get(10, 20)
+    time.sleep(0.3)
+    cache.get(10, 20)
+    assert cache.stats()["misses"] == 2 and cache.stats()["stale_hits"] == 0
+    assert meteo.count == 2
+
+
+def test_failed_refresh_keeps_serving_stale(meteo):
+    cache, _ = make_cache(meteo, ttl=0.1, stale_ttl=60)
+    original = cache.get(10, 20)
+    time.sleep(0.2)
+    meteo.respond = lambda params: (503, {}, {"error": True})
+    assert cache.get(10, 20) == original
+    wait_until(lambda: cache.stats()["errors"] == 1)
+    assert cache.get(10, 20) == original
+
+
+# ---- single-flight ----
+def test_concurrent_misses_share_one_upstream_call(meteo):
+    cache, _ = make_cache(meteo)
+    meteo.latency = 0.3
+    results, barrier = [], threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        results.append(cache.get(10.01, 20.01))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert meteo.count == 1
+    assert len(results) == 8 and all(r == results[0] for r in results)
+    assert cache.stats()["shared_fetches"] == 7
+
+
+def test_failed_fetch_is_not_cached(meteo):
+    cache, _ = make_cache(meteo)
+    meteo.respond = lambda params: (500, {}, {"error": True})
+    with pytest.raises(Exception):
+        cache.get(10, 20)
+    meteo.respond = None
+    assert cache.get(10, 20)["temperature"] > 0
+    assert meteo.count == 2 and cache.stats()["errors"] == 1
+
+
+# ---- get_many ----
+def test_get_many_isolates_errors_per_coordinate(meteo):
+    cache, client = make_cache(meteo)
+    bad_lat = str(snap(30, 40)[0])
+    meteo.respond = lambda params: (500, {}, {"error": True}) if params["latitude"] == bad_lat else None
+    coords = [(10, 20), (None, 20), (30, 40), (10.02, 20.02), (50, 60)]
+
+    results = cache.get_many(coords, client.fetch_many)
+
+    assert isinstance(results[1], ValueError)       # invalid coordinates
+    assert isinstance(results[2], Exception)         # upstream failure for that cell only
+    for i in (0, 3, 4):
+        assert isinstance(results[i], dict) and "temperature" in results[i]
+    assert results[0] == results[3]                   # same cell
+    assert meteo.count == 3                           # one call per distinct valid cell
+    assert cache.stats()["errors"] == 1
+
+    # successes were cached, the failure wasn't
+    meteo.respond = None
+    again = cache.get_many(coords, client.fetch_many)
+    assert isinstance(again[2], dict)
+    assert meteo.count == 4
+
+
+def test_get_many_joins_fetches_in_flight(meteo):
+    cache, client = make_cache(meteo)
+    meteo.latency = 0.3
+    single = threading.Thread(target=cache.get, args=(10, 20))
+    single.start()
+    wait_until(lambda: meteo.count == 1)
+    results = cache.get_many([(10, 20), (30, 40)], client.fetch_many)
+    single.join()
+    assert all(isinstance(r, dict) for r in results)
+    assert meteo.count == 2  # (10, 20) was joined, not fetched again
@@ -0,0 +1,143 @@
+# backend/tests/test_weather_client.py
+import time
+import socket
+
+import pytest
+import requests
+
+from ml import weather_client as wc_module
+from ml.weather_client import WeatherClient, WeatherFetchError, HOURLY_FIELDS
+from weather_stub import HOURLY_VARIABLES
+
+
+def scripted(*replies):
+    """respond() hook answering with `replies` in order, then normally."""
+    replies = list(replies)
+    return lambda params: replies.pop(0) if replies else None
+
+
+def closed_port_url() -> str:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/v1/forecast"
+
+
+@pytest.fixture(params=["httpx", "threads"])
+def async_backend(request, monkeypatch):
+    """Run fetch_many() tests with httpx and with the thread fallback."""
+    if request.param == "httpx" and wc_module.httpx is None:
+        pytest.skip("httpx not installed")
+    if request.param == "threads":
+        monkeypatch.setattr(wc_module, "httpx", None)
+    return request.param
+
+
+# ---- request / response shape ----
+def test_requests_only_real_open_meteo_variables(meteo):
+    weather = WeatherClient(meteo.url).fetch(10, 20)
+    fields = meteo.requests[0]["hourly"].split(",")
+    assert fields == HOURLY_FIELDS.split(",")
+    assert set(fields) <= HOURLY_VARIABLES
+    # summary of the last 6 hours (18..23) of the stub's series
+    assert weather == pytest.approx({"temperature": 30.25, "rain": 30.75, "humidity": 80.5, "wind": 9.1})
+
+
+def test_unknown_variable_is_a_client_error_without_retry(meteo):
+    client = WeatherClient(meteo.url, retries=3, backoff=0.01)
+    meteo.respond = scripted((400, {}, {"error": True, "reason": "Cannot initialize variable"}))
+    with pytest.raises(requests.HTTPError):
+        client.fetch(10, 20)
+    assert meteo.count == 1
+    assert client.stats()["retries"] == 0 and client.stats()["failures"] == 1
+
+
+# ---- retries ----
+def test_5xx_is_retried_until_success(meteo):
+    client = WeatherClient(meteo.url, retries=2, backoff=0.01)
+    meteo.respond = scripted((503, {}, {}), (502, {}, {}))
+    assert client.fetch(10, 20)["temperature"] == pytest.approx(30.25)
+    assert meteo.count == 3
+    assert client.stats()["retries"] == 2 and client.stats()["failures"] == 0
+
+
+def test_gives_up_after_the_retry_limit(meteo):
+    client = WeatherClient(meteo.url, retries=2, backoff=0.01)
+    meteo.respond = lambda params: (500, {}, {})
+    with pytest.raises(WeatherFetchError, match="HTTP 500"):
+        client.fetch(10, 20)
+    assert meteo.count == 3
+
+
+def test_retry_after_is_honoured(meteo):
+    client = WeatherClient(meteo.url, retries=1, backoff=0.01, budget=5)
+    meteo.respond = scripted((429, {"Retry-After": "0.4"}, {}))
+    started = time.monotonic()
+    client.fetch(10, 20)
+    assert time.monotonic() - started >= 0.4
+    assert meteo.count == 2
+
+
+def test_retry_after_past_the_budget_fails_at_once(meteo):
+    client = WeatherClient(meteo.url, retries=3, backoff=0.01, budget=1)
+    meteo.respond = lambda params: (429, {"Retry-After": "30"}, {})
+    started = time.monotonic()
+    with pytest.raises(WeatherFetchError, match="HTTP 429"):
+        client.fetch(10, 20)
+    assert time.monotonic() - started < 0.5
+    assert meteo.count == 1
+
+
+def test_connection_errors_are_retried():
+    client = WeatherClient(closed_port_url(), retries=2, backoff=0.01)
+    with pytest.raises(requests.ConnectionError):
+        client.fetch(10, 20)
+    assert client.stats()["retries"] == 2
+
+
+# ---- budget ----
+def test_budget_bounds_a_slow_upstream(meteo):
+    client = WeatherClient(meteo.url, retries=5, backoff=0.01, budget=0.5)
+    meteo.latency = 2
+    started = time.monotonic()
+    with pytest.raises((requests.Timeout, TimeoutError)):
+        client.fetch(10, 20)
+    assert time.monotonic() - started < 0.9
+
+
+# ---- fetch_many ----
+def test_fetch_many_keeps_order_and_isolates_failures(meteo, async_backend):
+    client = WeatherClient(meteo.url, retries=0)
+    meteo.respond = lambda params: (500, {}, {}) if params["latitude"] == "30" else None
+    results = client.fetch_many([(10, 20), (30, 40), (50, 60)])
+    assert isinstance(results[0], dict) and isinstance(results[2], dict)
+    assert isinstance(results[1], Exception)
+    assert sorted(r["latitude"] for r in meteo.requests) == ["10", "30", "50"]
+
+
+def test_fetch_many_respects_the_concurrency_limit(meteo, async_backend):
+    client = WeatherClient(meteo.url, concurrency=3)
+    meteo.latency = 0.1
+    results = client.fetch_many([(i, i) for i in range(9)])
+    assert all(isinstance(r, dict) for r in results)
+    assert meteo.max_in_flight == 3
+
+
+def test_fetch_many_retries_with_retry_after(meteo, async_backend):
+    client = WeatherClient(meteo.url, retries=1, backoff=0.01)
+    meteo.respond = scripted((429, {"Retry-After": "0.2"}, {}))
+    started = time.monotonic()
+    results = client.fetch_many([(10, 20)])
+    assert isinstance(results[0], dict)
+    assert time.monotonic() - started >= 0.2
+    assert client.stats()["retries"] == 1
+
+
+def test_fetch_many_budget_covers_the_whole_batch(meteo, async_backend):
+    client = WeatherClient(meteo.url, retries=0, concurrency=1)
+    meteo.latency = 0.3
+    started = time.monotonic()
+    results = client.fetch_many([(i, i) for i in range(6)], budget=0.5)
+    assert time.monotonic() - started < 1.0
+    assert any(isinstance(r, dict) for r in results)
+    assert any(isinstance(r, Exception) for r in results)
@@ -0,0 +1,101 @@
+# backend/tests/weather_stub.py
+"""
+Local stand-in for the Open-Meteo forecast API.
+
+Answers GET /v1/forecast with 24 hourly values for every field listed in
+`hourly`, records each request's query parameters and tracks the most
+requests ever in flight at once. `latency` delays each answer;
+`respond(params)` can override one answer with (status, headers, body),
+e.g. to script 429/5xx replies for retry tests.
+Like the real API, a request for an unknown hourly variable gets a 400.
+"""
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+# the hourly variables this app may ask for, as the API spells them
+HOURLY_VARIABLES = {"temperature_2m", "relative_humidity_2m", "dew_point_2m", "precipitation", "rain",
+                    "wind_speed_10m", "wind_direction_10m", "cloud_cover"}
+
+
+def hourly_payload(fields) -> dict:
+    hours = range(24)
+    values = {
+        "temperature_2m": [20 + h * 0.5 for h in hours],
+        "precipitation": [h * 0.25 for h in hours],
+        "relative_humidity_2m": [60.0 + h for h in hours],
+        "wind_speed_10m": [5 + h * 0.2 for h in hours],
+    }
+    hourly = {"time": [f"2026-01-01T{h:02d}:00" for h in hours]}
+    for field in fields:
+        hourly[field] = values.get(field, [60.0 + h for h in hours])
+    return {"hourly": hourly}
+
+
+class MeteoStub:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.respond = None
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                with stub._lock:
+                    stub.requests.append(params)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    if stub.latency:
+                        time.sleep(stub.latency)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+                status, headers, payload = 200, {}, None
+                override = stub.respond(params) if stub.respond else None
+                unknown = [f for f in params.get("hourly", "").split(",") if f and f not in HOURLY_VARIABLES]
+                if override is not None:
+                    status, headers, payload = override
+                elif unknown:
+                    status, payload = 400, {"error": True, "reason": f"Cannot initialize variable from invalid String value {unknown[0]}"}
+                if payload is None:
+                    payload = hourly_payload(params.get("hourly", "").split(","))
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/forecast"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def count(self) -> int:
+        with self._lock:
+            return len(self.requests)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()